@@ -0,0 +1,309 @@
+"""
+Memory-mapped address index for large blocklists
+Imported blocklists are stored as sorted 32-byte public keys in a single
+file that is memory-mapped and binary-searched, fronted by a Bloom filter
+so most misses never touch the key table. A small in-memory overlay holds
+addresses added at runtime (the detectors' JSON files) and removals.
+
+File layout (little-endian):
+    magic "WWIX" | version u32 | count u64 | bloom_bits u64 | bloom_hashes u32
+    bloom bitmap (bloom_bits / 8 bytes) | count x 32-byte keys, sorted
+
+Usage:
+    python address_index.py build blocklists/honeypots.idx community_list.txt
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from json_store import JsonStore, replay_set
+from pubkey import b58encode, pubkey_bytes
+
+MAGIC = b"WWIX"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQI")
+KEY_SIZE = 32
+BLOOM_BITS_PER_KEY = 10    # ~1% false positives with 7 hashes
+BLOOM_HASHES = 7
+
+
+def bloom_positions(key, bits, hashes):
+    """Bit positions for a key (double hashing over one blake2b digest)"""
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class AddressIndex:
+    """
+    Set-like view over an on-disk sorted key index plus a mutable overlay
+
+    Supports `in`, add, discard/remove, iteration and len, so it can stand
+    in for the sets of base58 strings the detectors keep. Only `added`
+    (overlay additions) needs persisting by the owner; removals of indexed
+    keys are kept in a sidecar file next to the index. Listing endpoints
+    should use page() - iterating encodes every indexed key.
+    """
+
+    def __init__(self, path, overlay=()):
+        self.path = path
+        self.removed_path = f"{path}.removed.json"
+        self.added = set(overlay)
+        self.persist = True   # Shard replicas leave the sidecar to the main process
+        self.removed_store = JsonStore(self.removed_path, lambda: list(self.removed))
+        self.removed = self._load_removed()
+        self.count = 0
+        self.mm = None
+        self.bloom_bits = 0
+        self.bloom_hashes = 0
+        self.keys_offset = 0
+        self.open()
+
+    def _load_removed(self):
+        data, journal = self.removed_store.load()
+        return replay_set(set(data if isinstance(data, list) else []), journal)
+
+    def _record_removed(self, op, address):
+        if self.persist and os.path.exists(self.path):
+            self.removed_store.record([op, address])
+
+    def open(self):
+        """Map the index file (if any); called again after a rebuild"""
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self.count = 0
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            return
+        with open(self.path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, bloom_bits, bloom_hashes = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            print(f"Ignoring address index {self.path}: unknown format")
+            self.mm.close()
+            self.mm = None
+            return
+        self.count = count
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self.keys_offset = HEADER.size + bloom_bits // 8
+
+    def _key_at(self, i):
+        start = self.keys_offset + i * KEY_SIZE
+        return self.mm[start:start + KEY_SIZE]
+
+    def _indexed(self, key):
+        """Bloom filter check, then binary search of the sorted key table"""
+        if not self.count:
+            return False
+        for bit in bloom_positions(key, self.bloom_bits, self.bloom_hashes):
+            if not self.mm[HEADER.size + bit // 8] & (1 << (bit % 8)):
+                return False
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._key_at(mid)
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def _in_index(self, address):
+        if not self.count:
+            return False
+        try:
+            return self._indexed(pubkey_bytes(address))
+        except ValueError:
+            return False
+
+    def __contains__(self, address):
+        if address in self.added:
+            return True
+        if address in self.removed:
+            return False
+        return self._in_index(address)
+
+    def add(self, address):
+        if address in self.removed:
+            self.removed.discard(address)
+            self._record_removed("discard", address)
+        if not self._in_index(address):
+            self.added.add(address)
+
+    def discard(self, address):
+        self.added.discard(address)
+        if address not in self.removed and self._in_index(address):
+            self.removed.add(address)
+            self._record_removed("add", address)
+
+    def remove(self, address):
+        if address not in self:
+            raise KeyError(address)
+        self.discard(address)
+
+    def __iter__(self):
+        yield from self.added
+        for i in range(self.count):
+            address = b58encode(self._key_at(i))
+            if address not in self.removed:
+                yield address
+
+    def page(self, offset=0, limit=100):
+        """
+        Up to `limit` addresses starting at `offset`
+        Overlay additions come first (sorted), then indexed keys in key order;
+        only the returned keys are base58-encoded.
+        """
+        added = sorted(self.added)
+        result = added[offset:offset + limit]
+        position = self._position(max(0, offset - len(added)))
+        while len(result) < limit and position < self.count:
+            address = b58encode(self._key_at(position))
+            if address not in self.removed:
+                result.append(address)
+            position += 1
+        return result
+
+    def _position(self, n):
+        """Key table position of the n-th indexed key that has not been removed"""
+        skipped = []
+        for address in list(self.removed):
+            position = self._find(address)
+            if position is not None:
+                skipped.append(position)
+        for position in sorted(skipped):
+            if position <= n:
+                n += 1
+        return n
+
+    def _find(self, address):
+        try:
+            key = pubkey_bytes(address)
+        except ValueError:
+            return None
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self._key_at(lo) == key else None
+
+    def __len__(self):
+        return len(self.added) + self.count - len(self.removed)
+
+    def build(self, addresses):
+        """
+        Rebuild the index from the current contents plus `addresses`
+        Overlay additions and removals are folded in, then the overlay is cleared.
+        Returns the number of addresses that were skipped as invalid.
+        """
+        keys = set()
+        for i in range(self.count):
+            keys.add(self._key_at(i))
+        for address in self.removed:
+            try:
+                keys.discard(pubkey_bytes(address))
+            except ValueError:
+                pass
+
+        skipped = 0
+        folded = set()
+        for address in list(addresses) + list(self.added):
+            try:
+                keys.add(pubkey_bytes(address))
+                folded.add(address)
+            except ValueError:
+                skipped += 1
+
+        write_index(self.path, keys)
+        self.open()
+        # Anything that could not be indexed stays in the overlay
+        self.added -= folded
+        self.removed.clear()
+        store = self.removed_store
+        if self.persist and (os.path.exists(store.path) or os.path.exists(store.journal_path)):
+            # Rewrites the sidecar as [] and drops its journal
+            store.touch()
+            store.flush()
+        return skipped
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+def write_index(path, keys):
+    """Write sorted keys and their Bloom filter to `path` atomically"""
+    keys = sorted(keys)
+    bloom_bits = max(64, len(keys) * BLOOM_BITS_PER_KEY)
+    bloom_bits += -bloom_bits % 8
+    bloom = bytearray(bloom_bits // 8)
+    for key in keys:
+        for bit in bloom_positions(key, bloom_bits, BLOOM_HASHES):
+            bloom[bit // 8] |= 1 << (bit % 8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".index-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(keys), bloom_bits, BLOOM_HASHES))
+            f.write(bloom)
+            for key in keys:
+                f.write(key)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_addresses(path):
+    """Addresses from a JSON list, a {"addresses": [...]} object or one per line"""
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("addresses", [])
+        return [a for a in data if isinstance(a, str)]
+    except json.JSONDecodeError:
+        return [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mapped blocklist index")
+    parser.add_argument("command", choices=["build", "stats"])
+    parser.add_argument("index", help="Index file, e.g. blocklists/honeypots.idx")
+    parser.add_argument("sources", nargs="*", help="Blocklist files to merge into the index")
+    args = parser.parse_args()
+
+    index = AddressIndex(args.index)
+    if args.command == "build":
+        addresses = []
+        for source in args.sources:
+            addresses.extend(read_addresses(source))
+        skipped = index.build(addresses)
+        print(f"Indexed {index.count} addresses in {args.index} ({skipped} invalid skipped)")
+    else:
+        size = os.path.getsize(args.index) if os.path.exists(args.index) else 0
+        print(f"{args.index}: {index.count} indexed, {len(index.removed)} removed, {size} bytes")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
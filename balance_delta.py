@@ -0,0 +1,212 @@
+"""
+Balance-delta engine for Solana transactions
+Derives transfers and swaps from the pre/post balances recorded in a
+transaction's meta instead of parsing individual instructions
+"""
+from config import TOKEN_MAP
+from models import TransferEvent
+
+NATIVE_MINT = "So11111111111111111111111111111111111111112"
+LAMPORTS_PER_SOL = 1_000_000_000
+
+class BalanceDeltaEngine:
+    """
+    Computes each account owner's net SOL and token deltas for a transaction.
+    Inner instructions (Jupiter/Raydium routes, CPI transfers) are covered
+    for free because the runtime already recorded their effect on balances.
+    """
+
+    def __init__(self, min_sol_delta=0.000001):
+        # Ignore SOL movements smaller than this (rounding, rent dust)
+        self.min_sol_delta = min_sol_delta
+
+    def has_balance_meta(self, tx):
+        """Check if a transaction carries the balance snapshots the engine needs"""
+        meta = (tx or {}).get("meta") or {}
+        return (
+            "preBalances" in meta and "postBalances" in meta and
+            "preTokenBalances" in meta and "postTokenBalances" in meta
+        )
+
+    def compute_deltas(self, tx):
+        """
+        Compute net balance changes per owner
+        Returns: {owner: {"SOL": sol_delta, mint: (ui_delta, decimals)}}
+
+        Lamports held by token accounts are credited to the token account's
+        owner, so creating/closing an ATA nets out, and wrapped SOL is folded
+        into the owner's SOL delta rather than reported as a token.
+        """
+        meta = tx.get("meta") or {}
+        account_keys = tx.get("transaction", {}).get("message", {}).get("accountKeys", [])
+        keys = [k.get("pubkey") if isinstance(k, dict) else k for k in account_keys]
+
+        pre_tokens = meta.get("preTokenBalances") or []
+        post_tokens = meta.get("postTokenBalances") or []
+
+        # Single pass over token balance snapshots: index -> (owner, mint, raw, decimals)
+        token_accounts = {}
+        for sign, balances in ((-1, pre_tokens), (1, post_tokens)):
+            for balance in balances:
+                index = balance.get("accountIndex")
+                ui_amount = balance.get("uiTokenAmount") or {}
+                decimals = int(ui_amount.get("decimals", 0))
+                raw = int(ui_amount.get("amount", 0) or 0)
+                owner, mint, delta, _ = token_accounts.get(index, (None, None, 0, decimals))
+                token_accounts[index] = (
+                    balance.get("owner") or owner,
+                    balance.get("mint") or mint,
+                    delta + sign * raw,
+                    decimals
+                )
+
+        deltas = {}
+
+        # Single pass over lamport snapshots
+        fee = meta.get("fee", 0)
+        for index, (pre, post) in enumerate(zip(meta.get("preBalances", []), meta.get("postBalances", []))):
+            change = post - pre
+            if index == 0:
+                # Fee payer: fees are not transfers
+                change += fee
+            if not change or index >= len(keys):
+                continue
+            token_account = token_accounts.get(index)
+            owner = token_account[0] if token_account and token_account[0] else keys[index]
+            owner_deltas = deltas.setdefault(owner, {})
+            owner_deltas["SOL"] = owner_deltas.get("SOL", 0) + change
+
+        for owner, mint, raw_delta, decimals in token_accounts.values():
+            if not raw_delta or not owner or mint == NATIVE_MINT:
+                continue
+            owner_deltas = deltas.setdefault(owner, {})
+            previous, _ = owner_deltas.get(mint, (0, decimals))
+            owner_deltas[mint] = (previous + raw_delta, decimals)
+
+        # Normalise to UI units
+        for owner_deltas in deltas.values():
+            for asset, value in list(owner_deltas.items()):
+                if asset == "SOL":
+                    owner_deltas[asset] = value / LAMPORTS_PER_SOL
+                else:
+                    raw_delta, decimals = value
+                    owner_deltas[asset] = (raw_delta / (10 ** decimals), decimals)
+
+        return deltas
+
+    def _counterparty(self, deltas, wallet, asset, sign):
+        """Find the owner with the largest opposite movement of an asset"""
+        best, best_amount = None, 0
+        for owner, owner_deltas in deltas.items():
+            if owner == wallet or asset not in owner_deltas:
+                continue
+            value = owner_deltas[asset]
+            amount = value if asset == "SOL" else value[0]
+            if amount * sign < 0 and abs(amount) > best_amount:
+                best, best_amount = owner, abs(amount)
+        return best
+
+    def owner_flows(self, deltas, exclude=None):
+        """
+        Pair owners whose balance of an asset fell with owners whose balance rose
+        The largest senders are matched with the largest receivers first.
+        Returns [(source, destination, sol)] summed per owner pair (sol is 0
+        for token-only flows); pairs involving `exclude` are left out.
+        """
+        moves = {}
+        assets = {asset for owner_deltas in deltas.values() for asset in owner_deltas}
+        for asset in assets:
+            senders, receivers = [], []
+            for owner, owner_deltas in deltas.items():
+                value = owner_deltas.get(asset)
+                if value is None:
+                    continue
+                amount = value if asset == "SOL" else value[0]
+                if asset == "SOL" and abs(amount) < self.min_sol_delta:
+                    continue
+                if amount < 0:
+                    senders.append([-amount, owner])
+                elif amount > 0:
+                    receivers.append([amount, owner])
+            senders.sort(reverse=True)
+            receivers.sort(reverse=True)
+            i = j = 0
+            while i < len(senders) and j < len(receivers):
+                moved = min(senders[i][0], receivers[j][0])
+                pair = (senders[i][1], receivers[j][1])
+                moves[pair] = moves.get(pair, 0) + (moved if asset == "SOL" else 0)
+                senders[i][0] -= moved
+                receivers[j][0] -= moved
+                if senders[i][0] <= 0:
+                    i += 1
+                if receivers[j][0] <= 0:
+                    j += 1
+        return [
+            (source, destination, sol) for (source, destination), sol in moves.items()
+            if exclude not in (source, destination)
+        ]
+
+    def wallet_events(self, tx, wallet, deltas=None):
+        """
+        Build transfer events for a wallet from its net balance deltas
+        Returns a list of TransferEvent records
+        """
+        if deltas is None:
+            deltas = self.compute_deltas(tx)
+        wallet_deltas = deltas.get(wallet, {})
+        events = []
+
+        sol_delta = wallet_deltas.get("SOL", 0)
+        if abs(sol_delta) >= self.min_sol_delta:
+            sign = 1 if sol_delta > 0 else -1
+            events.append(TransferEvent(
+                type="sol_transfer",
+                direction="Received" if sign > 0 else "Sent",
+                amount=abs(sol_delta),
+                other_address=self._counterparty(deltas, wallet, "SOL", sign),
+                token_name="SOL"
+            ))
+
+        for asset, value in wallet_deltas.items():
+            if asset == "SOL":
+                continue
+            amount, decimals = value
+            if not amount:
+                continue
+            sign = 1 if amount > 0 else -1
+            token_name = TOKEN_MAP.get(asset, (f"Unknown Token ({asset[:4]}...{asset[-4:]})", decimals))[0]
+            events.append(TransferEvent(
+                type="token_transfer",
+                direction="Received" if sign > 0 else "Sent",
+                amount=abs(amount),
+                other_address=self._counterparty(deltas, wallet, asset, sign),
+                token_name=token_name,
+                mint=asset,
+                decimals=decimals
+            ))
+
+        return events
+
+    def swap_legs(self, events):
+        """
+        Pick the input and output legs of a swap from a wallet's net events
+        Returns: (sent_legs, received_legs), token legs before SOL legs
+        """
+        sent, received = [], []
+        for event in events:
+            if event.get("type") not in ("sol_transfer", "token_transfer"):
+                continue
+            leg = {
+                "token_name": event.get("token_name"),
+                "amount": event.get("amount", 0),
+                "mint": event.get("mint", NATIVE_MINT)
+            }
+            (received if event.get("direction") == "Received" else sent).append(leg)
+
+        # SOL movements are often just tips or rent, so a SOL leg is only
+        # used when no token moved in that direction
+        def order(legs):
+            tokens = [leg for leg in legs if leg["token_name"] != "SOL"]
+            return tokens + [leg for leg in legs if leg["token_name"] == "SOL"]
+
+        return order(sent), order(received)
@@ -0,0 +1,249 @@
+"""
+Vectorized batch analysis for backfills
+Re-analyzing history one transaction at a time through
+SuspiciousActivityDetector is dominated by per-event Python overhead.
+Here a batch is held as NumPy columns with one row per (transaction,
+counterparty) pair, and the sliding-window velocity, volume, program and
+bridge signals are computed for all rows at once with sorted prefix sums.
+Transaction-scope rules (exploit, fund obfuscation) are evaluated over
+per-transaction columns. Results match the streaming detector's window
+state row for row, and replaying analyze_transaction's checks over them
+gives its verdicts; `python benchmark.py --batch-check` verifies both.
+
+Rows are analyzed as if every counterparty were tracked: the streaming
+detector's early exit on the first flagged address is not reproduced, and
+stateful checks (Sybil groups, token actions, creator flags) stay streaming.
+
+Usage:
+    python batch_analysis.py transaction_history.json
+"""
+import argparse
+import json
+import sys
+import numpy as np
+from config import AGGREGATE_BUCKET_SECONDS
+from models import DecodedTransaction
+from rule_engine import RuleEngine, TRANSACTION_FEATURES
+from suspicious_activity import ACTIVITY_WINDOWS, THRESHOLDS
+from velocity import SOL_UNITS, USD_UNITS, window_buckets
+
+
+class EventBatch:
+    """
+    Columnar (transaction, counterparty) rows
+
+    Row columns: timestamps (float64 epoch seconds), tx_index and
+    counterparty_ids (int64, indexes into `addresses`), sol and usd
+    (float64), bridges (int64) and programs (bool, one column per entry of
+    `program_ids`). Rows of one transaction are contiguous and in the order
+    the streaming detector tracks them. `tx_columns` holds the transaction
+    features (one value per transaction) used by transaction-scope rules.
+    """
+
+    def __init__(self, timestamps, tx_index, counterparty_ids, addresses, sol, usd, bridges,
+                 programs, program_ids, tx_columns, signatures=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.tx_index = np.asarray(tx_index, dtype=np.int64)
+        self.counterparty_ids = np.asarray(counterparty_ids, dtype=np.int64)
+        self.addresses = addresses
+        self.sol = np.asarray(sol, dtype=np.float64)
+        self.usd = np.asarray(usd, dtype=np.float64)
+        self.bridges = np.asarray(bridges, dtype=np.int64)
+        self.programs = np.asarray(programs, dtype=bool).reshape(len(self.timestamps), len(program_ids))
+        self.program_ids = list(program_ids)
+        self.tx_columns = {name: np.asarray(values) for name, values in tx_columns.items()}
+        self.signatures = signatures or []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def from_transactions(cls, transactions, rules, price_lookup, program_ids=None):
+        """
+        Build a batch from decoded transactions (records or dicts)
+        Each transaction is placed at its block_time; features are extracted
+        with the same code the streaming detector uses
+        """
+        program_ids = list(program_ids if program_ids is not None else rules.thresholds["unusual_program_ids"])
+        address_ids = {}
+        rows = {"timestamps": [], "tx_index": [], "counterparty_ids": [], "sol": [], "usd": [], "bridges": [], "programs": []}
+        tx_columns = {name: [] for name in sorted(TRANSACTION_FEATURES)}
+        signatures = []
+        for index, tx in enumerate(transactions):
+            features = rules.extract(tx, price_lookup)
+            signatures.append(features["signature"])
+            for name in tx_columns:
+                tx_columns[name].append(features[name])
+            program_row = [p in features["program_set"] for p in program_ids]
+            block_time = tx.get("block_time", 0)
+            for address in features["counterparties"]:
+                rows["timestamps"].append(block_time)
+                rows["tx_index"].append(index)
+                rows["counterparty_ids"].append(address_ids.setdefault(address, len(address_ids)))
+                rows["sol"].append(features["sol_amount"])
+                rows["usd"].append(features["token_amount_usd"])
+                rows["bridges"].append(features["bridge_count"])
+                rows["programs"].append(program_row)
+        return cls(addresses=list(address_ids), program_ids=program_ids, tx_columns=tx_columns,
+                   signatures=signatures, **rows)
+
+
+class BatchResult:
+    """
+    Per-row window features and first address-rule hit, plus per-transaction rule hits
+    `features` maps each address feature to an array in row order; `reasons`
+    has the reason of the first matching address rule (or None) per row and
+    `tx_reasons` the reasons of all matching transaction rules per transaction.
+    """
+
+    def __init__(self, batch, features, reasons, tx_reasons):
+        self.batch = batch
+        self.features = features
+        self.reasons = reasons
+        self.tx_reasons = tx_reasons
+
+    def row_features(self, row):
+        """Feature dict of one row, as the streaming detector's window_features returns it"""
+        return {name: values[row].item() for name, values in self.features.items()}
+
+    def flagged(self):
+        """(tx_index, address, reason) for every row an address rule matched"""
+        batch = self.batch
+        for row, reason in enumerate(self.reasons):
+            if reason is not None:
+                yield int(batch.tx_index[row]), batch.addresses[batch.counterparty_ids[row]], reason
+
+
+def _window_rows(keys, group_start, length):
+    """First row still inside each row's window of `length` buckets"""
+    first = np.searchsorted(keys, keys - length, side="right")
+    return np.maximum(first, group_start)
+
+
+def _window_sums(values, first, position):
+    """Sum of `values` over rows first..position (inclusive) for every row"""
+    prefix = np.zeros(len(values) + 1, dtype=values.dtype)
+    np.cumsum(values, out=prefix[1:])
+    return prefix[position + 1] - prefix[first]
+
+
+def window_features(batch, thresholds=THRESHOLDS, bucket_seconds=AGGREGATE_BUCKET_SECONDS):
+    """
+    Address-scope features for every row, computed like WindowAggregates
+    Events are bucketed by time; an event that arrives older than the newest
+    bucket seen for its address counts in that newest bucket. A row sees the
+    rows of its address whose bucket lies within each window of its own bucket.
+    """
+    n = len(batch)
+    features = {name: np.zeros(n, dtype=np.int64) for name in
+                ("tx_count", "rapid_tx_count", "unusual_program_count", "bridge_count")}
+    features["sol_volume"] = np.zeros(n, dtype=np.float64)
+    features["usd_volume"] = np.zeros(n, dtype=np.float64)
+    if not n:
+        return features
+
+    # Group rows by address, keeping arrival order within each address
+    order = np.argsort(batch.counterparty_ids, kind="stable")
+    ids = batch.counterparty_ids[order]
+    starts = np.r_[True, ids[1:] != ids[:-1]]
+    group = np.cumsum(starts) - 1
+    group_start = np.flatnonzero(starts)[group]
+    position = np.arange(n)
+
+    # Effective bucket: running maximum per address, encoded as group * span + bucket
+    buckets = np.floor_divide(batch.timestamps[order], bucket_seconds).astype(np.int64)
+    buckets -= buckets.min()
+    span = int(buckets.max()) + 1 + max(window_buckets(thresholds[key], bucket_seconds)
+                                        for key in ACTIVITY_WINDOWS.values())
+    keys = np.maximum.accumulate(group * span + buckets)
+
+    first = {
+        name: _window_rows(keys, group_start, window_buckets(thresholds[key], bucket_seconds))
+        for name, key in ACTIVITY_WINDOWS.items()
+    }
+    unusual = first["unusual"]
+    # Integer units keep the sums exact (int64 wraparound cancels in the differences)
+    sol_units = np.rint(batch.sol[order] * SOL_UNITS).astype(np.int64)
+    usd_units = np.rint(batch.usd[order] * USD_UNITS).astype(np.int64)
+    unusual_programs = np.zeros(n, dtype=np.int64)
+    for column, program_id in enumerate(batch.program_ids):
+        if program_id in thresholds["unusual_program_ids"]:
+            seen = _window_sums(batch.programs[order, column].astype(np.int64), unusual, position)
+            unusual_programs += seen > 0
+
+    sorted_features = {
+        "tx_count": position - unusual + 1,
+        "rapid_tx_count": position - first["rapid"] + 1,
+        "sol_volume": _window_sums(sol_units, unusual, position) / SOL_UNITS,
+        "usd_volume": _window_sums(usd_units, unusual, position) / USD_UNITS,
+        "unusual_program_count": unusual_programs,
+        "bridge_count": _window_sums(batch.bridges[order], first["bridge"], position),
+    }
+    for name, values in sorted_features.items():
+        features[name][order] = values
+    return features
+
+
+def _rule_mask(rule, columns, n):
+    mask = np.ones(n, dtype=bool)
+    for feature, op, threshold in rule.conditions:
+        mask &= np.asarray(op(columns[feature], threshold), dtype=bool)
+    return mask
+
+
+def _render(template, thresholds, columns, row):
+    return template.format_map(dict(thresholds, **{name: values[row].item() for name, values in columns.items()}))
+
+
+def analyze_batch(batch, rules, bucket_seconds=AGGREGATE_BUCKET_SECONDS):
+    """Evaluate the rule engine's plans over a whole batch; returns a BatchResult"""
+    plans, thresholds = rules.compiled
+    features = window_features(batch, thresholds, bucket_seconds)
+
+    # Address scope: first matching rule per row, in plan order
+    reasons = [None] * len(batch)
+    undecided = np.ones(len(batch), dtype=bool)
+    for rule in plans["address"]:
+        mask = _rule_mask(rule, features, len(batch)) & undecided
+        for row in np.flatnonzero(mask):
+            reasons[row] = _render(rule.reason, thresholds, features, row)
+        undecided &= ~mask
+
+    # Transaction scope: every matching rule per transaction
+    tx_count = len(batch.signatures)
+    tx_reasons = [[] for _ in range(tx_count)]
+    for rule in plans["transaction"]:
+        for index in np.flatnonzero(_rule_mask(rule, batch.tx_columns, tx_count)):
+            tx_reasons[index].append(_render(rule.reason, thresholds, batch.tx_columns, index))
+    return BatchResult(batch, features, reasons, tx_reasons)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-analyze saved transaction history")
+    parser.add_argument("history", help="Transaction history JSON (list of decoded transactions)")
+    args = parser.parse_args()
+
+    from solana_rpc import SolanaRPC
+    with open(args.history, "r") as f:
+        transactions = [DecodedTransaction.from_dict(tx) for tx in json.load(f)]
+    rules = RuleEngine(THRESHOLDS)
+    prices = {}
+    rpc = SolanaRPC()
+
+    def price_lookup(mint):
+        if mint not in prices:
+            prices[mint] = rpc.get_token_price_usd(mint)
+        return prices[mint]
+
+    batch = EventBatch.from_transactions(transactions, rules, price_lookup)
+    result = analyze_batch(batch, rules)
+    for index, reasons in enumerate(result.tx_reasons):
+        for reason in reasons:
+            print(f"{batch.signatures[index]}: {reason}")
+    for index, address, reason in result.flagged():
+        print(f"{batch.signatures[index]} {address[:8]}...{address[-8:]}: {reason}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
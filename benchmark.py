@@ -0,0 +1,707 @@
+"""
+Throughput benchmark for the transaction decode and detection pipeline
+Replays a corpus of getTransaction payloads through WalletMonitor,
+SuspiciousActivityDetector and PhishingDetector with the RPC and
+notification services stubbed out
+
+Usage:
+    python benchmark.py                              # synthetic corpus
+    python benchmark.py --corpus recorded.jsonl      # recorded payloads
+    python benchmark.py --record SIG [SIG ...] --corpus recorded.jsonl
+    python benchmark.py --json > baseline.json
+    python benchmark.py --compare baseline.json      # exit 1 on regression
+    python benchmark.py --model-memory 1000000       # dict vs record events
+    python benchmark.py --batch-check                # batch vs streaming analysis
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_WALLET = "BenchWa11et1111111111111111111111111111111"
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+JUPITER_PROGRAM = "JUP4Fb2cqiRUcaTHdrPC8h2gNsA2ETXiPDD33WcGuJB"
+RAYDIUM_PROGRAM = "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8"
+KNOWN_MINTS = [
+    ("EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v", 6),
+    ("Es9vMFrzaCERz1aZHBKz9ZwrZcpt1mMT8ffvAJhY7kF", 6),
+    ("DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263", 5),
+]
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# Lowered rule thresholds for --batch-check, so every rule fires on the synthetic corpus
+BATCH_CHECK_THRESHOLDS = {
+    "large_sol_transfer": 8.0,
+    "high_value_transfer": 20000.0,
+    "contract_interaction_count": 1,
+    "obfuscation_min_transfers": 2,
+    "obfuscation_min_addresses": 2,
+}
+
+
+class StubRPC:
+    """Offline stand-in for SolanaRPC with deterministic answers"""
+
+    def get_token_price_usd(self, mint):
+        return 1.0 if mint in dict(KNOWN_MINTS) else 0
+
+    def get_token_metadata(self, mint):
+        return {"name": "Bench", "symbol": "BNCH"}
+
+    def get_token_holders(self, mint):
+        return 100
+
+    def get_recent_signatures(self, address, limit=10, **kwargs):
+        return []
+
+    def get_multiple_accounts(self, accounts, batch_size=100):
+        return {}
+
+    def get_transaction(self, signature):
+        return None
+
+    def __getattr__(self, name):
+        # Any other RPC call answers "nothing found"
+        return lambda *args, **kwargs: None
+
+
+class StubNotificationService:
+    """Notification service that swallows every alert"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class SyntheticCorpus:
+    """Generates getTransaction payloads shaped like mainnet jsonParsed results"""
+
+    def __init__(self, seed=1337):
+        self.random = random.Random(seed)
+        self.counter = 0
+
+    def address(self):
+        return "".join(self.random.choice(BASE58) for _ in range(44))
+
+    def _base(self, account_keys, instructions, pre, post, pre_tokens=None, post_tokens=None, logs=None, inner=None):
+        self.counter += 1
+        return {
+            "blockTime": 1_700_000_000 + self.counter,
+            "slot": 250_000_000 + self.counter,
+            "transaction": {
+                "signatures": [f"benchsig{self.counter:012d}{self.address()[:40]}"],
+                "message": {
+                    "accountKeys": [{"pubkey": key, "signer": i == 0, "writable": True} for i, key in enumerate(account_keys)],
+                    "instructions": instructions
+                }
+            },
+            "meta": {
+                "err": None,
+                "fee": 5000,
+                "preBalances": pre,
+                "postBalances": post,
+                "preTokenBalances": pre_tokens or [],
+                "postTokenBalances": post_tokens or [],
+                "innerInstructions": inner or [],
+                "logMessages": logs or []
+            }
+        }
+
+    @staticmethod
+    def _token_balance(index, mint, owner, amount, decimals):
+        return {
+            "accountIndex": index,
+            "mint": mint,
+            "owner": owner,
+            "uiTokenAmount": {"amount": str(amount), "decimals": decimals, "uiAmount": amount / 10 ** decimals}
+        }
+
+    def sol_transfer(self):
+        other = self.address()
+        lamports = self.random.randint(1_000, 5_000_000_000)
+        incoming = self.random.random() < 0.5
+        source, destination = (other, BENCH_WALLET) if incoming else (BENCH_WALLET, other)
+        keys = [source, destination, SYSTEM_PROGRAM]
+        pre = [10_000_000_000, 1_000_000_000, 1]
+        post = [pre[0] - lamports - 5000, pre[1] + lamports, 1]
+        instruction = {
+            "program": "system", "programId": SYSTEM_PROGRAM,
+            "parsed": {"type": "transfer", "info": {"source": source, "destination": destination, "lamports": lamports}}
+        }
+        return self._base(keys, [instruction], pre, post)
+
+    def token_transfer(self):
+        other = self.address()
+        mint, decimals = self.random.choice(KNOWN_MINTS + [(self.address(), 6)])
+        amount = self.random.randint(1, 10 ** (decimals + 4))
+        incoming = self.random.random() < 0.5
+        source, destination = (other, BENCH_WALLET) if incoming else (BENCH_WALLET, other)
+        keys = [source, self.address(), self.address(), TOKEN_PROGRAM]
+        pre = [1_000_000_000, 2_039_280, 2_039_280, 1]
+        post = [pre[0] - 5000, 2_039_280, 2_039_280, 1]
+        pre_tokens = [
+            self._token_balance(1, mint, source, amount * 2, decimals),
+            self._token_balance(2, mint, destination, 0, decimals)
+        ]
+        post_tokens = [
+            self._token_balance(1, mint, source, amount, decimals),
+            self._token_balance(2, mint, destination, amount, decimals)
+        ]
+        instruction = {
+            "program": "spl-token", "programId": TOKEN_PROGRAM,
+            "parsed": {"type": "transfer", "info": {"source": source, "destination": destination, "mint": mint, "amount": str(amount)}}
+        }
+        return self._base(keys, [instruction], pre, post, pre_tokens, post_tokens)
+
+    def swap(self, program_id, hops=2):
+        """Swap through `hops` pools; only the route program appears at the top level"""
+        mint_in, dec_in = self.random.choice(KNOWN_MINTS)
+        mint_out, dec_out = self.random.choice(KNOWN_MINTS + [(self.address(), 6)])
+        amount_in = self.random.randint(10 ** dec_in, 10 ** (dec_in + 3))
+        amount_out = self.random.randint(10 ** dec_out, 10 ** (dec_out + 3))
+        pools = [self.address() for _ in range(hops)]
+        keys = [BENCH_WALLET, self.address(), self.address()] + [self.address() for _ in range(hops * 2)] + [program_id, TOKEN_PROGRAM]
+        pre = [5_000_000_000] + [2_039_280] * (len(keys) - 3) + [1, 1]
+        post = [pre[0] - 5000] + pre[1:]
+        pre_tokens = [
+            self._token_balance(1, mint_in, BENCH_WALLET, amount_in * 2, dec_in),
+            self._token_balance(2, mint_out, BENCH_WALLET, 0, dec_out)
+        ]
+        post_tokens = [
+            self._token_balance(1, mint_in, BENCH_WALLET, amount_in, dec_in),
+            self._token_balance(2, mint_out, BENCH_WALLET, amount_out, dec_out)
+        ]
+        inner = []
+        for hop, pool in enumerate(pools):
+            vault_in, vault_out = 3 + hop * 2, 4 + hop * 2
+            # Intermediate hops net to zero for the pools' combined vaults
+            pre_tokens.append(self._token_balance(vault_in, mint_in, pool, 10 ** (dec_in + 6), dec_in))
+            pre_tokens.append(self._token_balance(vault_out, mint_out, pool, 10 ** (dec_out + 6), dec_out))
+            share_in = amount_in if hop == 0 else 0
+            share_out = amount_out if hop == hops - 1 else 0
+            post_tokens.append(self._token_balance(vault_in, mint_in, pool, 10 ** (dec_in + 6) + share_in, dec_in))
+            post_tokens.append(self._token_balance(vault_out, mint_out, pool, 10 ** (dec_out + 6) - share_out, dec_out))
+            inner.append({"index": 0, "instructions": [
+                {"programId": RAYDIUM_PROGRAM, "accounts": [pool, keys[vault_in], keys[vault_out]], "data": "bench"},
+                {"program": "spl-token", "programId": TOKEN_PROGRAM, "parsed": {"type": "transfer", "info": {
+                    "source": keys[1], "destination": keys[vault_in], "amount": str(share_in), "authority": BENCH_WALLET}}}
+            ]})
+        logs = [
+            f"Program {program_id} invoke [1]",
+            "Program log: Instruction: Route",
+            f"Program log: price impact: {self.random.uniform(0, 8):.2f}%",
+            f"Program log: slippage: {self.random.uniform(0, 1):.2f}%",
+            f"Program {program_id} success"
+        ]
+        instruction = {"programId": program_id, "accounts": keys[:5], "data": "bench"}
+        return self._base(keys, [instruction], pre, post, pre_tokens, post_tokens, logs, inner)
+
+    def many_instructions(self, count=60):
+        """A batched transaction with `count` top-level SOL transfers"""
+        recipients = [self.address() for _ in range(count)]
+        keys = [BENCH_WALLET] + recipients + [SYSTEM_PROGRAM]
+        lamports = 10_000
+        pre = [50_000_000_000] + [0] * count + [1]
+        post = [pre[0] - lamports * count - 5000] + [lamports] * count + [1]
+        instructions = [
+            {"program": "system", "programId": SYSTEM_PROGRAM,
+             "parsed": {"type": "transfer", "info": {"source": BENCH_WALLET, "destination": r, "lamports": lamports}}}
+            for r in recipients
+        ]
+        return self._base(keys, instructions, pre, post)
+
+    def generate(self, size):
+        """Generate a mixed corpus of `size` transactions"""
+        makers = [
+            (0.35, self.sol_transfer),
+            (0.30, self.token_transfer),
+            (0.15, lambda: self.swap(JUPITER_PROGRAM, hops=self.random.randint(1, 4))),
+            (0.15, lambda: self.swap(RAYDIUM_PROGRAM, hops=1)),
+            (0.05, lambda: self.many_instructions(self.random.randint(50, 80))),
+        ]
+        corpus = []
+        for _ in range(size):
+            roll = self.random.random()
+            for weight, make in makers:
+                roll -= weight
+                if roll <= 0:
+                    break
+            corpus.append(make())
+        return corpus
+
+
+def load_corpus(path):
+    """Load recorded getTransaction payloads (one JSON object per line)"""
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_corpus(path, signatures):
+    """Fetch transactions from the configured RPC and append them to a corpus file"""
+    from solana_rpc import SolanaRPC
+    rpc = SolanaRPC()
+    recorded = 0
+    with open(path, "a") as f:
+        for signature in signatures:
+            tx = rpc.get_transaction(signature)
+            if tx:
+                f.write(json.dumps(tx) + "\n")
+                recorded += 1
+            else:
+                print(f"Could not fetch transaction {signature}", file=sys.stderr)
+    return recorded
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(stage, samples_ns):
+    """Turn per-transaction timings into throughput and latency figures"""
+    total = sum(samples_ns) or 1
+    return {
+        "stage": stage,
+        "transactions": len(samples_ns),
+        "tx_per_second": round(len(samples_ns) / (total / 1e9), 1),
+        "p50_ms": round(percentile(samples_ns, 50) / 1e6, 4),
+        "p99_ms": round(percentile(samples_ns, 99) / 1e6, 4),
+    }
+
+
+# JSON stores of the monitors and detectors built for this run
+STORES = []
+
+
+def register_stores(*owners):
+    """Remember the JSON stores of monitors and detectors, to flush before leaving the work dir"""
+    from json_store import JsonStore
+    for owner in owners:
+        STORES.extend(value for value in vars(owner).values() if isinstance(value, JsonStore))
+
+
+@contextlib.contextmanager
+def bench_workdir():
+    """
+    Run inside a temp dir that receives every state file and log
+    Stores are flushed before the old cwd is restored, so their exit-time
+    flushes have nothing left to write, and the dir is then removed.
+    """
+    workdir = tempfile.mkdtemp(prefix="walletwatch-bench-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield workdir
+    finally:
+        for store in STORES:
+            store.flush()
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def build_pipeline(wallet):
+    """Wire the real monitor and detectors to the offline stubs"""
+    from honeypot_detector import HoneypotDetector
+    from phishing_detector import PhishingDetector
+    from suspicious_activity import SuspiciousActivityDetector
+    from wallet_monitor import WalletMonitor
+
+    rpc = StubRPC()
+    honeypot_detector = HoneypotDetector(rpc)
+    suspicious_detector = SuspiciousActivityDetector(rpc)
+    phishing_detector = PhishingDetector(rpc)
+    # Detectors are timed as separate stages, so the monitor only decodes
+    monitor = WalletMonitor(wallet, rpc, honeypot_detector, StubNotificationService())
+    monitor.log_message = lambda msg: None
+    register_stores(monitor, honeypot_detector, suspicious_detector, phishing_detector)
+    return monitor, suspicious_detector, phishing_detector
+
+
+def run_benchmark(corpus, wallet=BENCH_WALLET, warmup=200):
+    """Time every stage of the pipeline over a corpus"""
+    monitor, suspicious_detector, phishing_detector = build_pipeline(wallet)
+    save_history = monitor.save_transaction_history
+    monitor.save_transaction_history = lambda tx=None: None
+
+    for tx in corpus[:warmup]:
+        monitor.decode_transaction(tx)
+    monitor.transaction_history = []
+
+    decode_ns, suspicious_ns, phishing_ns = [], [], []
+    clock = time.perf_counter_ns
+    for tx in corpus:
+        start = clock()
+        decoded = monitor.decode_transaction(tx)
+        decode_ns.append(clock() - start)
+        if not decoded:
+            continue
+
+        start = clock()
+        suspicious_detector.analyze_transaction(decoded)
+        suspicious_ns.append(clock() - start)
+
+        start = clock()
+        phishing_detector.analyze_transaction(decoded)
+        phishing_ns.append(clock() - start)
+
+    # History persistence is part of the real per-transaction cost: the
+    # journal append per transaction plus the debounced rewrite
+    monitor.save_transaction_history = save_history
+    start = clock()
+    monitor.save_transaction_history(monitor.transaction_history[-1])
+    monitor.history_store.flush()
+    save_ns = clock() - start
+
+    end_to_end = [d + s + p for d, s, p in zip(decode_ns, suspicious_ns, phishing_ns)]
+    return {
+        "stages": [
+            summarize("decode", decode_ns),
+            summarize("suspicious", suspicious_ns),
+            summarize("phishing", phishing_ns),
+            summarize("end_to_end", end_to_end),
+        ],
+        "history_save_ms": round(save_ns / 1e6, 3),
+    }
+
+
+def measure_memory(corpus, wallet=BENCH_WALLET, per=10_000):
+    """Bytes retained by decoded history per `per` transactions"""
+    monitor, _, _ = build_pipeline(wallet)
+    monitor.save_transaction_history = lambda tx=None: None
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    decoded = 0
+    for tx in corpus:
+        if monitor.decode_transaction(tx):
+            decoded += 1
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    scale = per / max(decoded, 1)
+    return {
+        "retained_bytes_per_10k": int(retained * scale),
+        "peak_bytes_per_10k": int(peak * scale),
+    }
+
+
+def measure_event_model(count):
+    """Compare memory held by `count` transfer events as dicts vs TransferEvent records"""
+    from models import TransferEvent
+    corpus = SyntheticCorpus()
+    counterparties = [corpus.address() for _ in range(1000)]
+    mints = [corpus.address() for _ in range(100)]
+
+    def as_dict(i):
+        return {
+            "type": "token_transfer", "direction": "Received" if i % 2 else "Sent",
+            "amount": i * 0.5, "other_address": counterparties[i % 1000],
+            "token_name": "USDC", "mint": mints[i % 100], "decimals": 6
+        }
+
+    def as_record(i):
+        return TransferEvent(
+            "token_transfer", "Received" if i % 2 else "Sent", i * 0.5,
+            counterparties[i % 1000], "USDC", mints[i % 100], 6
+        )
+
+    results = {}
+    for name, build in (("dict", as_dict), ("record", as_record)):
+        tracemalloc.start()
+        events = [build(i) for i in range(count)]
+        results[f"{name}_bytes"], _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del events
+    results["events"] = count
+    results["reduction"] = round(1 - results["record_bytes"] / results["dict_bytes"], 3)
+    return results
+
+
+def replay_fixture(corpus, monitor, rng, pool, single_counterparty=False, weights=None):
+    """
+    Decode a corpus and place it on a jittered block-time axis
+    Counterparties are redrawn from `pool` (by `weights`, if given); with
+    `single_counterparty` every event of a transaction goes to the same one. Block times mostly advance a
+    few seconds, sometimes jump 15 minutes, and some arrive late.
+    """
+    decoded = []
+    block_time = 1_700_000_000
+    for tx in corpus:
+        tx = monitor.decode_transaction(tx)
+        if not tx:
+            continue
+        block_time += 900 if rng.random() < 0.01 else rng.choice((0, 1, 2, 5, 20))
+        tx.block_time = block_time - (rng.randint(1, 40) if rng.random() < 0.1 else 0)
+        counterparty = rng.choices(pool, weights)[0]
+        for event in tx.events:
+            if "other_address" in event:
+                event["other_address"] = counterparty if single_counterparty else rng.choices(pool, weights)[0]
+        decoded.append(tx)
+    return decoded
+
+
+def window_check(decoded, rpc):
+    """
+    Batch window state against the streaming trackers, row for row
+    Every counterparty is tracked (as in the batch) and the thresholds are
+    lowered so every rule fires; this checks the vectorized arithmetic.
+    """
+    from batch_analysis import EventBatch, analyze_batch
+    from rule_engine import RuleEngine
+    from suspicious_activity import THRESHOLDS, SuspiciousActivityDetector
+
+    clock = time.perf_counter_ns
+    detector = SuspiciousActivityDetector(rpc)
+    detector.persist = False
+    register_stores(detector)
+    detector.rules = RuleEngine(dict(THRESHOLDS, **BATCH_CHECK_THRESHOLDS), path=None)
+    expected = []
+    expected_tx = []
+    start = clock()
+    for tx in decoded:
+        features = detector.rules.extract(tx, rpc.get_token_price_usd)
+        expected_tx.append([hit.reason for hit in detector.rules.evaluate("transaction", features)])
+        for address in features["counterparties"]:
+            detector.track_address_activity(address, tx, features, [], now=tx.block_time)
+            window = detector.window_features(address, now=tx.block_time)
+            hits = detector.rules.evaluate("address", window)
+            expected.append((window, hits[0].reason if hits else None))
+    streaming_ns = clock() - start
+
+    rules = detector.rules
+    start = clock()
+    batch = EventBatch.from_transactions(decoded, rules, rpc.get_token_price_usd)
+    build_ns = clock() - start
+    start = clock()
+    result = analyze_batch(batch, rules)
+    analyze_ns = clock() - start
+
+    mismatches = []
+    for row, (window, reason) in enumerate(expected):
+        got = (result.row_features(row), result.reasons[row])
+        if got != (window, reason):
+            mismatches.append({"row": row, "streaming": [window, reason], "batch": list(got)})
+    for index, reasons in enumerate(expected_tx):
+        if result.tx_reasons[index] != reasons:
+            mismatches.append({"transaction": index, "streaming": reasons, "batch": result.tx_reasons[index]})
+    return {
+        "rows": len(expected),
+        "transactions": len(decoded),
+        "flagged_rows": sum(1 for _, reason in expected if reason),
+        "flagged_transactions": sum(1 for reasons in expected_tx if reasons),
+        "mismatches": mismatches[:20],
+        "mismatch_count": len(mismatches) + (len(batch) != len(expected)),
+        "streaming_ms": round(streaming_ns / 1e6, 1),
+        "batch_build_ms": round(build_ns / 1e6, 1),
+        "batch_analyze_ms": round(analyze_ns / 1e6, 1),
+    }
+
+
+def verdict_check(decoded, rpc):
+    """
+    Verdicts of SuspiciousActivityDetector.analyze_transaction against the
+    verdicts the batch predicts, with the shipped thresholds
+    Each transaction has one counterparty, so the streaming early exit never
+    leaves a counterparty untracked. The prediction replays analyze_transaction
+    over the batch columns: a known suspicious counterparty first, then the
+    address rules. Addresses flagged by streaming-only checks (token actions)
+    are fed into the prediction as they are raised, and verdicts from
+    streaming-only state (fund traces, creator flags) are counted, not compared.
+    Sybil grouping is switched off: it is streaming-only and would flag most
+    of the pool, leaving nothing for the rules to decide.
+    """
+    from batch_analysis import EventBatch, analyze_batch
+    from suspicious_activity import SuspiciousActivityDetector
+
+    detector = SuspiciousActivityDetector(rpc)
+    detector.persist = False
+    register_stores(detector)
+    detector._check_for_sybil_pattern = lambda address, features: None
+    rules = detector.rules
+    rule_names = {rule.name for plan in rules.plans.values() for rule in plan}
+    raised = []
+    detector.listeners.append(lambda kind, address, reason, code: raised.append((address, code)))
+    verdicts = []
+    for tx in decoded:
+        del raised[:]
+        verdict = detector.analyze_transaction(tx, now=tx.block_time)
+        verdicts.append((verdict, list(raised)))
+
+    result = analyze_batch(EventBatch.from_transactions(decoded, rules, rpc.get_token_price_usd), rules)
+    rows = {int(index): row for row, index in enumerate(result.batch.tx_index)}
+    flagged = set()
+    mismatches = []
+    stateful = known = 0
+    for index, (verdict, raised) in enumerate(verdicts):
+        row = rows.get(index)
+        address = row is not None and result.batch.addresses[result.batch.counterparty_ids[row]]
+        short = address and f"{address[:8]}...{address[-8:]}"
+        if row is None:
+            predicted = (False, "")
+        elif address in flagged:
+            known += 1
+            predicted = (True, f"Interaction with known suspicious address: {short}")
+        elif result.reasons[row] is not None:
+            predicted = (True, f"Suspicious activity detected for address {short}: {result.reasons[row]}")
+        else:
+            predicted = (False, "")
+        if row is not None and address not in flagged:
+            if result.reasons[row] is not None or result.tx_reasons[index]:
+                flagged.add(address)
+        flagged.update(a for a, code in raised if code not in rule_names)
+
+        if verdict[1].startswith("Funds traced") or (verdict != predicted and predicted == (False, "") and any(
+            code.startswith("created_") for _, code in raised
+        )):
+            stateful += 1
+        elif verdict != predicted:
+            mismatches.append({"transaction": index, "streaming": list(verdict), "batch": list(predicted)})
+    flagged_tx = sum(1 for (is_suspicious, _), _ in verdicts if is_suspicious)
+    return {
+        "transactions": len(decoded),
+        "flagged_transactions": flagged_tx,
+        "known_counterparty": known,
+        "rule_flags": sum(1 for (_, reason), _ in verdicts if reason.startswith("Suspicious activity detected")),
+        "stateful_verdicts": stateful,
+        "mismatches": mismatches[:20],
+        "mismatch_count": len(mismatches),
+    }
+
+
+def batch_check(corpus, wallet=BENCH_WALLET, seed=1337, pool_size=20, verdict_pool_size=5000):
+    """
+    Differential check of batch_analysis against the streaming detector
+    Runs window_check on a small, busy counterparty pool and verdict_check
+    on a larger one. Returns a report of both; "mismatch_count" is their total.
+    """
+    monitor, _, _ = build_pipeline(wallet)
+    monitor.save_transaction_history = lambda tx=None: None
+    rpc = StubRPC()
+    rng = random.Random(seed)
+    pool = [SyntheticCorpus(seed + i).address() for i in range(max(pool_size, verdict_pool_size))]
+    windows = window_check(replay_fixture(corpus, monitor, rng, pool[:pool_size]), rpc)
+    # A few busy counterparties and a long tail of rare ones
+    weights = [1 / (rank + 1) for rank in range(verdict_pool_size)]
+    verdicts = verdict_check(replay_fixture(corpus, monitor, rng, pool[:verdict_pool_size], True, weights), rpc)
+    return {
+        "windows": windows,
+        "verdicts": verdicts,
+        "mismatch_count": windows["mismatch_count"] + verdicts["mismatch_count"],
+    }
+
+
+def print_report(report):
+    """Print a human readable report"""
+    print(f"Corpus: {report['corpus_size']} transactions ({report['corpus_source']})")
+    print(f"{'stage':<12}{'tx/s':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for stage in report["stages"]:
+        print(f"{stage['stage']:<12}{stage['tx_per_second']:>12}{stage['p50_ms']:>12}{stage['p99_ms']:>12}")
+    print(f"History save: {report['history_save_ms']} ms")
+    memory = report["memory"]
+    print(f"Memory per 10k tx: retained {memory['retained_bytes_per_10k'] / 1e6:.1f} MB, "
+          f"peak {memory['peak_bytes_per_10k'] / 1e6:.1f} MB")
+
+
+def compare_reports(report, baseline, tolerance):
+    """Return the list of stages whose throughput regressed beyond tolerance"""
+    previous = {s["stage"]: s for s in baseline.get("stages", [])}
+    regressions = []
+    for stage in report["stages"]:
+        old = previous.get(stage["stage"])
+        if old and stage["tx_per_second"] < old["tx_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{stage['stage']}: {stage['tx_per_second']} tx/s vs baseline {old['tx_per_second']} tx/s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the decode and detection pipeline")
+    parser.add_argument("--corpus", help="JSONL file of recorded getTransaction payloads")
+    parser.add_argument("--record", nargs="+", metavar="SIGNATURE", help="Fetch signatures into --corpus and exit")
+    parser.add_argument("--size", type=int, default=5000, help="Synthetic corpus size")
+    parser.add_argument("--wallet", default=BENCH_WALLET, help="Wallet the recorded corpus belongs to")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop vs baseline")
+    parser.add_argument("--model-memory", type=int, metavar="EVENTS", help="Measure event model memory and exit")
+    parser.add_argument("--batch-check", action="store_true", help="Compare batch and streaming analysis and exit")
+    args = parser.parse_args()
+
+    if args.model_memory:
+        result = measure_event_model(args.model_memory)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(f"{result['events']} events: dicts {result['dict_bytes'] / 1e6:.1f} MB, "
+                  f"records {result['record_bytes'] / 1e6:.1f} MB ({result['reduction']:.0%} smaller)")
+        return
+
+    if args.record:
+        if not args.corpus:
+            parser.error("--record requires --corpus")
+        print(f"Recorded {record_corpus(args.corpus, args.record)} transactions to {args.corpus}")
+        return
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        source = args.corpus
+    else:
+        corpus = SyntheticCorpus(args.seed).generate(args.size)
+        source = "synthetic"
+
+    # Monitor and detectors write their JSON state and logs relative to cwd
+    if args.batch_check:
+        with bench_workdir():
+            result = batch_check(corpus, wallet=args.wallet, seed=args.seed)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            windows, verdicts = result["windows"], result["verdicts"]
+            print(f"windows: {windows['rows']} rows from {windows['transactions']} transactions, "
+                  f"{windows['flagged_rows']} rows and {windows['flagged_transactions']} transactions flagged, "
+                  f"{windows['mismatch_count']} mismatches")
+            print(f"streaming {windows['streaming_ms']} ms, batch build {windows['batch_build_ms']} ms, "
+                  f"batch analyze {windows['batch_analyze_ms']} ms")
+            print(f"verdicts: {verdicts['transactions']} transactions, {verdicts['flagged_transactions']} flagged "
+                  f"({verdicts['known_counterparty']} by known counterparty, {verdicts['rule_flags']} by address "
+                  f"rules, {verdicts['stateful_verdicts']} by streaming-only checks), "
+                  f"{verdicts['mismatch_count']} mismatches")
+            for mismatch in windows["mismatches"] + verdicts["mismatches"]:
+                print(f"MISMATCH {json.dumps(mismatch)}", file=sys.stderr)
+        if result["mismatch_count"]:
+            sys.exit(1)
+        return
+
+    with bench_workdir():
+        report = run_benchmark(corpus, wallet=args.wallet)
+        report["memory"] = measure_memory(corpus, wallet=args.wallet)
+    report["corpus_size"] = len(corpus)
+    report["corpus_source"] = source
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
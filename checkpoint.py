@@ -0,0 +1,204 @@
+"""
+Crash-safe poll checkpoints for the Solana wallet monitor
+Records, per wallet, the last processed signature/slot and the signatures
+that were discovered but not yet decoded, so a restart resumes exactly
+where polling stopped
+
+Monitors only mark wallets as changed; the file is rewritten once
+CHECKPOINT_FLUSH_EVERY updates have piled up or by a writer thread every
+CHECKPOINT_FLUSH_SECONDS, so many wallets sharing one file cost one write per
+interval rather than one per wallet per poll. Each wallet's JSON is cached
+and re-encoded only when it changed. Every write is a consistent snapshot:
+a crash loses at most the last interval, and discovery resumes from the
+older cursor it recorded.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from config import CHECKPOINT_FILE, CHECKPOINT_FLUSH_EVERY, CHECKPOINT_FLUSH_SECONDS
+
+class PollCheckpoint:
+    """
+    Batched, atomically written checkpoint file shared by wallet monitors
+
+    File layout:
+        {"version": 1, "wallets": {wallet: {"last_signature": str, "last_slot": int,
+                                            "pending": [{"signature": str, "slot": int}]}}}
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=CHECKPOINT_FILE, flush_every=CHECKPOINT_FLUSH_EVERY, flush_seconds=CHECKPOINT_FLUSH_SECONDS):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wallets = self.load()
+        self.encoded = {}                # wallet -> cached '"wallet": {...}' JSON fragment
+        self.dirty = set(self.wallets)   # Wallets changed since their fragment was encoded
+        self.dirty_updates = 0
+        self.last_flush = time.time()
+        self.thread = None
+
+    def load(self):
+        """Load checkpoints from file"""
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    return {}
+            if data.get("version") == self.VERSION:
+                wallets = data.get("wallets", {})
+                # Pending signatures are kept as an ordered dict in memory
+                for entry in wallets.values():
+                    entry["pending"] = {p["signature"]: p.get("slot", 0) for p in entry.get("pending", [])}
+                return wallets
+        return {}
+
+    def adopt(self, path, wallets):
+        """
+        Import entries for `wallets` from another checkpoint file when they
+        are further along than ours (e.g. after the shard count changed)
+        """
+        if os.path.abspath(path) == os.path.abspath(self.path) or not os.path.exists(path):
+            return
+        other = PollCheckpoint(path)
+        with self.lock:
+            for wallet in wallets:
+                theirs = other.wallets.get(wallet)
+                ours = self.wallets.get(wallet)
+                if theirs and (not ours or theirs["last_slot"] > ours["last_slot"]):
+                    self.wallets[wallet] = theirs
+                    self._changed(wallet)
+        self.flush(force=True)
+
+    def _changed(self, wallet):
+        # Caller holds self.lock
+        self.dirty.add(wallet)
+        self.dirty_updates += 1
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name=f"checkpoint-{os.path.basename(self.path)}")
+            self.thread.daemon = True
+            self.thread.start()
+            atexit.register(self.flush, True)
+
+    def _entry(self, wallet):
+        return self.wallets.setdefault(wallet, {"last_signature": None, "last_slot": 0, "pending": {}})
+
+    @staticmethod
+    def _pending_list(entry):
+        return [{"signature": sig, "slot": slot} for sig, slot in entry["pending"].items()]
+
+    def get(self, wallet):
+        """Get the checkpoint entry for a wallet (None if never polled)"""
+        with self.lock:
+            entry = self.wallets.get(wallet)
+            return dict(entry, pending=self._pending_list(entry)) if entry else None
+
+    def cursor(self, wallet):
+        """Newest signature already discovered for a wallet; discovery resumes after it"""
+        with self.lock:
+            entry = self.wallets.get(wallet)
+            if not entry:
+                return None
+            if entry["pending"]:
+                return next(reversed(entry["pending"]))
+            return entry["last_signature"]
+
+    def pending(self, wallet):
+        """Signatures discovered but not yet processed, oldest first"""
+        with self.lock:
+            entry = self.wallets.get(wallet)
+            return self._pending_list(entry) if entry else []
+
+    def mark_pending(self, wallet, signatures):
+        """
+        Record discovered signatures (oldest first) before they are decoded
+        They are written with the next flush, together with the cursor they
+        move; until then the file still points discovery at them
+        """
+        if not signatures:
+            return
+        with self.lock:
+            entry = self._entry(wallet)
+            for sig in signatures:
+                entry["pending"].setdefault(sig["signature"], sig.get("slot", 0))
+            self._changed(wallet)
+        self.flush()
+
+    def discard_pending(self, wallet, signatures):
+        """Forget pending signatures that were not queued; discovery will find them again"""
+        if not signatures:
+            return
+        with self.lock:
+            entry = self._entry(wallet)
+            for sig in signatures:
+                entry["pending"].pop(sig["signature"], None)
+            self._changed(wallet)
+        self.flush()
+
+    def mark_processed(self, wallet, signature, slot=0):
+        """Advance a wallet's checkpoint past a processed signature"""
+        with self.lock:
+            entry = self._entry(wallet)
+            entry["pending"].pop(signature, None)
+            if slot >= entry["last_slot"]:
+                entry["last_signature"] = signature
+                entry["last_slot"] = slot
+            self._changed(wallet)
+        self.flush()
+
+    def flush(self, force=False):
+        """Write the checkpoint if enough updates or time have accumulated"""
+        with self.write_lock:
+            return self._flush(force)
+
+    def _flush(self, force):
+        with self.lock:
+            if not self.dirty_updates:
+                return False
+            due = (
+                force or
+                self.dirty_updates >= self.flush_every or
+                time.time() - self.last_flush >= self.flush_seconds
+            )
+            if not due:
+                return False
+            for wallet in self.dirty:
+                entry = self.wallets[wallet]
+                self.encoded[wallet] = f"{json.dumps(wallet)}: {json.dumps(dict(entry, pending=self._pending_list(entry)))}"
+            self.dirty.clear()
+            payload = f'{{"version": {self.VERSION}, "wallets": {{{", ".join(self.encoded.values())}}}}}'
+            self.dirty_updates = 0
+            self.last_flush = time.time()
+
+        # Write-rename so a crash never leaves a truncated checkpoint behind
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self.lock:
+                self.dirty_updates += 1   # The fragments are current; retry on the next flush
+            raise
+        return True
+
+    def run(self):
+        """Writer loop: flushes whatever changed every flush_seconds; runs forever"""
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush(force=True)
+            except OSError as e:
+                print(f"Error writing {self.path}: {e}")
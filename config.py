@@ -14,6 +14,48 @@ WHITELIST_FILE = "whitelist.json"
 LOG_FILE = "wallet_log.txt"
 TRANSACTION_HISTORY_FILE = "transaction_history.json"
 SUSPICIOUS_ADDRESSES_FILE = "suspicious_addresses.json"
+PHISHING_ADDRESSES_FILE = "phishing_addresses.json"
+REPUTATION_FILE = "address_reputation.json"
+CHECKPOINT_FILE = "poll_checkpoint.json"
+
+# Write-behind JSON files (see json_store.py)
+PERSIST_FLUSH_DELAY = float(os.getenv("PERSIST_FLUSH_DELAY", "1"))   # Quiet seconds before a rewrite
+PERSIST_MAX_DELAY = float(os.getenv("PERSIST_MAX_DELAY", "5"))       # Max seconds a change waits for a rewrite
+
+# Imported blocklists (memory-mapped indexes, see address_index.py)
+BLOCKLIST_DIR = "blocklists"
+HONEYPOT_INDEX_FILE = os.path.join(BLOCKLIST_DIR, "honeypots.idx")
+WHITELIST_INDEX_FILE = os.path.join(BLOCKLIST_DIR, "whitelist.idx")
+SUSPICIOUS_INDEX_FILE = os.path.join(BLOCKLIST_DIR, "suspicious_addresses.idx")
+PHISHING_INDEX_FILE = os.path.join(BLOCKLIST_DIR, "phishing_addresses.idx")
+
+# Phishing domain feeds (see domain_matcher.py)
+PHISHING_FEED_DIR = os.getenv("PHISHING_FEED_DIR", os.path.join(BLOCKLIST_DIR, "phishing_domains"))  # *.txt, one domain per line
+PHISHING_FEED_RELOAD_SECONDS = 30   # How often the feed files are checked for changes
+
+# Poll checkpointing
+CHECKPOINT_FLUSH_EVERY = int(os.getenv("CHECKPOINT_FLUSH_EVERY", "20"))      # Processed signatures per write
+CHECKPOINT_FLUSH_SECONDS = float(os.getenv("CHECKPOINT_FLUSH_SECONDS", "5")) # Max seconds between writes
+SIGNATURE_PAGE_SIZE = 1000  # getSignaturesForAddress maximum page size
+
+# Token creation time lookups (see token_age.py)
+TOKEN_AGE_MAX_PAGES = int(os.getenv("TOKEN_AGE_MAX_PAGES", "20"))         # Signature pages read per mint at most
+TOKEN_AGE_CACHE_SIZE = int(os.getenv("TOKEN_AGE_CACHE_SIZE", "100000"))   # Mints whose creation time is kept
+TOKEN_AGE_WORKERS = int(os.getenv("TOKEN_AGE_WORKERS", "4"))             # Background lookups run at once
+TOKEN_AGE_RETRY_SECONDS = float(os.getenv("TOKEN_AGE_RETRY_SECONDS", "300"))  # Wait before retrying an unresolved mint
+
+# Ingest queue (between signature discovery and decoding)
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1000"))         # Signatures held in memory
+INGEST_SPILL_LIMIT = int(os.getenv("INGEST_SPILL_LIMIT", "100000"))     # Signatures spilled to disk
+INGEST_SHED_WATERMARK = float(os.getenv("INGEST_SHED_WATERMARK", "0.5")) # Load at which spam is dropped
+INGEST_SPILL_DIR = "ingest_spill"
+INGEST_PRIORITY_SIZE = int(os.getenv("INGEST_PRIORITY_SIZE", "1000"))   # High-risk signatures held ahead of routine ones
+INGEST_PRIORITY_BURST = int(os.getenv("INGEST_PRIORITY_BURST", "4"))    # High-risk items served per routine item
+
+# Process sharding (0 = monitor in the web process)
+MONITOR_SHARDS = int(os.getenv("MONITOR_SHARDS", "0"))
+HISTORY_PER_WALLET = 100  # Decoded transactions kept per watched wallet
+HISTORY_UPDATE_LOOKBACK = 1000  # Recent transactions searched for one re-sent with late detector results
 
 # Web Interface
 WEB_PORT = int(os.getenv("WEB_PORT", "5000"))
@@ -63,3 +105,64 @@ HONEYPOT_HEURISTICS = {
     "time_window_seconds": 300,       # Time window for high velocity (5 minutes)
     "unusual_holders_threshold": 10   # Suspicious if fewer holders than this
 }
+
+# Honeypot verdict cache
+TOKEN_LOOKUP_TIMEOUT = float(os.getenv("TOKEN_LOOKUP_TIMEOUT", "5"))   # Deadline for price/metadata/holder lookups
+TOKEN_LOOKUP_WORKERS = int(os.getenv("TOKEN_LOOKUP_WORKERS", "8"))      # Concurrent lookup threads
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", "3600"))         # Seconds a token verdict is reused
+VERDICT_RETRY_SECONDS = 60       # TTL of verdicts where a lookup missed its deadline
+VERDICT_CACHE_SIZE = 10000       # Max cached token verdicts
+TOKEN_SCREEN_WORKERS = int(os.getenv("TOKEN_SCREEN_WORKERS", "16"))     # Mints evaluated at once by analyze_tokens
+TOKEN_SCREEN_MAX = 1000          # Max mints per /api/tokens/screen request
+
+# Per-transaction detector runs (see detector_executor.py)
+DETECTOR_TIME_BUDGETS = {        # Seconds a transaction waits for each detector
+    "honeypot": TOKEN_LOOKUP_TIMEOUT + 1,
+    "suspicious": 2.0,
+    "phishing": 0.5,
+}
+DETECTOR_DEFAULT_BUDGET = 2.0    # Budget of detectors not listed above
+DETECTOR_MAX_BACKLOG = 50        # Queued runs after which a lagging detector is skipped
+
+# Background honeypot re-scoring (/api/honeypots snapshot)
+HONEYPOT_RESCORE_INTERVAL = 30   # Seconds between re-score passes
+HONEYPOT_RESCORE_BATCH = 50      # Stalest honeypots refreshed per pass
+HONEYPOT_RESCORE_MIN_AGE = 600   # Entries younger than this are not refreshed
+HONEYPOT_SNAPSHOT_MAX = 5000     # Honeypots tracked in the snapshot
+
+# Suspicious activity tracking state (see state_store.py)
+STATE_MAX_ENTRIES = int(os.getenv("STATE_MAX_ENTRIES", "200000"))   # Entries across all tracking tables
+STATE_LIST_LIMIT = 100           # Most recent items kept in per-entry history lists
+AGGREGATE_BUCKET_SECONDS = 5     # Resolution of per-address activity windows
+STATE_TTLS = {                   # Seconds an idle entry is kept, per table
+    "address_activity": 600,
+    "token_actions": 6 * 3600,
+    "cross_chain_transfers": 3600,
+    "contract_exploits": 24 * 3600,
+    "token_impersonation": 24 * 3600,
+    "creator_flags": 7 * 24 * 3600,
+}
+
+# Fund-flow graph (see fund_graph.py)
+FUND_GRAPH_WINDOW = 7 * 24 * 3600    # Edges not seen for this long expire
+FUND_GRAPH_BUCKET_SECONDS = 3600     # Expiry granularity
+FUND_GRAPH_MAX_EDGES = int(os.getenv("FUND_GRAPH_MAX_EDGES", "500000"))   # Oldest edges go first beyond this
+FUND_GRAPH_MAX_VISIT = 5000          # Nodes one k-hop query may expand
+
+# Detector state snapshots (see snapshot.py)
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "detector_state.snap")   # Restored at startup for a warm restart
+SNAPSHOT_INTERVAL = 60           # Seconds between snapshots
+SNAPSHOT_MAX_DELTAS = 30         # Incremental segments appended before a full rewrite
+
+# Address reputation (see reputation.py)
+REPUTATION_HALF_LIFE = 7 * 24 * 3600   # Seconds for a reputation score to halve without new flags
+REPUTATION_MAX_REASONS = 8             # Reason codes kept per address (oldest dropped)
+
+# Suspicious activity rules (see rule_engine.py)
+RULES_FILE = os.getenv("RULES_FILE", "suspicious_rules.json")   # Optional rules/threshold overrides
+RULES_RELOAD_SECONDS = 5         # How often the rules file is checked for changes
+
+# Token velocity counters
+VELOCITY_BUCKET_SECONDS = 10     # Resolution of the sliding velocity window
+VELOCITY_IDLE_SECONDS = 3600     # Mints with no transfers for this long are forgotten
+VELOCITY_MAX_MINTS = 200000      # Upper bound on tracked mints
@@ -0,0 +1,116 @@
+"""
+Concurrent detector runs with per-detector time budgets
+The honeypot, suspicious-activity and phishing detectors are independent
+and two of them wait on remote lookups, so each transaction runs them side
+by side. A detector that misses its budget is left out of that
+transaction's result instead of holding the alert back; it keeps running
+and its late result is handed to a callback.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import DETECTOR_TIME_BUDGETS, DETECTOR_DEFAULT_BUDGET, DETECTOR_MAX_BACKLOG
+
+
+class DetectorExecutor:
+    """
+    Runs named detector tasks concurrently
+
+    Every detector name gets one worker thread: detector state is not
+    thread-safe, so one detector never runs two tasks at once, and its
+    tasks run in submission order. Monitors sharing detectors must share
+    the executor. A detector whose worker already has `max_backlog` tasks
+    queued (it keeps missing its budget) is skipped until it catches up.
+    """
+
+    def __init__(self, budgets=DETECTOR_TIME_BUDGETS, default_budget=DETECTOR_DEFAULT_BUDGET,
+                 max_backlog=DETECTOR_MAX_BACKLOG):
+        self.budgets = budgets
+        self.default_budget = default_budget
+        self.max_backlog = max_backlog
+        self.workers = {}     # name -> single-thread pool
+        self.backlog = {}     # name -> tasks submitted and not finished
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def _worker(self, name):
+        if name not in self.workers:
+            self.workers[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"detector-{name}")
+            self.backlog[name] = 0
+            self.stats[name] = {"runs": 0, "timeouts": 0, "late_results": 0, "skipped": 0, "errors": 0,
+                                "total_ms": 0.0, "max_ms": 0.0}
+        return self.workers[name]
+
+    def _timed(self, name, task):
+        started = time.perf_counter()
+        try:
+            return task()
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.backlog[name] -= 1
+                stats = self.stats[name]
+                stats["runs"] += 1
+                stats["total_ms"] += elapsed
+                stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+    def run(self, tasks, on_late=None):
+        """
+        Run {name: callable} concurrently and wait for each up to its budget
+        Returns {name: result} in the order of `tasks`, whatever order they
+        finished in; detectors that failed, timed out or were skipped are
+        left out. `on_late(name, result)` gets the results of timed-out
+        tasks once they finish.
+        """
+        started = time.perf_counter()
+        futures = {}
+        with self.lock:
+            for name, task in tasks.items():
+                worker = self._worker(name)
+                if self.backlog[name] >= self.max_backlog:
+                    self.stats[name]["skipped"] += 1
+                    continue
+                self.backlog[name] += 1
+                futures[name] = worker.submit(self._timed, name, task)
+
+        results = {}
+        for name, future in futures.items():
+            deadline = started + self.budgets.get(name, self.default_budget)
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.perf_counter()))
+            except TimeoutError:
+                with self.lock:
+                    self.stats[name]["timeouts"] += 1
+                future.add_done_callback(lambda f, name=name: self._late(name, f, on_late))
+            except Exception as e:
+                print(f"Detector error ({name}): {e}")
+                with self.lock:
+                    self.stats[name]["errors"] += 1
+        return results
+
+    def _late(self, name, future, on_late):
+        error = future.exception()
+        if error is not None:
+            print(f"Detector error ({name}, after its time budget): {error}")
+            with self.lock:
+                self.stats[name]["errors"] += 1
+            return
+        with self.lock:
+            self.stats[name]["late_results"] += 1
+        if on_late:
+            on_late(name, future.result())
+
+    def metrics(self):
+        """Per-detector run, timeout and timing counters"""
+        with self.lock:
+            return {
+                name: dict(
+                    stats,
+                    budget=self.budgets.get(name, self.default_budget),
+                    backlog=self.backlog[name],
+                    avg_ms=round(stats["total_ms"] / stats["runs"], 3) if stats["runs"] else 0,
+                    total_ms=round(stats["total_ms"], 3),
+                    max_ms=round(stats["max_ms"], 3)
+                )
+                for name, stats in self.stats.items()
+            }
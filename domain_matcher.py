@@ -0,0 +1,188 @@
+"""
+Phishing domain matching for large feeds
+Feed domains go into a trie keyed by reversed labels ("claim.evil.com" is
+com -> evil -> claim), so one walk over a domain's labels finds both exact
+and subdomain matches. A listed domain ends its branch: longer entries under
+it are redundant and are not stored. Fuzzy keyword patterns are joined into
+one precompiled alternation, so a domain is scanned once whatever the number
+of patterns.
+
+Feeds are text files in PHISHING_FEED_DIR, one domain per line. Blank lines
+and "#" comments are skipped; hosts-file lines ("0.0.0.0 evil.com"), URLs and
+"*." wildcards are reduced to their domain. Reloads build a new trie and
+pattern next to the live ones and swap them in, so matching never waits for
+a reload.
+"""
+import glob
+import os
+import re
+import threading
+import time
+from config import PHISHING_FEED_DIR, PHISHING_FEED_RELOAD_SECONDS
+
+LISTED = 0    # Trie value of a listed domain (ends its branch)
+
+
+def normalize_domain(text):
+    """Lowercase host of a domain, URL or host:port; "" if there is none"""
+    host = text.strip().lower()
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = host.split("/", 1)[0].rsplit("@", 1)[-1]
+    if host.startswith("["):
+        return ""   # IPv6 literal
+    host = host.split(":", 1)[0].rstrip(".")
+    if host.startswith("*."):
+        host = host[2:]
+    return host
+
+
+def read_feed(path):
+    """Domains listed in one feed file"""
+    domains = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            domain = normalize_domain(line.split()[-1])
+            if domain and "." in domain:
+                domains.append(domain)
+    return domains
+
+
+def build_trie(domains):
+    """Reversed-label trie of `domains`"""
+    root = {}
+    for domain in domains:
+        labels = domain.split(".")
+        node = root
+        for i in range(len(labels) - 1, 0, -1):
+            child = node.get(labels[i])
+            if child is LISTED:
+                break   # A parent domain is listed already
+            if child is None:
+                child = node[labels[i]] = {}
+            node = child
+        else:
+            node[labels[0]] = LISTED    # Drops any listed subdomains below it
+    return root
+
+
+def compile_patterns(patterns):
+    """One case-insensitive alternation of the keyword patterns (None if there are none)"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+class DomainMatcher:
+    """
+    Feed trie plus keyword patterns, swapped as one unit on reload
+
+    `patterns` is read on every reload, so the owner can change the list
+    and call reload(). maybe_reload() is cheap enough for the detection
+    path: it only stats the feed files, and rebuilds in a background thread.
+    """
+
+    def __init__(self, patterns, feed_dir=PHISHING_FEED_DIR, reload_seconds=PHISHING_FEED_RELOAD_SECONDS):
+        self.patterns = patterns
+        self.feed_dir = feed_dir
+        self.reload_seconds = reload_seconds
+        self.current = ({}, None)     # (trie, keyword pattern), replaced whole
+        self.feeds = {}               # Feed path -> domains read
+        self.feed_state = None        # (path, mtime, size) of the feeds last loaded
+        self.entries = 0              # Feed domains read
+        self.loaded_at = None
+        self.load_ms = 0
+        self.error = None
+        self.last_check = 0
+        self.reload_lock = threading.Lock()
+        self.reloading = None
+        self.reload()
+
+    def _feed_state(self):
+        if not self.feed_dir or not os.path.isdir(self.feed_dir):
+            return ()
+        state = []
+        for path in sorted(glob.glob(os.path.join(self.feed_dir, "*.txt"))):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue    # Removed while listing
+            state.append((path, stat.st_mtime, stat.st_size))
+        return tuple(state)
+
+    def reload(self):
+        """Re-read the feeds and patterns and swap in the new matcher; returns False on error"""
+        with self.reload_lock:
+            started = time.perf_counter()
+            state = self._feed_state()
+            feeds = {}
+            try:
+                for path, _, _ in state:
+                    feeds[path] = read_feed(path)
+                keywords = compile_patterns(self.patterns)
+            except (OSError, re.error) as e:
+                self.error = str(e)
+                print(f"Phishing domain reload failed, keeping current domains: {e}")
+                self.feed_state = state
+                return False
+
+            trie = build_trie(domain for domains in feeds.values() for domain in domains)
+            self.current = (trie, keywords)
+            self.feeds = {path: len(domains) for path, domains in feeds.items()}
+            self.feed_state = state
+            self.entries = sum(len(domains) for domains in feeds.values())
+            self.loaded_at = time.time()
+            self.load_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.error = None
+            return True
+
+    def maybe_reload(self):
+        """Start a background reload if the feed files changed; checks at most every reload_seconds"""
+        now = time.time()
+        if now - self.last_check < self.reload_seconds:
+            return False
+        self.last_check = now
+        if self.reloading and self.reloading.is_alive():
+            return False
+        if self._feed_state() == self.feed_state:
+            return False
+        self.reloading = threading.Thread(target=self.reload, name="phishing-domain-reload")
+        self.reloading.daemon = True
+        self.reloading.start()
+        return True
+
+    def match(self, domain):
+        """Why `domain` looks like phishing: ("feed", listed domain), ("keyword", matched text) or None"""
+        trie, keywords = self.current
+        host = normalize_domain(domain)
+        if not host:
+            return None
+        labels = host.split(".")
+        node = trie
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[i])
+            if node is None:
+                break
+            if node is LISTED:
+                return "feed", ".".join(labels[i:])
+        if keywords:
+            found = keywords.search(host)
+            if found:
+                return "keyword", found.group(0)
+        return None
+
+    def metrics(self):
+        """Loaded feeds, entry count and last reload"""
+        return {
+            "feed_dir": self.feed_dir,
+            "feeds": dict(self.feeds),
+            "entries": self.entries,
+            "patterns": len(self.patterns),
+            "loaded_at": self.loaded_at,
+            "load_ms": self.load_ms,
+            "reloading": bool(self.reloading and self.reloading.is_alive()),
+            "error": self.error
+        }
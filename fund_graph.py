@@ -0,0 +1,331 @@
+"""
+Incremental fund-flow graph
+A directed transfer graph fed by every decoded transaction. Addresses are
+mapped to integer node IDs; edges live in parallel arrays (endpoints,
+transfer count, SOL volume, first/last seen) indexed by edge ID, and each
+node keeps adjacency maps of neighbor ID -> edge ID in both directions.
+Edges not seen within the window are expired in time-bucket order (and the
+oldest buckets go early if the edge budget is exceeded), and nodes left
+without edges free their IDs, so memory stays bounded.
+
+The graph is written by the detector (and, in sharded mode, by the thread
+receiving shard output) while the dashboard queries it, so every method
+holds one lock; queries are bounded by max_visit/limit.
+"""
+import bisect
+import threading
+import time
+from array import array
+from config import FUND_GRAPH_WINDOW, FUND_GRAPH_MAX_EDGES, FUND_GRAPH_BUCKET_SECONDS, FUND_GRAPH_MAX_VISIT
+
+
+class FundFlowGraph:
+    """
+    Directed transfer graph with windowed edge expiry and bounded k-hop queries
+    An edge source -> destination means funds moved from source to destination.
+    """
+
+    def __init__(self, window=FUND_GRAPH_WINDOW, max_edges=FUND_GRAPH_MAX_EDGES,
+                 bucket_seconds=FUND_GRAPH_BUCKET_SECONDS, max_visit=FUND_GRAPH_MAX_VISIT):
+        self.window = window
+        self.max_edges = max_edges
+        self.bucket_seconds = bucket_seconds
+        self.max_visit = max_visit        # Nodes a single query may expand
+
+        # Nodes
+        self.node_ids = {}                # address -> node ID
+        self.addresses = []               # node ID -> address (None when free)
+        self.out_edges = []               # node ID -> {destination ID: edge ID}
+        self.in_edges = []                # node ID -> {source ID: edge ID}
+        self.free_nodes = []
+
+        # Edges, as parallel arrays indexed by edge ID
+        self.sources = array("I")
+        self.destinations = array("I")
+        self.counts = array("I")          # Transfers seen; 0 marks a free slot
+        self.volumes = array("d")         # SOL moved
+        self.first_seen = array("d")
+        self.last_seen = array("d")
+        self.free_edges = []
+        self.edge_count = 0
+
+        # Expiry: bucket -> edge IDs whose last_seen fell in that bucket when queued
+        self.buckets = {}
+        self.bucket_order = []            # Sorted bucket keys
+        self.stats = {"transfers": 0, "expired": 0, "evicted": 0}
+        self.lock = threading.Lock()
+
+    def _node(self, address):
+        node = self.node_ids.get(address)
+        if node is not None:
+            return node
+        if self.free_nodes:
+            node = self.free_nodes.pop()
+            self.addresses[node] = address
+        else:
+            node = len(self.addresses)
+            self.addresses.append(address)
+            self.out_edges.append({})
+            self.in_edges.append({})
+        self.node_ids[address] = node
+        return node
+
+    def _release_node(self, node):
+        if self.out_edges[node] or self.in_edges[node]:
+            return
+        del self.node_ids[self.addresses[node]]
+        self.addresses[node] = None
+        self.free_nodes.append(node)
+
+    def _queue(self, edge, now):
+        bucket = int(now // self.bucket_seconds)
+        if bucket not in self.buckets:
+            self.buckets[bucket] = []
+            # Late transfers can open a bucket older than the newest one
+            bisect.insort(self.bucket_order, bucket)
+        self.buckets[bucket].append(edge)
+
+    def add_transfer(self, source, destination, sol=0.0, now=None):
+        """Record one transfer from source to destination"""
+        with self.lock:
+            self._add_transfer(source, destination, sol, now)
+
+    def _add_transfer(self, source, destination, sol, now):
+        if not source or not destination or source == destination:
+            return
+        now = time.time() if now is None else now
+        src = self._node(source)
+        dst = self._node(destination)
+        self.stats["transfers"] += 1
+
+        edge = self.out_edges[src].get(dst)
+        if edge is not None:
+            previous = self.last_seen[edge]
+            self.counts[edge] += 1
+            self.volumes[edge] += sol
+            self.first_seen[edge] = min(self.first_seen[edge], now)
+            if now > previous:
+                self.last_seen[edge] = now
+                if int(now // self.bucket_seconds) != int(previous // self.bucket_seconds):
+                    self._queue(edge, now)
+            return
+
+        if self.free_edges:
+            edge = self.free_edges.pop()
+            self.sources[edge] = src
+            self.destinations[edge] = dst
+            self.counts[edge] = 1
+            self.volumes[edge] = sol
+            self.first_seen[edge] = now
+            self.last_seen[edge] = now
+        else:
+            edge = len(self.counts)
+            self.sources.append(src)
+            self.destinations.append(dst)
+            self.counts.append(1)
+            self.volumes.append(sol)
+            self.first_seen.append(now)
+            self.last_seen.append(now)
+        self.out_edges[src][dst] = edge
+        self.in_edges[dst][src] = edge
+        self.edge_count += 1
+        self._queue(edge, now)
+        while self.edge_count > self.max_edges and self.bucket_order:
+            self._evict_bucket("evicted")
+
+    def add_transaction(self, tx_data, now=None):
+        """
+        Add the transfers of a decoded transaction: the account's events (with a
+        counterparty and direction) and the flows between other owners
+        """
+        with self.lock:
+            for source, destination, sol in tx_data.get("flows", ()):
+                self._add_transfer(source, destination, sol, now)
+            account = tx_data.get("account")
+            if not account:
+                return
+            for event in tx_data.get("events", []):
+                other = event.get("other_address")
+                if not other or event.get("type") not in ("sol_transfer", "token_transfer"):
+                    continue
+                sol = float(event.get("amount", 0)) if event.get("type") == "sol_transfer" else 0.0
+                if event.get("direction") == "Received":
+                    self._add_transfer(other, account, sol, now)
+                else:
+                    self._add_transfer(account, other, sol, now)
+
+    def _remove_edge(self, edge):
+        src = self.sources[edge]
+        dst = self.destinations[edge]
+        del self.out_edges[src][dst]
+        del self.in_edges[dst][src]
+        self.counts[edge] = 0
+        self.free_edges.append(edge)
+        self.edge_count -= 1
+        self._release_node(src)
+        self._release_node(dst)
+
+    def _evict_bucket(self, reason):
+        """Drop the edges of the oldest bucket that were not seen since"""
+        bucket = self.bucket_order.pop(0)
+        # Edges seen again after being queued are waiting in a newer bucket
+        end = (bucket + 1) * self.bucket_seconds
+        for edge in self.buckets.pop(bucket):
+            if self.counts[edge] and self.last_seen[edge] < end:
+                self._remove_edge(edge)
+                self.stats[reason] += 1
+
+    def expire(self, now=None):
+        """Drop edges not seen within the window"""
+        with self.lock:
+            now = time.time() if now is None else now
+            cutoff = now - self.window
+            while self.bucket_order and (self.bucket_order[0] + 1) * self.bucket_seconds <= cutoff:
+                self._evict_bucket("expired")
+
+    def trace_sources(self, address, targets, hops, exclude=()):
+        """
+        Find a flagged address that funds could have come from
+        Walks incoming edges up to `hops` transfers back from `address`, only
+        following transfers that happened before the one after them on the path.
+        `targets` is any set-like of flagged addresses; addresses in `exclude`
+        are not used as transit nodes. Returns the path [flagged, ..., address] or None.
+        """
+        with self.lock:
+            start = self.node_ids.get(address)
+            if start is None:
+                return None
+            excluded = {self.node_ids[a] for a in exclude if a in self.node_ids}
+            # Frontier entries: (node, latest time an earlier transfer may have happened)
+            parents = {start: None}
+            frontier = [(start, float("inf"))]
+            visited = 0
+            for _ in range(hops):
+                next_frontier = []
+                for node, before in frontier:
+                    if node in excluded and node != start:
+                        continue
+                    visited += 1
+                    if visited > self.max_visit:
+                        return None
+                    for source, edge in self.in_edges[node].items():
+                        if source in parents or self.first_seen[edge] > before:
+                            continue
+                        parents[source] = node
+                        if self.addresses[source] in targets:
+                            path = [source]
+                            while parents[path[-1]] is not None:
+                                path.append(parents[path[-1]])
+                            return [self.addresses[n] for n in path]
+                        next_frontier.append((source, self.last_seen[edge]))
+                frontier = next_frontier
+                if not frontier:
+                    break
+            return None
+
+    def neighborhood(self, address, hops, since=None, limit=500):
+        """
+        Nodes and edges within `hops` of an address (both directions)
+        Edges last seen before `since` are skipped. Returns (addresses, edges)
+        where edges are dicts with source, target, count, sol and last_seen.
+        """
+        with self.lock:
+            start = self.node_ids.get(address)
+            if start is None:
+                return [], []
+            seen = {start}
+            frontier = [start]
+            edges = {}
+            for _ in range(hops):
+                next_frontier = []
+                for node in frontier:
+                    for adjacency in (self.out_edges[node], self.in_edges[node]):
+                        for other, edge in adjacency.items():
+                            if since is not None and self.last_seen[edge] < since:
+                                continue
+                            edges[edge] = True
+                            if other not in seen and len(seen) < limit:
+                                seen.add(other)
+                                next_frontier.append(other)
+                frontier = next_frontier
+            return [self.addresses[n] for n in seen], [
+                {
+                    "source": self.addresses[self.sources[e]],
+                    "target": self.addresses[self.destinations[e]],
+                    "count": self.counts[e],
+                    "sol": round(self.volumes[e], 9),
+                    "last_seen": self.last_seen[e]
+                }
+                for e in edges
+                if self.sources[e] in seen and self.destinations[e] in seen
+            ]
+
+    def export_state(self):
+        """Copy of the nodes, edge arrays and expiry buckets for snapshots"""
+        with self.lock:
+            return {
+                "addresses": list(self.addresses),
+                "sources": self.sources.tobytes(),
+                "destinations": self.destinations.tobytes(),
+                "counts": self.counts.tobytes(),
+                "volumes": self.volumes.tobytes(),
+                "first_seen": self.first_seen.tobytes(),
+                "last_seen": self.last_seen.tobytes(),
+                "buckets": {bucket: list(edges) for bucket, edges in list(self.buckets.items())},
+                "stats": dict(self.stats)
+            }
+
+    def import_state(self, state, now=None):
+        """Rebuild the graph from export_state(), then expire what aged out meanwhile"""
+        with self.lock:
+            addresses = state["addresses"]
+            columns = [array(typecode, state[name]) for typecode, name in (
+                ("I", "sources"), ("I", "destinations"), ("I", "counts"),
+                ("d", "volumes"), ("d", "first_seen"), ("d", "last_seen")
+            )]
+            # Arrays were copied one after another while the graph was live; trim to the shortest
+            size = min(len(column) for column in columns)
+            self.sources, self.destinations, self.counts, self.volumes, self.first_seen, self.last_seen = (
+                column[:size] for column in columns
+            )
+            self.addresses = list(addresses)
+            self.node_ids = {address: node for node, address in enumerate(addresses) if address is not None}
+            self.out_edges = [{} for _ in addresses]
+            self.in_edges = [{} for _ in addresses]
+            self.free_edges = []
+            self.edge_count = 0
+            for edge in range(size):
+                src = self.sources[edge]
+                dst = self.destinations[edge]
+                if not self.counts[edge] or src >= len(addresses) or dst >= len(addresses) \
+                        or addresses[src] is None or addresses[dst] is None:
+                    self.counts[edge] = 0
+                    self.free_edges.append(edge)
+                    continue
+                self.out_edges[src][dst] = edge
+                self.in_edges[dst][src] = edge
+                self.edge_count += 1
+            self.free_nodes = [
+                node for node, address in enumerate(self.addresses)
+                if address is None or not (self.out_edges[node] or self.in_edges[node])
+            ]
+            for node in self.free_nodes:
+                if self.addresses[node] is not None:
+                    del self.node_ids[self.addresses[node]]
+                    self.addresses[node] = None
+            self.buckets = {bucket: [e for e in edges if e < size] for bucket, edges in state["buckets"].items()}
+            self.bucket_order = sorted(self.buckets)
+            self.stats.update(state.get("stats", {}))
+        self.expire(now)
+
+    def metrics(self):
+        """Graph size and expiry counters"""
+        with self.lock:
+            return dict(
+                self.stats,
+                nodes=len(self.node_ids),
+                edges=self.edge_count,
+                max_edges=self.max_edges,
+                window=self.window,
+                buckets=len(self.bucket_order)
+            )
@@ -1,10 +1,16 @@
 """
 Honeypot token detector for Solana
 """
-import json
-import os
-from datetime import datetime, timedelta
-from config import HONEYPOT_FILE, WHITELIST_FILE, HONEYPOT_HEURISTICS
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from config import (HONEYPOT_FILE, WHITELIST_FILE, HONEYPOT_INDEX_FILE, WHITELIST_INDEX_FILE, HONEYPOT_HEURISTICS, TOKEN_LOOKUP_TIMEOUT, TOKEN_LOOKUP_WORKERS,
+                    VERDICT_CACHE_TTL, VERDICT_RETRY_SECONDS, VERDICT_CACHE_SIZE, TOKEN_SCREEN_WORKERS,
+                    VELOCITY_BUCKET_SECONDS, VELOCITY_IDLE_SECONDS, VELOCITY_MAX_MINTS)
+from address_index import AddressIndex
+from json_store import JsonStore, replay_set
+from pubkey import metadata_address
+from velocity import VelocityTracker
 
 class HoneypotDetector:
     """
@@ -16,47 +22,76 @@ class HoneypotDetector:
         self.solana_rpc = solana_rpc
         self.honeypots = self.load_honeypots()
         self.whitelist = self.load_whitelist()
-        self.transaction_cache = {}  # mint -> [transaction_timestamps]
+        # mint -> sliding-window transfer count
+        self.transaction_cache = VelocityTracker(
+            HONEYPOT_HEURISTICS["time_window_seconds"],
+            VELOCITY_BUCKET_SECONDS,
+            VELOCITY_IDLE_SECONDS,
+            VELOCITY_MAX_MINTS
+        )
+        # count() rotates the ring too, so reads and writes both take the lock
+        self.velocity_lock = threading.Lock()
         self.confidence_threshold = 0.75  # Default confidence threshold for honeypot detection
+        self.persist = True   # Shard replicas leave the JSON files to the main process
+        self.listeners = []   # Called with ("honeypot" | "whitelist", mint, reason) on changes
+        self.verdicts = {}    # mint -> remote lookup verdict, see token_verdict()
+        self.verdict_lock = threading.Lock()
+        self.lookup_pool = ThreadPoolExecutor(max_workers=TOKEN_LOOKUP_WORKERS, thread_name_prefix="token-lookup")
+        # Separate pool: screening tasks wait on lookup_pool futures
+        self.screen_pool = ThreadPoolExecutor(max_workers=TOKEN_SCREEN_WORKERS, thread_name_prefix="token-screen")
         
     def load_honeypots(self):
-        """Load known honeypot tokens from file"""
-        if os.path.exists(HONEYPOT_FILE):
-            with open(HONEYPOT_FILE, "r") as f:
-                try:
-                    return set(json.load(f))
-                except json.JSONDecodeError:
-                    return set()
-        return set()
+        """Load known honeypot tokens (imported index plus the JSON file and its journal)"""
+        # Only runtime additions are written; indexed entries live in HONEYPOT_INDEX_FILE
+        self.honeypots_store = JsonStore(HONEYPOT_FILE, lambda: list(self.honeypots.added), indent=2)
+        return AddressIndex(HONEYPOT_INDEX_FILE, self._load_json_set(self.honeypots_store))
+    
+    def _load_json_set(self, store):
+        data, journal = store.load()
+        return replay_set(set(data if isinstance(data, list) else []), journal)
+    
+    def _notify_listeners(self, kind, mint, reason=""):
+        for listener in self.listeners:
+            listener(kind, mint, reason)
+    
+    def _record(self, store, op, mint):
+        if self.persist:
+            store.record([op, mint])
     
     def save_honeypots(self):
-        """Save honeypot tokens to file"""
-        with open(HONEYPOT_FILE, "w") as f:
-            json.dump(list(self.honeypots), f, indent=2)
+        """Write pending honeypot changes to file now"""
+        if not self.persist:
+            return
+        self.honeypots_store.flush()
             
     def load_whitelist(self):
-        """Load whitelisted tokens from file"""
-        if os.path.exists(WHITELIST_FILE):
-            with open(WHITELIST_FILE, "r") as f:
-                try:
-                    return set(json.load(f))
-                except json.JSONDecodeError:
-                    return set()
-        return set()
+        """Load whitelisted tokens (imported index plus the JSON file and its journal)"""
+        self.whitelist_store = JsonStore(WHITELIST_FILE, lambda: list(self.whitelist.added), indent=2)
+        return AddressIndex(WHITELIST_INDEX_FILE, self._load_json_set(self.whitelist_store))
     
     def save_whitelist(self):
-        """Save whitelisted tokens to file"""
-        with open(WHITELIST_FILE, "w") as f:
-            json.dump(list(self.whitelist), f, indent=2)
+        """Write pending whitelist changes to file now"""
+        if not self.persist:
+            return
+        self.whitelist_store.flush()
+    
+    def add_honeypot(self, mint, reason=""):
+        """Add token to the known honeypot list"""
+        self.honeypots.add(mint)
+        self.forget_verdict(mint)
+        self._record(self.honeypots_store, "add", mint)
+        self._notify_listeners("honeypot", mint, reason)
     
     def add_to_whitelist(self, mint):
         """Add token to whitelist"""
         if mint in self.honeypots:
             self.honeypots.remove(mint)
-            self.save_honeypots()
+            self._record(self.honeypots_store, "discard", mint)
         
         self.whitelist.add(mint)
-        self.save_whitelist()
+        self.forget_verdict(mint)
+        self._record(self.whitelist_store, "add", mint)
+        self._notify_listeners("whitelist", mint)
     
     def is_honeypot(self, mint):
         """Check if a token is a known honeypot"""
@@ -69,6 +104,98 @@ class HoneypotDetector:
         metadata = self.solana_rpc.get_token_metadata(mint)
         return not metadata  # True if no metadata found
     
+    def cached_verdict(self, mint):
+        """Cached verdict for a mint, or None if missing or expired"""
+        with self.verdict_lock:
+            verdict = self.verdicts.get(mint)
+            if verdict and verdict["expires_at"] > time.time():
+                return verdict
+            return None
+    
+    def forget_verdict(self, mint):
+        """Drop a cached verdict (e.g. after the mint was listed or whitelisted)"""
+        with self.verdict_lock:
+            self.verdicts.pop(mint, None)
+    
+    def _store_verdict(self, mint, verdict):
+        with self.verdict_lock:
+            self.verdicts.pop(mint, None)
+            if len(self.verdicts) >= VERDICT_CACHE_SIZE:
+                now = time.time()
+                self.verdicts = {m: v for m, v in self.verdicts.items() if v["expires_at"] > now}
+                while len(self.verdicts) >= VERDICT_CACHE_SIZE:
+                    # Oldest insertion first
+                    del self.verdicts[next(iter(self.verdicts))]
+            self.verdicts[mint] = verdict
+    
+    def token_verdict(self, mint, has_metadata=None):
+        """
+        Score a mint from its price, metadata and holder count
+        The three lookups run concurrently under one deadline and the verdict
+        (including "not a honeypot") is cached per mint. A lookup that misses
+        the deadline is left out of the score and the verdict expires sooner.
+        `has_metadata` skips the metadata lookup when it is already known.
+        Returns: {"confidence", "reasons", "price", "has_metadata", "holders",
+                  "timed_out", "checked_at", "expires_at"}
+        """
+        verdict = self.cached_verdict(mint)
+        if verdict:
+            return verdict
+        
+        futures = {
+            "price": self.lookup_pool.submit(self.solana_rpc.get_token_price_usd, mint),
+            "holders": self.lookup_pool.submit(self.solana_rpc.get_token_holders, mint)
+        }
+        if has_metadata is None:
+            futures["metadata"] = self.lookup_pool.submit(self.solana_rpc.get_token_metadata, mint)
+        deadline = time.time() + TOKEN_LOOKUP_TIMEOUT
+        results = {} if has_metadata is None else {"metadata": has_metadata}
+        timed_out = []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.time()))
+            except TimeoutError:
+                timed_out.append(name)
+            except Exception as e:
+                print(f"Token lookup error ({name}) for {mint}: {e}")
+                timed_out.append(name)
+        
+        reasons = []
+        confidence = 0
+        price = results.get("price")
+        if price == 0:
+            reasons.append("Token has zero price")
+            confidence += 0.3
+        
+        has_metadata = bool(results["metadata"]) if "metadata" in results else None
+        if has_metadata is False:
+            reasons.append("Missing on-chain metadata")
+            confidence += 0.2
+        
+        holders = results.get("holders")
+        if holders is not None and holders < HONEYPOT_HEURISTICS["unusual_holders_threshold"]:
+            reasons.append(f"Few token holders (<{HONEYPOT_HEURISTICS['unusual_holders_threshold']})")
+            confidence += 0.25
+        
+        now = time.time()
+        verdict = {
+            "confidence": confidence,
+            "reasons": reasons,
+            "price": price,
+            "has_metadata": has_metadata,
+            "holders": holders,
+            "timed_out": timed_out,
+            "checked_at": now,
+            "expires_at": now + (VERDICT_RETRY_SECONDS if timed_out else VERDICT_CACHE_TTL)
+        }
+        self._store_verdict(mint, verdict)
+        return verdict
+    
+    def refresh_verdict(self, mint):
+        """Re-run the remote lookups for a mint, replacing its cached verdict"""
+        self.forget_verdict(mint)
+        return self.token_verdict(mint)
+    
     def has_few_holders(self, mint):
         """Check if token has suspiciously few holders"""
         holders = self.solana_rpc.get_token_holders(mint)
@@ -76,29 +203,24 @@ class HoneypotDetector:
     
     def has_high_velocity(self, mint):
         """Check if token has high transaction velocity (many txs in short time)"""
-        if mint not in self.transaction_cache:
-            return False
-            
-        now = datetime.now()
-        recent_window = now - timedelta(seconds=HONEYPOT_HEURISTICS["time_window_seconds"])
-        
-        # Count transactions in the recent time window
-        recent_txs = [tx for tx in self.transaction_cache[mint] if tx > recent_window]
-        return len(recent_txs) >= HONEYPOT_HEURISTICS["high_velocity_threshold"]
+        with self.velocity_lock:
+            return self.transaction_cache.count(mint) >= HONEYPOT_HEURISTICS["high_velocity_threshold"]
     
     def track_transaction(self, mint):
         """Track a transaction for a token to detect velocity"""
-        if mint not in self.transaction_cache:
-            self.transaction_cache[mint] = []
-            
-        self.transaction_cache[mint].append(datetime.now())
-        
-        # Cleanup old transactions
-        now = datetime.now()
-        cutoff = now - timedelta(hours=1)  # Keep only last hour of transactions
-        self.transaction_cache[mint] = [tx for tx in self.transaction_cache[mint] if tx > cutoff]
+        with self.velocity_lock:
+            self.transaction_cache.record(mint)
     
-    def analyze_token(self, mint):
+    def export_state(self):
+        """Transfer velocity counters, for snapshots"""
+        return {"transaction_cache": self.transaction_cache.export_state()}
+        
+    def import_state(self, state):
+        """Restore export_state()"""
+        if "transaction_cache" in state:
+            self.transaction_cache.import_state(state["transaction_cache"])
+        
+    def analyze_token(self, mint, has_metadata=None):
         """
         Analyze a token for honeypot characteristics
         Returns: (is_suspicious, confidence, reasons)
@@ -109,34 +231,79 @@ class HoneypotDetector:
         if mint in self.honeypots:
             return True, 1.0, ["Token is a known honeypot"]
             
-        reasons = []
-        confidence = 0
-        
-        # Check token price
-        price = self.solana_rpc.get_token_price_usd(mint)
-        if price == 0:
-            reasons.append("Token has zero price")
-            confidence += 0.3
-        
-        # Check for suspicious metadata
-        if self.has_suspicious_metadata(mint):
-            reasons.append("Missing on-chain metadata")
-            confidence += 0.2
-        
-        # Check for few holders
-        if self.has_few_holders(mint):
-            reasons.append(f"Few token holders (<{HONEYPOT_HEURISTICS['unusual_holders_threshold']})")
-            confidence += 0.25
+        # Price, metadata and holder checks come from the verdict cache
+        return self._score_token(mint, self.token_verdict(mint, has_metadata))
+    
+    def _score_token(self, mint, verdict):
+        """Add local velocity to a remote verdict and list the mint if it scores as a honeypot"""
+        reasons = list(verdict["reasons"])
+        confidence = verdict["confidence"]
         
-        # Check for high transaction velocity
+        # Check for high transaction velocity (local state, never cached)
         if self.has_high_velocity(mint):
             reasons.append("High transaction velocity")
             confidence += 0.25
             
         # If confidence is high enough, mark as honeypot
         if confidence >= 0.5:
-            self.honeypots.add(mint)
-            self.save_honeypots()
+            self.add_honeypot(mint, "; ".join(reasons))
             return True, confidence, reasons
             
         return False, confidence, reasons
+    
+    def prefetch_metadata(self, mints):
+        """
+        Check which mints have Metaplex metadata with batched getMultipleAccounts
+        calls on the derived metadata addresses
+        Returns {mint: bool}; mints that could not be checked are left out
+        """
+        addresses = {}
+        for mint in mints:
+            try:
+                addresses[mint] = metadata_address(mint)
+            except ValueError:
+                continue
+        accounts = self.solana_rpc.get_multiple_accounts(list(addresses.values()))
+        return {
+            mint: accounts[address] is not None
+            for mint, address in addresses.items()
+            if address in accounts
+        }
+    
+    def analyze_tokens(self, mints):
+        """
+        Screen many tokens at once
+        Duplicates are dropped, metadata is fetched in batches and the remote
+        lookups run concurrently. Verdicts are scored and applied (velocity,
+        honeypot listing) on the calling thread as each lookup completes,
+        and yielded as (mint, is_suspicious, confidence, reasons).
+        """
+        pending = []
+        for mint in dict.fromkeys(mints):
+            if mint in self.whitelist or mint in self.honeypots or self.cached_verdict(mint):
+                # Answered locally, no remote calls needed
+                yield (mint, *self.analyze_token(mint))
+            else:
+                pending.append(mint)
+        
+        if not pending:
+            return
+        
+        metadata = self.prefetch_metadata(pending)
+        futures = {
+            self.screen_pool.submit(self.token_verdict, mint, metadata.get(mint)): mint
+            for mint in pending
+        }
+        for future in as_completed(futures):
+            mint = futures[future]
+            try:
+                verdict = future.result()
+            except Exception as e:
+                print(f"Error screening token {mint}: {e}")
+                yield mint, False, 0, [f"Screening failed: {e}"]
+                continue
+            if mint in self.whitelist or mint in self.honeypots:
+                # Listed or whitelisted while its lookups ran
+                yield (mint, *self.analyze_token(mint))
+            else:
+                yield (mint, *self._score_token(mint, verdict))
@@ -0,0 +1,115 @@
+"""
+Background re-scoring of known honeypot tokens
+Keeps a materialized snapshot of price, holder count and honeypot score for
+every known honeypot so the dashboard can be served without remote calls.
+A background thread refreshes the stalest entries first.
+"""
+import threading
+import time
+from concurrent.futures import as_completed
+from config import HONEYPOT_RESCORE_INTERVAL, HONEYPOT_RESCORE_BATCH, HONEYPOT_RESCORE_MIN_AGE, HONEYPOT_SNAPSHOT_MAX
+
+
+class HoneypotStats:
+    """
+    Materialized honeypot stats, refreshed by a background thread
+
+    Entries are {"mint", "price", "holders", "confidence", "reasons",
+    "checked_at"}; price/holders/checked_at stay None until the first
+    re-score. New honeypots are picked up through the detector's listeners.
+    """
+
+    def __init__(self, honeypot_detector, interval=HONEYPOT_RESCORE_INTERVAL, batch_size=HONEYPOT_RESCORE_BATCH,
+                 min_age=HONEYPOT_RESCORE_MIN_AGE, max_entries=HONEYPOT_SNAPSHOT_MAX):
+        self.honeypot_detector = honeypot_detector
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        # Imported blocklists can be huge; only the first max_entries are tracked
+        for mint in honeypot_detector.honeypots.page(0, max_entries):
+            self._track(mint)
+        honeypot_detector.listeners.append(self._on_change)
+
+    def _track(self, mint):
+        if mint not in self.entries and len(self.entries) < self.max_entries:
+            self.entries[mint] = {
+                "mint": mint,
+                "price": None,
+                "holders": None,
+                "confidence": None,
+                "reasons": [],
+                "checked_at": None
+            }
+
+    def _on_change(self, kind, mint, reason=""):
+        with self.lock:
+            if kind == "honeypot":
+                self._track(mint)
+            elif kind == "whitelist":
+                self.entries.pop(mint, None)
+
+    def stale_mints(self, now=None):
+        """Mints due for re-scoring, never-checked first, then oldest"""
+        now = time.time() if now is None else now
+        with self.lock:
+            due = [
+                entry for entry in self.entries.values()
+                if entry["checked_at"] is None or now - entry["checked_at"] >= self.min_age
+            ]
+        due.sort(key=lambda entry: entry["checked_at"] or 0)
+        return [entry["mint"] for entry in due[:self.batch_size]]
+
+    def rescore(self, mints):
+        """Refresh the given mints concurrently and update the snapshot"""
+        pool = self.honeypot_detector.screen_pool
+        futures = {pool.submit(self.honeypot_detector.refresh_verdict, mint): mint for mint in mints}
+        for future in as_completed(futures):
+            mint = futures[future]
+            try:
+                verdict = future.result()
+            except Exception as e:
+                print(f"Error re-scoring honeypot {mint}: {e}")
+                continue
+            with self.lock:
+                entry = self.entries.get(mint)
+                if entry is None:
+                    continue  # Whitelisted while we were scoring
+                entry.update(
+                    price=verdict["price"],
+                    holders=verdict["holders"],
+                    confidence=verdict["confidence"],
+                    reasons=verdict["reasons"],
+                    checked_at=verdict["checked_at"]
+                )
+
+    def snapshot(self):
+        """Current stats for all tracked honeypots, with each entry's age in seconds"""
+        now = time.time()
+        with self.lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        for entry in entries:
+            entry["age"] = round(now - entry["checked_at"], 1) if entry["checked_at"] else None
+        return entries
+
+    def run(self):
+        """Re-score loop; runs forever"""
+        while True:
+            try:
+                mints = self.stale_mints()
+                if mints:
+                    self.rescore(mints)
+            except Exception as e:
+                print(f"Honeypot re-score error: {e}")
+                mints = []
+            # Work through a backlog of stale entries without the full wait
+            time.sleep(self.interval if len(mints) < self.batch_size else 1)
+
+    def start(self):
+        """Start the background re-score thread"""
+        thread = threading.Thread(target=self.run, name="honeypot-rescore")
+        thread.daemon = True
+        thread.start()
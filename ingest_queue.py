@@ -0,0 +1,218 @@
+"""
+Bounded ingest queue between signature discovery and transaction decoding
+Keeps a fixed number of signatures in memory, spills the overflow to a
+local JSONL file, sheds likely spam first under load and pushes back on
+discovery once both memory and disk are full
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from config import (INGEST_QUEUE_SIZE, INGEST_SPILL_LIMIT, INGEST_SHED_WATERMARK, INGEST_SPILL_DIR,
+                    INGEST_PRIORITY_SIZE, INGEST_PRIORITY_BURST)
+
+# put() results
+QUEUED = "queued"
+SPILLED = "spilled"
+SHED = "shed"
+REJECTED = "rejected"
+
+class IngestQueue:
+    """
+    FIFO queue of getSignaturesForAddress entries with explicit backpressure
+
+    Signatures that `scorer` rates above zero (known-bad mint, counterparty
+    or phishing link) jump ahead in a priority lane, highest score first.
+    The priority lane yields to the routine lane after every `priority_burst`
+    items so routine transfers are never starved.
+
+    Failed transactions wait in a low-priority lane. They are the only
+    signatures ever dropped, and only once the queue's load (memory plus
+    spill) reaches `shed_watermark`; below it they spill like routine work.
+    Memos are not a spam signal: memo links are what phishing detection
+    reads. Dropped signatures are reported through `on_shed` so the caller
+    can checkpoint past them.
+    """
+
+    def __init__(self, name, max_memory=INGEST_QUEUE_SIZE, max_spill=INGEST_SPILL_LIMIT,
+                 shed_watermark=INGEST_SHED_WATERMARK, spill_dir=INGEST_SPILL_DIR, on_shed=None,
+                 scorer=None, max_priority=INGEST_PRIORITY_SIZE, priority_burst=INGEST_PRIORITY_BURST):
+        self.max_memory = max_memory
+        self.max_spill = max_spill
+        self.shed_watermark = shed_watermark
+        self.on_shed = on_shed
+        self.scorer = scorer
+        self.max_priority = max_priority
+        self.priority_burst = priority_burst
+        self.cond = threading.Condition()
+
+        self.high = []          # Heap of (-score, seq, sig_info); seq keeps equal scores FIFO
+        self.memory = deque()   # Normal signatures, oldest first
+        self.low = deque()      # Spam lane, served only when nothing else waits
+        self.sequence = itertools.count()
+        self.priority_streak = 0
+
+        # Spilled signatures are newer than everything in `memory`
+        os.makedirs(spill_dir, exist_ok=True)
+        self.spill_path = os.path.join(spill_dir, f"{name}.jsonl")
+        # Durable state lives in the poll checkpoint, so spill is scratch space
+        self.spill_file = open(self.spill_path, "w+")
+        self.spill_count = 0
+        self.spill_offset = 0
+
+        self.stats = {"queued": 0, "prioritized": 0, "spilled": 0, "shed": 0, "rejected": 0, "processed": 0}
+        self.last_processed_block_time = None
+
+    def is_spam(self, sig_info):
+        """Cheap pre-decode spam guess from signature metadata (failed transactions)"""
+        return bool(sig_info.get("err"))
+
+    def depth(self):
+        """Number of signatures waiting to be decoded"""
+        return len(self.high) + len(self.memory) + len(self.low) + self.spill_count
+
+    def load(self):
+        """Fill level of the routine lanes across memory and spill, 0.0 - 1.0"""
+        return (self.depth() - len(self.high)) / float(self.max_memory + self.max_spill)
+
+    def score(self, sig_info):
+        """Pre-decode risk score; 0 means routine"""
+        if not self.scorer:
+            return 0
+        try:
+            return self.scorer(sig_info) or 0
+        except Exception as e:
+            print(f"Ingest pre-score error: {e}")
+            return 0
+
+    def _shed(self, sig_info):
+        self.stats["shed"] += 1
+        if self.on_shed:
+            self.on_shed(sig_info)
+
+    def put(self, sig_info):
+        """
+        Offer a signature to the queue
+        Returns QUEUED, SPILLED, SHED or REJECTED; REJECTED means the caller
+        must stop producing and retry later
+        """
+        score = self.score(sig_info)
+        with self.cond:
+            if score > 0 and len(self.high) < self.max_priority:
+                heapq.heappush(self.high, (-score, next(self.sequence), sig_info))
+                self.stats["queued"] += 1
+                self.stats["prioritized"] += 1
+                self.cond.notify()
+                return QUEUED
+
+            in_memory = len(self.memory) + len(self.low)
+            if self.is_spam(sig_info):
+                if self.load() >= self.shed_watermark:
+                    self._shed(sig_info)
+                    return SHED
+                if not self.spill_count and in_memory < self.max_memory:
+                    self.low.append(sig_info)
+                    self.stats["queued"] += 1
+                    self.cond.notify()
+                    return QUEUED
+                # Memory is full: spill it with routine work rather than drop it
+
+            if not self.spill_count and in_memory < self.max_memory:
+                self.memory.append(sig_info)
+                self.stats["queued"] += 1
+                self.cond.notify()
+                return QUEUED
+
+            if self.spill_count < self.max_spill:
+                self.spill_file.seek(0, os.SEEK_END)
+                self.spill_file.write(json.dumps(sig_info) + "\n")
+                self.spill_count += 1
+                self.stats["spilled"] += 1
+                self.cond.notify()
+                return SPILLED
+
+            self.stats["rejected"] += 1
+            return REJECTED
+
+    def _refill(self):
+        """Move the oldest spilled signatures back into memory"""
+        self.spill_file.flush()
+        self.spill_file.seek(self.spill_offset)
+        room = max(1, self.max_memory - len(self.memory) - len(self.low))
+        while room and self.spill_count:
+            line = self.spill_file.readline()
+            if not line:
+                break
+            self.memory.append(json.loads(line))
+            self.spill_count -= 1
+            room -= 1
+        self.spill_offset = self.spill_file.tell()
+        if not self.spill_count:
+            self.spill_file.seek(0)
+            self.spill_file.truncate()
+            self.spill_offset = 0
+
+    def get(self, timeout=None):
+        """
+        Take the next signature, or None after `timeout` seconds
+        Highest-risk first, with one routine item after each priority burst
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.cond:
+            while True:
+                if not self.memory and self.spill_count:
+                    self._refill()
+                if self.high and (self.priority_streak < self.priority_burst or not self.memory):
+                    self.priority_streak += 1
+                    return heapq.heappop(self.high)[2]
+                self.priority_streak = 0
+                if self.memory:
+                    return self.memory.popleft()
+                if self.low:
+                    return self.low.popleft()
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+
+    def task_done(self, sig_info):
+        """Record that a signature taken from the queue was decoded"""
+        with self.cond:
+            self.stats["processed"] += 1
+            if sig_info.get("blockTime"):
+                self.last_processed_block_time = sig_info["blockTime"]
+
+    def _oldest_block_time(self):
+        times = [lane[0].get("blockTime") for lane in (self.memory, self.low) if lane]
+        times.extend(entry[2].get("blockTime") for entry in self.high)
+        times = [t for t in times if t]
+        return min(times) if times else None
+
+    def metrics(self):
+        """Queue depth, shed/reject counts and lag behind the chain tip in seconds"""
+        with self.cond:
+            now = time.time()
+            oldest = self._oldest_block_time()
+            return dict(
+                self.stats,
+                depth=self.depth(),
+                high_priority=len(self.high),
+                in_memory=len(self.memory),
+                low_priority=len(self.low),
+                spilled_waiting=self.spill_count,
+                load=round(self.load(), 4),
+                # Chain tip is taken as wall-clock time (slots are ~400ms)
+                lag_seconds=round(now - oldest, 1) if oldest else 0,
+                processed_lag_seconds=(
+                    round(now - self.last_processed_block_time, 1)
+                    if self.last_processed_block_time else None
+                )
+            )
+
+    def close(self):
+        """Release the spill file"""
+        with self.cond:
+            self.spill_file.close()
@@ -0,0 +1,184 @@
+"""
+Write-behind persistence for JSON state files
+Owners change their state in memory and record each change here. The change
+is appended to a journal next to the file (one JSON line) right away, and the
+file itself is rewritten from the owner's current state once changes have
+been quiet for PERSIST_FLUSH_DELAY seconds (at most PERSIST_MAX_DELAY after
+the first unsaved one), through a temp file and an atomic rename. A burst of
+changes - a Sybil group flagging dozens of wallets - costs one rewrite.
+
+On load the file is read and the journal replayed over it, so changes made
+since the last rewrite survive a crash. A crash during a rewrite can replay
+changes the new file already holds, so journal records must be idempotent
+(set additions and removals, capped appends).
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from config import PERSIST_FLUSH_DELAY, PERSIST_MAX_DELAY
+
+
+def replay_set(values, records):
+    """Apply ["add" | "discard", value] journal records to a set"""
+    for op, value in records:
+        if op == "add":
+            values.add(value)
+        elif op == "discard":
+            values.discard(value)
+    return values
+
+
+class JsonStore:
+    """
+    Debounced, journaled writer for one JSON file
+    `dump` returns the full JSON-serializable state; it is called from the
+    writer thread, so it should copy (list(a_set), dict(a_dict)) rather
+    than hand out live objects.
+    """
+
+    def __init__(self, path, dump, indent=None, delay=PERSIST_FLUSH_DELAY, max_delay=PERSIST_MAX_DELAY):
+        # Absolute, so journal appends and the exit flush ignore later chdir calls
+        self.path = os.path.abspath(path)
+        self.journal_path = f"{self.path}.journal"
+        self.flushing_path = f"{self.path}.journal.flushing"   # Journal of a rewrite in progress
+        self.dump = dump
+        self.indent = indent
+        self.delay = delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.write_lock = threading.Lock()
+        self.journal = None
+        self.pending = 0              # Changes not yet in the file
+        self.first_change = 0
+        self.last_change = 0
+        self.thread = None
+        self.stats = {"changes": 0, "flushes": 0, "errors": 0, "last_flush_ms": 0}
+
+    def load(self):
+        """Read the file and its journal; returns (data or None, journal records oldest first)"""
+        data = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not read {self.path}: {e}")
+        records = []
+        for path in (self.flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break   # Torn last line from a crash mid-append
+        return data, records
+
+    def record(self, change):
+        """Journal one change and schedule a rewrite of the file"""
+        line = json.dumps(change, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.journal is None:
+                self.journal = open(self.journal_path, "a")
+            self.journal.write(line)
+            self.journal.flush()
+            self._schedule()
+
+    def touch(self):
+        """Schedule a rewrite without journaling (for state that is cheap to lose)"""
+        with self.lock:
+            self._schedule()
+
+    def _schedule(self):
+        now = time.time()
+        if not self.pending:
+            self.first_change = now
+            self.changed.notify()
+        self.pending += 1
+        self.last_change = now
+        self.stats["changes"] += 1
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name=f"json-store-{os.path.basename(self.path)}")
+            self.thread.daemon = True
+            self.thread.start()
+            atexit.register(self.flush)
+
+    def _rotate_journal(self):
+        """Move the journal aside; records from now on belong to the next rewrite"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.flushing_path):
+            # A failed rewrite left its journal behind; keep its records too
+            with open(self.journal_path, "r") as src, open(self.flushing_path, "a") as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.flushing_path)
+
+    def flush(self):
+        """Rewrite the file now if changes are pending; returns True if it was written"""
+        with self.write_lock:
+            with self.lock:
+                if not self.pending:
+                    return False
+                started = time.perf_counter()
+                pending, self.pending = self.pending, 0
+                try:
+                    data = self.dump()
+                    self._rotate_journal()
+                except Exception as e:
+                    self._failed(pending, e)
+                    return False
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.path)}-", dir=directory)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=self.indent)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                if os.path.exists(self.flushing_path):
+                    os.remove(self.flushing_path)
+            except (OSError, TypeError, ValueError) as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self.lock:
+                    self._failed(pending, e)
+                return False
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return True
+
+    def _failed(self, pending, error):
+        # Retry after another delay; the journal still holds the changes
+        print(f"Error writing {self.path}: {error}")
+        self.stats["errors"] += 1
+        if not self.pending:
+            self.first_change = time.time()
+        self.pending += pending
+        self.last_change = time.time()
+
+    def run(self):
+        """Writer loop; runs forever"""
+        while True:
+            with self.lock:
+                while not self.pending:
+                    self.changed.wait()
+                wait = min(self.last_change + self.delay, self.first_change + self.max_delay) - time.time()
+                if wait > 0:
+                    self.changed.wait(wait)
+                    continue
+            self.flush()
+
+    def metrics(self):
+        """Change and rewrite counters"""
+        return dict(self.stats, path=self.path, pending=self.pending)
@@ -7,28 +7,60 @@ import os
 import sys
 import json
 import threading
+import time
 import hmac
 import hashlib
 import base64
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request, redirect
+from flask import Flask, render_template, jsonify, request, redirect, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from solana_rpc import SolanaRPC
 from honeypot_detector import HoneypotDetector
 from notification_service import NotificationService
 from wallet_monitor import WalletMonitor
+from sharded_monitor import ShardedMonitor
+from honeypot_stats import HoneypotStats
+from snapshot import DetectorSnapshots
 from suspicious_activity import SuspiciousActivityDetector
 from phishing_detector import PhishingDetector
 from twitter_service import TwitterService
-from config import WEB_PORT, WEB_HOST, HONEYPOT_FILE, WHITELIST_FILE, TOKEN_MAP, SUSPICIOUS_ADDRESSES_FILE, SWAP_PROGRAM_IDS
+from models import Record
+from config import WEB_PORT, WEB_HOST, HONEYPOT_FILE, WHITELIST_FILE, TOKEN_MAP, SUSPICIOUS_ADDRESSES_FILE, SWAP_PROGRAM_IDS, MONITOR_SHARDS, TOKEN_SCREEN_MAX
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes compact transaction records"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
 # Initialize Flask app
 app = Flask(__name__)
+# Transaction records become JSON only here, at the API boundary
+app.json = RecordJSONProvider(app)
 
 # Global variables
 monitor = None
+honeypot_stats = None
 wallet_address = None
 suspicious_detector = None
 phishing_detector = None
+snapshots = None
+
+def int_arg(name, default, low=0, high=None):
+    """Integer query parameter clamped to [low, high]; None if it is not an integer"""
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return None
+    value = max(low, value)
+    return min(value, high) if high is not None else value
+
+def is_str_list(value):
+    """True if a JSON body field is a list of strings"""
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
 
 @app.route('/')
 def index():
@@ -114,32 +146,54 @@ def api_transactions():
 
 @app.route('/api/honeypots')
 def api_honeypots():
-    """Get honeypot tokens"""
+    """Get honeypot tokens from the background-refreshed snapshot"""
+    if not monitor or not honeypot_stats:
+        return jsonify({'error': 'Wallet monitor not initialized'}), 400
+    
+    return jsonify(honeypot_stats.snapshot())
+
+@app.route('/api/ingest/metrics')
+def api_ingest_metrics():
+    """Get ingest queue depth, shed counts and lag behind the chain tip"""
     if not monitor:
         return jsonify({'error': 'Wallet monitor not initialized'}), 400
     
-    try:
-        honeypots = []
-        for mint in monitor.honeypot_detector.honeypots:
-            price = monitor.solana_rpc.get_token_price_usd(mint)
-            honeypots.append({
-                'mint': mint,
-                'price': price,
-                'holders': monitor.solana_rpc.get_token_holders(mint)
-            })
-        return jsonify(honeypots)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return jsonify(monitor.ingest_metrics())
+
+@app.route('/api/detectors')
+def api_detectors():
+    """Get per-detector run times, timeouts and late results"""
+    if not monitor:
+        return jsonify({'error': 'Wallet monitor not initialized'}), 400
+    if isinstance(monitor, ShardedMonitor):
+        return jsonify({'error': 'Detectors run inside the shard processes'}), 400
+    
+    return jsonify(monitor.detectors.metrics())
+
+@app.route('/api/shards')
+def api_shards():
+    """Get the watchlist partition and liveness of each shard process"""
+    if not isinstance(monitor, ShardedMonitor):
+        return jsonify({'error': 'Sharded monitoring not enabled'}), 400
+    
+    return jsonify({
+        'shards': monitor.partition(),
+        'processes': monitor.shard_status()
+    })
 
 @app.route('/api/whitelist')
 def api_whitelist():
-    """Get whitelisted tokens"""
+    """Get a page of whitelisted tokens (?offset=&limit=)"""
     if not monitor:
         return jsonify({'error': 'Wallet monitor not initialized'}), 400
     
+    offset = int_arg('offset', 0)
+    limit = int_arg('limit', 100, low=1, high=1000)
+    if offset is None or limit is None:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
     try:
         whitelist = []
-        for mint in monitor.honeypot_detector.whitelist:
+        for mint in monitor.honeypot_detector.whitelist.page(offset, limit):
             token_name = TOKEN_MAP.get(mint, (f"Token ({mint[:4]}...{mint[-4:]})", 6))[0]
             price = monitor.solana_rpc.get_token_price_usd(mint)
             whitelist.append({
@@ -168,16 +222,61 @@ def api_token_info(mint):
     
     is_honeypot = monitor.honeypot_detector.is_honeypot(mint)
     is_whitelisted = mint in monitor.honeypot_detector.whitelist
-    price = monitor.solana_rpc.get_token_price_usd(mint)
-    holders = monitor.solana_rpc.get_token_holders(mint)
+    verdict = monitor.honeypot_detector.token_verdict(mint)
     
     return jsonify({
         'mint': mint,
         'is_honeypot': is_honeypot,
         'is_whitelisted': is_whitelisted,
-        'price': price,
-        'holders': holders
+        'price': verdict['price'],
+        'holders': verdict['holders'],
+        'confidence': verdict['confidence'],
+        'reasons': verdict['reasons'],
+        'verdict_age': round(time.time() - verdict['checked_at'], 1)
     })
+
+@app.route('/api/tokens/screen', methods=['POST'])
+def api_screen_tokens():
+    """
+    Screen a batch of tokens for honeypot characteristics
+    Body: {"mints": [...]} and/or {"wallet": address} to screen every token
+    the wallet holds. Streams one JSON object per line as verdicts complete.
+    """
+    if not monitor:
+        return jsonify({'error': 'Wallet monitor not initialized'}), 400
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    if not is_str_list(data.get('mints', [])):
+        return jsonify({'error': 'mints must be a list of strings'}), 400
+    if not isinstance(data.get('wallet', ''), str):
+        return jsonify({'error': 'wallet must be a string'}), 400
+    mints = list(data.get('mints', []))
+    
+    if data.get('wallet'):
+        token_accounts = monitor.solana_rpc.get_token_accounts(data['wallet']) or {}
+        for account in token_accounts.get('value', []):
+            try:
+                mints.append(account['account']['data']['parsed']['info']['mint'])
+            except (KeyError, TypeError):
+                continue
+    
+    mints = list(dict.fromkeys(m for m in mints if isinstance(m, str) and m))
+    if not mints:
+        return jsonify({'error': 'No mints to screen'}), 400
+    if len(mints) > TOKEN_SCREEN_MAX:
+        return jsonify({'error': f'At most {TOKEN_SCREEN_MAX} mints per request'}), 400
+    
+    def generate():
+        for mint, is_suspicious, confidence, reasons in monitor.honeypot_detector.analyze_tokens(mints):
+            yield json.dumps({
+                'mint': mint,
+                'is_honeypot': is_suspicious,
+                'confidence': confidence,
+                'reasons': reasons
+            }) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
 @app.route('/api/settings/notification', methods=['POST'])
 def api_save_notification_settings():
@@ -270,12 +369,95 @@ def api_suspicious_activity():
 
 @app.route('/api/suspicious/addresses')
 def api_suspicious_addresses():
-    """Get list of suspicious addresses"""
+    """Get a page of suspicious addresses (?offset=&limit=)"""
     if not suspicious_detector:
         return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
     
-    addresses = list(suspicious_detector.suspicious_addresses)
+    offset = int_arg('offset', 0)
+    limit = int_arg('limit', 1000, low=1, high=10000)
+    if offset is None or limit is None:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    # Imported blocklists can hold millions of keys; only the page is encoded
+    addresses = suspicious_detector.suspicious_addresses.page(offset, limit)
     return jsonify(addresses)
+
+@app.route('/api/suspicious/reputation')
+def api_suspicious_reputation():
+    """Search flagged addresses by prefix/suffix, or list the highest-scoring ones"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    prefix = request.args.get('prefix', '')
+    suffix = request.args.get('suffix', '')
+    limit = int_arg('limit', 50, low=1, high=1000)
+    if limit is None:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if prefix or suffix:
+        return jsonify(suspicious_detector.reputation.search(prefix, suffix, limit))
+    return jsonify(suspicious_detector.reputation.top(limit))
+
+@app.route('/api/suspicious/reputation/<address>')
+def api_suspicious_reputation_address(address):
+    """Get the reputation (reasons, hits, score) of one address"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    reputation = suspicious_detector.reputation_of(address)
+    if not reputation:
+        return jsonify({'error': 'Address is not flagged'}), 404
+    return jsonify(reputation)
+
+@app.route('/api/suspicious/reputation/lookup', methods=['POST'])
+def api_suspicious_reputation_lookup():
+    """Get the reputations of many addresses at once; unflagged addresses are left out"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    addresses = data.get('addresses', [])
+    if not is_str_list(addresses):
+        return jsonify({'error': 'addresses must be a list of strings'}), 400
+    addresses = addresses[:1000]
+    return jsonify(suspicious_detector.reputation.lookup(addresses))
+
+@app.route('/api/suspicious/state')
+def api_suspicious_state():
+    """Get size and eviction metrics of the suspicious activity tracking state"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    return jsonify(suspicious_detector.state_metrics())
+
+@app.route('/api/suspicious/rules')
+def api_suspicious_rules():
+    """Get the loaded suspicious activity rules with evaluation counts and cost"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    return jsonify(suspicious_detector.rules.metrics())
+
+@app.route('/api/suspicious/rules/reload', methods=['POST'])
+def api_suspicious_rules_reload():
+    """Reload suspicious activity rules from the rules file"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    if not suspicious_detector.rules.reload():
+        return jsonify({'success': False, 'error': suspicious_detector.rules.error}), 400
+    # Shards evaluate with their own engines; they re-read the same rules file
+    if isinstance(monitor, ShardedMonitor):
+        monitor.reload_rules()
+    return jsonify({'success': True, 'source': suspicious_detector.rules.source})
+
+@app.route('/api/snapshots')
+def api_snapshots():
+    """Get detector state snapshot metrics"""
+    if not snapshots:
+        return jsonify({'error': 'Detector snapshots not initialized'}), 400
+    
+    return jsonify(snapshots.metrics())
     
 
 @app.route('/api/donations', methods=['GET'])
@@ -639,91 +821,73 @@ def api_network_graph():
     
     # Get query parameters for filtering
     address_filter = request.args.get('address')
-    activity_type = request.args.get('activityType')
-    risk_level = request.args.get('riskLevel')
     time_frame = request.args.get('timeFrame', '7d')
-    
-    # In a real implementation, this would:
-    # 1. Query transactions involving the wallet and suspicious addresses
-    # 2. Build a graph of related addresses
-    # 3. Apply the filters
-    # 4. Return the graph data
-    
-    # For demonstration purposes, return a simple mock network
-    suspicious_addresses = list(suspicious_detector.suspicious_addresses)[:5]
-    
-    # Create a simple network structure
-    nodes = [
-        {"id": wallet_address, "label": f"{wallet_address[:4]}...{wallet_address[-4:]}", "type": "wallet"}
-    ]
-    
-    edges = []
-    
-    # Add suspicious addresses as nodes
-    for i, address in enumerate(suspicious_addresses):
-        nodes.append({
+    hops = int_arg('hops', 2, high=4)
+    if hops is None:
+        return jsonify({'error': 'hops must be an integer'}), 400
+    
+    center = address_filter or wallet_address
+    frames = {'24h': 24 * 3600, '7d': 7 * 24 * 3600, '30d': 30 * 24 * 3600}
+    since = time.time() - frames[time_frame] if time_frame in frames else None
+    
+    # Transfers around the address, from the detector's fund-flow graph
+    addresses, transfers = suspicious_detector.fund_graph.neighborhood(center, hops, since=since)
+    if center not in addresses:
+        addresses.insert(0, center)
+    
+    reputations = suspicious_detector.reputation.lookup(addresses)
+    nodes = []
+    for address in addresses:
+        if address == center:
+            node_type = "wallet"
+        elif suspicious_detector.is_suspicious_address(address):
+            node_type = "suspicious"
+        else:
+            node_type = "unknown"
+        node = {
             "id": address,
             "label": f"{address[:4]}...{address[-4:]}",
-            "type": "suspicious"
-        })
-        
-        # Connect to wallet sometimes
-        if i % 2 == 0:
-            edges.append({
-                "source": wallet_address,
-                "target": address,
-                "weight": 1 + i,
-                "type": "transfer"
-            })
-    
-    # Add some random addresses connected to suspicious ones
-    for i in range(10):
-        random_address = f"Addr{i+1:02d}" + "1" * 35
-        nodes.append({
-            "id": random_address,
-            "label": f"{random_address[:4]}...{random_address[-4:]}",
-            "type": "unknown"
-        })
-        
-        # Connect to a suspicious address
-        target_idx = i % len(suspicious_addresses)
-        edges.append({
-            "source": random_address,
-            "target": suspicious_addresses[target_idx],
-            "weight": 1,
-            "type": "transfer"
-        })
-        
-        # Sometimes connect to wallet
-        if i % 3 == 0:
-            edges.append({
-                "source": wallet_address,
-                "target": random_address,
-                "weight": 1,
-                "type": "transfer"
-            })
-    
-    # Add some trusted addresses
-    for i in range(3):
-        trusted_address = f"Trust{i+1:02d}" + "1" * 34
-        nodes.append({
-            "id": trusted_address,
-            "label": f"{trusted_address[:4]}...{trusted_address[-4:]}",
-            "type": "trusted"
-        })
-        
-        # Always connect to wallet
-        edges.append({
-            "source": wallet_address,
-            "target": trusted_address,
-            "weight": 2 + i,
+            "type": node_type
+        }
+        if address in reputations:
+            node["reason"] = reputations[address]["reason"]
+            node["score"] = reputations[address]["score"]
+        nodes.append(node)
+    
+    edges = [
+        {
+            "source": transfer["source"],
+            "target": transfer["target"],
+            "weight": transfer["count"],
+            "sol": transfer["sol"],
             "type": "transfer"
-        })
+        }
+        for transfer in transfers
+    ]
     
     return jsonify({
         "nodes": nodes,
         "edges": edges
     })
+
+@app.route('/api/suspicious/trace/<address>')
+def api_suspicious_trace(address):
+    """Trace funds received by an address back to a flagged address"""
+    if not suspicious_detector:
+        return jsonify({'error': 'Suspicious activity detector not initialized'}), 400
+    
+    hops = int_arg('hops', 3, high=6)
+    if hops is None:
+        return jsonify({'error': 'hops must be an integer'}), 400
+    start = time.perf_counter()
+    path = suspicious_detector.fund_graph.trace_sources(address, suspicious_detector.suspicious_addresses, hops)
+    return jsonify({
+        'address': address,
+        'path': path,
+        'hops': len(path) - 1 if path else None,
+        'query_ms': round((time.perf_counter() - start) * 1000, 3),
+        'graph': suspicious_detector.fund_graph.metrics()
+    })
     
 @app.route('/api/phishing')
 def api_phishing_alerts():
@@ -766,6 +930,41 @@ def api_check_phishing():
         'reason': reason
     })
 
+@app.route('/api/phishing/domains')
+def api_phishing_domains():
+    """Get the loaded phishing domain feeds"""
+    if not phishing_detector:
+        return jsonify({'error': 'Phishing detector not initialized'}), 400
+
+    return jsonify(phishing_detector.domains.metrics())
+
+@app.route('/api/phishing/domains/check')
+def api_phishing_domains_check():
+    """Check a domain against the phishing domain feeds and patterns"""
+    if not phishing_detector:
+        return jsonify({'error': 'Phishing detector not initialized'}), 400
+    domain = request.args.get('domain', '')
+    if not domain:
+        return jsonify({'error': 'Missing domain'}), 400
+
+    match = phishing_detector.domains.match(domain)
+    return jsonify({
+        'domain': domain,
+        'is_phishing': match is not None,
+        'source': match[0] if match else None,
+        'matched': match[1] if match else None
+    })
+
+@app.route('/api/phishing/domains/reload', methods=['POST'])
+def api_phishing_domains_reload():
+    """Reload the phishing domain feeds now (shards pick up changed feeds on their own)"""
+    if not phishing_detector:
+        return jsonify({'error': 'Phishing detector not initialized'}), 400
+
+    if not phishing_detector.domains.reload():
+        return jsonify({'success': False, 'error': phishing_detector.domains.error}), 400
+    return jsonify({'success': True, 'entries': phishing_detector.domains.entries})
+
 # DEX Swap Webhook Routes
 @app.route('/api/swaps/raydium', methods=['GET'])
 def api_raydium_swaps():
@@ -1377,7 +1576,8 @@ def twitter_webhook_event():
                     for address in item['addresses']:
                         suspicious_detector.add_suspicious_address(
                             address, 
-                            f"Mentioned on Twitter by @{item['username']}"
+                            f"Mentioned on Twitter by @{item['username']}",
+                            "social_mention"
                         )
     
     # Process the different event types
@@ -1444,7 +1644,7 @@ def process_twitter_mention(tweet):
 
 def start_monitor(wallet):
     """Start the wallet monitor in a separate thread"""
-    global monitor, wallet_address, suspicious_detector, phishing_detector
+    global monitor, honeypot_stats, wallet_address, suspicious_detector, phishing_detector, snapshots
     
     wallet_address = wallet
     
@@ -1455,6 +1655,17 @@ def start_monitor(wallet):
     suspicious_detector = SuspiciousActivityDetector(solana_rpc)
     phishing_detector = PhishingDetector(solana_rpc)
     
+    # Warm restart: pick the detectors' windows up from the last snapshot
+    snapshots = DetectorSnapshots({
+        "suspicious": suspicious_detector,
+        "phishing": phishing_detector,
+        "honeypot": honeypot_detector
+    })
+    restored = snapshots.restore()
+    if restored:
+        print(f"Restored {restored} tracked entries from {snapshots.path}")
+    snapshots.start()
+    
     # Create and start the monitor
     monitor = WalletMonitor(
         wallet, 
@@ -1469,25 +1680,58 @@ def start_monitor(wallet):
     monitor_thread = threading.Thread(target=monitor.poll_wallet)
     monitor_thread.daemon = True
     monitor_thread.start()
+    
+    honeypot_stats = HoneypotStats(honeypot_detector)
+    honeypot_stats.start()
+
+def start_sharded_monitor(wallets, shard_count):
+    """Start monitoring a watchlist across worker processes"""
+    global monitor, honeypot_stats, wallet_address, suspicious_detector, phishing_detector
+    
+    wallet_address = wallets[0]
+    
+    # Primary detectors: they own the reputation files and sync the shards
+    solana_rpc = SolanaRPC()
+    honeypot_detector = HoneypotDetector(solana_rpc)
+    suspicious_detector = SuspiciousActivityDetector(solana_rpc)
+    phishing_detector = PhishingDetector(solana_rpc)
+    
+    monitor = ShardedMonitor(
+        wallets,
+        shard_count,
+        solana_rpc,
+        honeypot_detector,
+        suspicious_detector,
+        phishing_detector
+    )
+    monitor.start()
+    
+    honeypot_stats = HoneypotStats(honeypot_detector)
+    honeypot_stats.start()
 
 def main():
     """Main entry point for the application"""
     parser = argparse.ArgumentParser(description='Solana Wallet Monitor')
-    parser.add_argument('wallet', nargs='?', help='Solana wallet address to monitor')
+    parser.add_argument('wallet', nargs='*', help='Solana wallet address(es) to monitor')
     parser.add_argument('--web', action='store_true', help='Start the web dashboard')
+    parser.add_argument('--shards', type=int, default=MONITOR_SHARDS,
+                        help='Number of worker processes to spread the watchlist over (0 = in-process)')
     
     args = parser.parse_args()
     
-    # Use argument or environment variable for wallet address
-    wallet = args.wallet or os.getenv('WALLET_ADDRESS')
+    # Use arguments or environment variable (comma separated) for wallet addresses
+    wallets = args.wallet or [w.strip() for w in os.getenv('WALLET_ADDRESS', '').split(',') if w.strip()]
     
-    if not wallet:
+    if not wallets:
         print("Error: No wallet address provided.")
         print("Please specify a wallet address as an argument or set the WALLET_ADDRESS environment variable.")
         sys.exit(1)
     
     # Start the monitor
-    start_monitor(wallet)
+    if args.shards > 0 or len(wallets) > 1:
+        start_sharded_monitor(wallets, max(args.shards, 1))
+    else:
+        start_monitor(wallets[0])
     
     # Start the web dashboard if requested
     if args.web:
@@ -0,0 +1,228 @@
+"""
+Compact record types for decoded transactions
+Slotted dataclasses replace the nested dicts that used to repeat the same
+string keys for every transaction and event. Records still answer the
+dict-style reads (`get`, `[]`, `in`) the detectors and dashboard use, and
+are converted to plain JSON types only when persisted or served by the API
+"""
+from dataclasses import dataclass, field, fields, replace
+
+
+def to_plain(value):
+    """Recursively convert records (and containers of records) to JSON types"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    if isinstance(value, set):
+        return [to_plain(v) for v in value]
+    return value
+
+
+def copy_value(value):
+    """Copy of a field value with its records and containers copied too (lists become tuples)"""
+    if isinstance(value, Record):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: copy_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return tuple(copy_value(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+class Record:
+    """
+    Dict-compatible read access for slotted records
+    A field set to None is treated as absent, like a missing dict key
+    """
+    __slots__ = ()
+
+    def _keys(self):
+        return type(self).__slots__
+
+    def get(self, key, default=None):
+        if key in self._keys():
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self._keys():
+            raise KeyError(f"{type(self).__name__} has no field {key!r}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        return [k for k in self._keys() if getattr(self, k) is not None]
+
+    def to_dict(self):
+        """Plain dict for JSON output; None fields are omitted"""
+        return {k: to_plain(getattr(self, k)) for k in self.keys()}
+
+    def copy(self):
+        """Copy sharing nothing mutable with this record (see copy_value)"""
+        changes = {}
+        for k in self._keys():
+            value = getattr(self, k)
+            if isinstance(value, (Record, dict, list, tuple, set)):
+                changes[k] = copy_value(value)
+        return replace(self, **changes)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a dict, ignoring unknown keys"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+@dataclass(slots=True)
+class TransferEvent(Record):
+    """A SOL or SPL token movement into or out of the watched wallet"""
+    type: str                 # "sol_transfer" or "token_transfer"
+    direction: str            # "Received" or "Sent"
+    amount: float
+    other_address: str = None
+    token_name: str = None
+    mint: str = None
+    decimals: int = None
+
+
+@dataclass(slots=True)
+class SwapDetails(Record):
+    """DEX-specific swap analysis (Raydium/Jupiter log and route parsing)"""
+    price_impact: float = None
+    slippage: float = None
+    exchange_rate: float = None
+    usd_value: float = None
+    risk_level: str = None
+    risk_factors: list = None
+    account_tags: dict = None
+    swap_path: list = None
+    route_info: str = None
+    jupiter_version: str = None
+    pool_addresses: list = None
+    associated_accounts: list = None
+
+
+@dataclass(slots=True)
+class SwapEvent(Record):
+    """A swap through a known DEX program"""
+    program_id: str
+    dex_name: str
+    input_token: str = None
+    input_amount: float = None
+    input_mint: str = None
+    output_token: str = None
+    output_amount: float = None
+    output_mint: str = None
+    details: SwapDetails = None
+    type: str = "swap"
+
+    def get(self, key, default=None):
+        # Detail fields read as if they were top-level keys of the event
+        if self.details is not None and key in SwapDetails.__slots__:
+            return self.details.get(key, default)
+        return Record.get(self, key, default)
+
+    def keys(self):
+        keys = [k for k in Record.keys(self) if k != "details"]
+        if self.details is not None:
+            keys.extend(self.details.keys())
+        return keys
+
+    def to_dict(self):
+        data = {k: to_plain(getattr(self, k)) for k in Record.keys(self) if k != "details"}
+        if self.details is not None:
+            data.update(self.details.to_dict())
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        event = Record.from_dict.__func__(cls, data)
+        detail_keys = set(SwapDetails.__slots__)
+        if detail_keys.intersection(data):
+            event.details = SwapDetails.from_dict(data)
+        return event
+
+
+@dataclass(slots=True)
+class HoneypotFlag(Record):
+    mint: str
+    confidence: float
+    reasons: list
+
+
+@dataclass(slots=True)
+class SuspiciousFlag(Record):
+    reason: str
+    severity: str = "high"
+
+
+@dataclass(slots=True)
+class PhishingFlag(Record):
+    reason: str
+    confidence: float
+    severity: str
+
+
+def event_from_dict(data):
+    """Rebuild the right event record from its dict form"""
+    if data.get("type") == "swap":
+        return SwapEvent.from_dict(data)
+    return TransferEvent.from_dict(data)
+
+
+@dataclass(slots=True)
+class DecodedTransaction(Record):
+    """A decoded transaction as kept in WalletMonitor.transaction_history"""
+    signature: str
+    timestamp: str
+    block_time: int
+    account: str
+    events: list = field(default_factory=list)
+    honeypot_flags: list = field(default_factory=list)
+    suspicious_flags: list = field(default_factory=list)
+    phishing_flags: PhishingFlag = None
+    program_ids: list = field(default_factory=list)
+    webhook_data: dict = None
+    slot: int = None
+    flows: list = None      # (source, destination, sol) between other owners, from balance deltas
+
+    def frozen(self):
+        """Copy for detectors running alongside the monitor: events copied into tuples, no flags"""
+        return replace(
+            self, events=copy_value(self.events), program_ids=tuple(self.program_ids),
+            honeypot_flags=(), suspicious_flags=(), phishing_flags=None, webhook_data=None,
+            flows=copy_value(self.flows) if self.flows else None
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a transaction (and its nested records) from saved JSON"""
+        phishing = data.get("phishing_flags")
+        return cls(
+            signature=data.get("signature", ""),
+            timestamp=data.get("timestamp", ""),
+            block_time=data.get("block_time", 0),
+            account=data.get("account"),
+            events=[event_from_dict(e) for e in data.get("events", [])],
+            honeypot_flags=[HoneypotFlag.from_dict(f) for f in data.get("honeypot_flags", [])],
+            suspicious_flags=[SuspiciousFlag.from_dict(f) for f in data.get("suspicious_flags", [])],
+            phishing_flags=PhishingFlag.from_dict(phishing) if phishing else None,
+            program_ids=data.get("program_ids", []),
+            webhook_data=data.get("webhook_data"),
+            slot=data.get("slot"),
+            flows=[tuple(flow) for flow in data["flows"]] if data.get("flows") else None
+        )
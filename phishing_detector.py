@@ -2,10 +2,16 @@
 Phishing detection module for Solana Wallet Monitor
 Identifies common phishing attack patterns in transaction flow
 """
-import json
 import time
 from datetime import datetime, timedelta
 import re
+from config import PHISHING_ADDRESSES_FILE, PHISHING_INDEX_FILE
+from address_index import AddressIndex
+from domain_matcher import DomainMatcher
+from json_store import JsonStore, replay_set
+
+# Hosts of http(s) links in memos
+URL_HOST_PATTERN = re.compile(r'https?://((?:[-\w.]|(?:%[\da-fA-F]{2}))+)')
 
 class PhishingDetector:
     """Detects common phishing patterns in transaction flow"""
@@ -19,6 +25,8 @@ class PhishingDetector:
         self.tracked_domains = {}    # Domain -> {"first_seen": timestamp, "count": 0}
         self.max_tracked = 1000
         self.min_pattern_confidence = 0.7
+        self.persist = True    # Shard replicas leave the JSON file to the main process
+        self.listeners = []    # Called with ("phishing", address, reason) on new flags
         
         # Common patterns of phishing transactions
         self.phishing_patterns = [
@@ -73,18 +81,22 @@ class PhishingDetector:
             r"wallet-?connect\.(?!org)"
         ]
         
-        # Try to load phishing addresses from file
-        try:
-            with open("phishing_addresses.json", "r") as f:
-                data = json.load(f)
-                self.phishing_addresses = set(data["addresses"])
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.phishing_addresses = set()
+        # Feed domains and the patterns above, matched in one pass per domain
+        self.domains = DomainMatcher(self.phishing_domain_patterns)
+        
+        # Load phishing addresses (imported index plus the JSON file and its journal)
+        self.addresses_store = JsonStore(
+            PHISHING_ADDRESSES_FILE, lambda: {"addresses": list(self.phishing_addresses.added)}
+        )
+        data, journal = self.addresses_store.load()
+        addresses = set(data.get("addresses", [])) if isinstance(data, dict) else set()
+        self.phishing_addresses = AddressIndex(PHISHING_INDEX_FILE, replay_set(addresses, journal))
         
     def save_phishing_addresses(self):
-        """Save phishing addresses to file"""
-        with open("phishing_addresses.json", "w") as f:
-            json.dump({"addresses": list(self.phishing_addresses)}, f)
+        """Write pending phishing address changes to file now"""
+        if not self.persist:
+            return
+        self.addresses_store.flush()
     
     def add_phishing_address(self, address, reason="Manual addition"):
         """Add a phishing address to the database"""
@@ -102,8 +114,11 @@ class PhishingDetector:
         if len(self.recent_alerts) > 50:
             self.recent_alerts = self.recent_alerts[:50]
             
-        # Save to file
-        self.save_phishing_addresses()
+        # Journaled now, written to file shortly after
+        if self.persist:
+            self.addresses_store.record(["add", address])
+        for listener in self.listeners:
+            listener("phishing", address, reason)
         
         return True
     
@@ -116,38 +131,33 @@ class PhishingDetector:
         if not memo_text:
             return False, None
             
-        # Simple URL extraction
-        urls = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+', memo_text)
-        domains = []
-        
-        for url in urls:
-            # Extract domain from URL
-            domain_match = re.search(r'https?://([^/]+)', url)
-            if domain_match:
-                domain = domain_match.group(1).lower()
-                domains.append(domain)
-                
-                # Track domain
-                if domain in self.tracked_domains:
-                    self.tracked_domains[domain]["count"] += 1
-                else:
-                    if len(self.tracked_domains) >= self.max_tracked:
-                        # Remove oldest domain if we're tracking too many
-                        oldest_domain = min(self.tracked_domains.items(), key=lambda x: x[1]["first_seen"])
-                        del self.tracked_domains[oldest_domain[0]]
-                        
-                    self.tracked_domains[domain] = {
-                        "first_seen": time.time(),
-                        "count": 1
-                    }
-                
-                # Check against phishing patterns
-                for pattern in self.phishing_domain_patterns:
-                    if re.search(pattern, domain, re.IGNORECASE):
-                        return True, domain
-                        
+        self.domains.maybe_reload()
+        for domain in URL_HOST_PATTERN.findall(memo_text):
+            domain = domain.lower()
+            # Track domain
+            if domain in self.tracked_domains:
+                self.tracked_domains[domain]["count"] += 1
+            else:
+                if len(self.tracked_domains) >= self.max_tracked:
+                    # Remove oldest domain if we're tracking too many
+                    oldest_domain = min(self.tracked_domains.items(), key=lambda x: x[1]["first_seen"])
+                    del self.tracked_domains[oldest_domain[0]]
+                    
+                self.tracked_domains[domain] = {
+                    "first_seen": time.time(),
+                    "count": 1
+                }
+            
+            # Check against phishing patterns
+            if self.is_phishing_domain(domain):
+                return True, domain
+                    
         return False, None
     
+    def is_phishing_domain(self, domain):
+        """Check a domain against the phishing domain feeds and patterns"""
+        return self.domains.match(domain) is not None
+    
     def analyze_transaction(self, tx_data):
         """
         Analyze a transaction for phishing patterns
@@ -261,6 +271,22 @@ class PhishingDetector:
                 "patterns_time": [current_time] * len(new_patterns)
             }
     
+    def export_state(self):
+        """Tracked addresses and domains, for snapshots"""
+        return {
+            "tracked_addresses": dict(self.tracked_addresses),
+            "tracked_domains": dict(self.tracked_domains)
+        }
+    
+    def import_state(self, state):
+        """Restore export_state(), keeping the most recently seen entries up to max_tracked"""
+        for name in ("tracked_addresses", "tracked_domains"):
+            tracked = getattr(self, name)
+            tracked.update(state.get(name, {}))
+            if len(tracked) > self.max_tracked:
+                newest = sorted(tracked.items(), key=lambda x: x[1]["first_seen"])[-self.max_tracked:]
+                setattr(self, name, dict(newest))
+    
     def get_recent_alerts(self, limit=5):
         """Get recent phishing alerts"""
         return self.recent_alerts[:limit]
@@ -0,0 +1,80 @@
+"""
+Solana public key helpers
+Base58 conversion and program-derived address (PDA) lookup, enough to
+compute account addresses such as Metaplex metadata PDAs locally instead of
+searching for them with getProgramAccounts
+"""
+import hashlib
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BASE58_INDEX = {c: i for i, c in enumerate(BASE58_ALPHABET)}
+
+METADATA_PROGRAM_ID = "metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s"
+
+# ed25519 curve constants, for the off-curve check PDAs must pass
+ED25519_P = 2 ** 255 - 19
+ED25519_D = -121665 * pow(121666, ED25519_P - 2, ED25519_P) % ED25519_P
+
+
+def b58decode(value):
+    """Decode a base58 string to bytes"""
+    number = 0
+    for char in value:
+        if char not in BASE58_INDEX:
+            raise ValueError(f"Invalid base58 character {char!r}")
+        number = number * 58 + BASE58_INDEX[char]
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big") if number else b""
+    leading_zeros = len(value) - len(value.lstrip("1"))
+    return b"\x00" * leading_zeros + body
+
+
+def b58encode(data):
+    """Encode bytes as a base58 string"""
+    number = int.from_bytes(data, "big")
+    chars = []
+    while number:
+        number, remainder = divmod(number, 58)
+        chars.append(BASE58_ALPHABET[remainder])
+    leading_zeros = len(data) - len(data.lstrip(b"\x00"))
+    return "1" * leading_zeros + "".join(reversed(chars))
+
+
+def pubkey_bytes(address):
+    """32-byte form of a base58 public key"""
+    raw = b58decode(address)
+    if len(raw) != 32:
+        raise ValueError(f"Not a 32-byte public key: {address}")
+    return raw
+
+
+def is_on_curve(key):
+    """True if 32 bytes decompress to an ed25519 point (i.e. could have a private key)"""
+    y = int.from_bytes(key, "little") & ((1 << 255) - 1)
+    if y >= ED25519_P:
+        return False
+    y2 = y * y % ED25519_P
+    u = (y2 - 1) % ED25519_P
+    v = (ED25519_D * y2 + 1) % ED25519_P
+    x2 = u * pow(v, ED25519_P - 2, ED25519_P) % ED25519_P
+    # A point exists iff x^2 is a quadratic residue (or zero)
+    return x2 == 0 or pow(x2, (ED25519_P - 1) // 2, ED25519_P) == 1
+
+
+def find_program_address(seeds, program_id):
+    """
+    Derive a program address and its bump seed, like Pubkey::find_program_address
+    Returns: (address, bump)
+    """
+    program = pubkey_bytes(program_id)
+    for bump in range(255, -1, -1):
+        digest = hashlib.sha256(b"".join(seeds) + bytes([bump]) + program + b"ProgramDerivedAddress").digest()
+        if not is_on_curve(digest):
+            return b58encode(digest), bump
+    raise ValueError("Unable to find a viable program address bump seed")
+
+
+def metadata_address(mint):
+    """Metaplex token metadata PDA for a mint"""
+    program = pubkey_bytes(METADATA_PROGRAM_ID)
+    address, _ = find_program_address([b"metadata", program, pubkey_bytes(mint)], METADATA_PROGRAM_ID)
+    return address
@@ -0,0 +1,165 @@
+"""
+Address reputation: why, when and how often addresses were flagged
+Each address keeps the reasons it was flagged for (by reason code, newest
+last), first/last seen times, a hit count and a score that halves every
+`half_life` seconds without new flags. Lookups are dict lookups; prefix and
+suffix search bisect sorted key lists (suffixes over reversed addresses)
+that take in new addresses on the next search.
+"""
+import bisect
+import heapq
+import threading
+import time
+from config import REPUTATION_HALF_LIFE, REPUTATION_MAX_REASONS
+
+
+class ReputationStore:
+    """
+    Reputation entries keyed by address
+
+    Entry layout (also the JSON layout of export/load):
+        {"reasons": {code: reason}, "first_seen": float, "last_seen": float,
+         "hits": int, "score": float (as of last_seen)}
+    """
+
+    def __init__(self, half_life=REPUTATION_HALF_LIFE, max_reasons=REPUTATION_MAX_REASONS):
+        self.half_life = half_life
+        self.max_reasons = max_reasons
+        self.entries = {}
+        self.prefixes = []      # Sorted addresses
+        self.suffixes = []      # Sorted reversed addresses
+        self.unindexed = []     # Addresses added since the last search
+        self.lock = threading.Lock()
+
+    def _entry(self, address, now):
+        entry = self.entries.get(address)
+        if entry is None:
+            entry = self.entries[address] = {"reasons": {}, "first_seen": now, "last_seen": now, "hits": 0, "score": 0.0}
+            self.unindexed.append(address)
+        return entry
+
+    def _score(self, entry, now):
+        idle = max(0.0, now - entry["last_seen"])
+        return entry["score"] * 0.5 ** (idle / self.half_life)
+
+    @staticmethod
+    def _copy(entry):
+        return dict(entry, reasons=dict(entry["reasons"]))
+
+    def record(self, address, code, reason="", weight=1.0, now=None):
+        """Count a flag against an address; returns a copy of its entry"""
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self._entry(address, now)
+            entry["score"] = self._score(entry, now) + weight
+            entry["last_seen"] = max(entry["last_seen"], now)
+            entry["hits"] += 1
+            reasons = entry["reasons"]
+            reasons.pop(code, None)
+            reasons[code] = reason
+            if len(reasons) > self.max_reasons:
+                del reasons[next(iter(reasons))]
+            return self._copy(entry)
+
+    def seen(self, address, now=None):
+        """Count a sighting of an already flagged address (no new reason, no score)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(address)
+            if entry is None:
+                return None
+            entry["score"] = self._score(entry, now)
+            entry["last_seen"] = max(entry["last_seen"], now)
+            entry["hits"] += 1
+            return self._copy(entry)
+
+    def _view(self, address, entry, now):
+        reasons = entry["reasons"]
+        return {
+            "address": address,
+            "reason": reasons[next(reversed(reasons))] if reasons else "",
+            "reasons": [{"code": code, "reason": reason} for code, reason in reasons.items()],
+            "first_seen": entry["first_seen"],
+            "last_seen": entry["last_seen"],
+            "hits": entry["hits"],
+            "score": round(self._score(entry, now), 4)
+        }
+
+    def __contains__(self, address):
+        return address in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, address, now=None):
+        """Reputation of one address (None if never flagged)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(address)
+            return self._view(address, entry, now) if entry else None
+
+    def lookup(self, addresses, now=None):
+        """Reputations of many addresses, as {address: reputation} for the flagged ones"""
+        now = time.time() if now is None else now
+        with self.lock:
+            return {
+                address: self._view(address, self.entries[address], now)
+                for address in addresses if address in self.entries
+            }
+
+    def _index(self):
+        if self.unindexed:
+            new = sorted(self.unindexed)
+            # Two sorted runs: the merge is linear
+            self.prefixes = sorted(self.prefixes + new)
+            self.suffixes = sorted(self.suffixes + sorted(a[::-1] for a in new))
+            self.unindexed = []
+
+    def search(self, prefix="", suffix="", limit=100, now=None):
+        """Reputations of addresses starting with `prefix` and ending with `suffix`, in address order"""
+        now = time.time() if now is None else now
+        with self.lock:
+            self._index()
+            if prefix or not suffix:
+                matches = [a for a in self._range(self.prefixes, prefix) if a.endswith(suffix)]
+            else:
+                matches = sorted(r[::-1] for r in self._range(self.suffixes, suffix[::-1]))
+            return [self._view(a, self.entries[a], now) for a in matches[:limit]]
+
+    @staticmethod
+    def _range(keys, prefix):
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + "\U0010ffff", start) if prefix else len(keys)
+        return keys[start:end]
+
+    def top(self, limit=50, now=None):
+        """Highest-scoring reputations"""
+        now = time.time() if now is None else now
+        with self.lock:
+            best = heapq.nlargest(limit, self.entries.items(), key=lambda item: self._score(item[1], now))
+            return [self._view(address, entry, now) for address, entry in best]
+
+    def export(self):
+        """Copy of all entries, for the JSON file"""
+        with self.lock:
+            return {address: self._copy(entry) for address, entry in self.entries.items()}
+
+    def load(self, data, journal=()):
+        """Load entries from export() output, then replay ["set", address, entry] journal records"""
+        with self.lock:
+            for address, entry in (data or {}).items():
+                self._set(address, entry)
+            for op, address, entry in journal:
+                if op == "set":
+                    self._set(address, entry)
+
+    def _set(self, address, entry):
+        if address not in self.entries:
+            self.unindexed.append(address)
+        self.entries[address] = {
+            "reasons": dict(entry.get("reasons", {})),
+            "first_seen": entry.get("first_seen", 0),
+            "last_seen": entry.get("last_seen", 0),
+            "hits": entry.get("hits", 0),
+            "score": entry.get("score", 0.0)
+        }
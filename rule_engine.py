@@ -0,0 +1,410 @@
+"""
+Declarative suspicious-activity rules
+Rules are plain data: a scope, a list of [feature, operator, threshold]
+conditions (thresholds may reference THRESHOLDS keys as "$name") and a
+reason template. They are compiled into one plan per scope; each
+transaction's features are extracted once and every rule is evaluated
+against them. Rules and threshold overrides hot-reload from RULES_FILE.
+
+Rules file (optional):
+    {"thresholds": {"large_sol_transfer": 50},
+     "rules": [{"name": "...", "scope": "transaction" | "address",
+                "when": [["sol_amount", ">=", "$large_sol_transfer"]],
+                "reason": "Large transfer: {sol_amount:.2f} SOL",
+                "flag_counterparties": "optional reason template",
+                "enabled": true}]}
+A "rules" list replaces the default rules; omit it to only override thresholds.
+"""
+import json
+import operator
+import os
+import threading
+import time
+from config import RULES_FILE, RULES_RELOAD_SECONDS
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Features available to rules, per scope
+TRANSACTION_FEATURES = {
+    "transfer_count", "counterparty_count", "transfer_counterparty_count", "sol_amount",
+    "token_amount_usd", "token_transfer_count", "program_count", "bridge_count",
+    "dex_count", "instruction_count", "failed",
+}
+ADDRESS_FEATURES = {
+    "tx_count", "rapid_tx_count", "sol_volume", "usd_volume", "unusual_program_count", "bridge_count",
+}
+
+# Typed sample of the address-scope values, for checking reason templates
+ADDRESS_SAMPLE = {
+    "tx_count": 0, "rapid_tx_count": 0, "sol_volume": 0.0, "usd_volume": 0.0,
+    "unusual_program_count": 0, "bridge_count": 0,
+}
+
+DEFAULT_RULES = [
+    # Transaction scope: evaluated once per transaction, hits flag each tracked counterparty
+    {
+        "name": "abnormal_instruction_count",
+        "scope": "transaction",
+        "when": [["instruction_count", ">", "$abnormal_instruction_count"]],
+        "reason": "Potential exploit: abnormal instruction count ({instruction_count})"
+    },
+    {
+        "name": "fund_obfuscation",
+        "scope": "transaction",
+        "when": [
+            ["transfer_count", ">=", "$obfuscation_min_transfers"],
+            ["transfer_counterparty_count", ">=", "$obfuscation_min_addresses"]
+        ],
+        "reason": "Possible fund obfuscation: complex transaction touching {transfer_counterparty_count} addresses",
+        "flag_counterparties": "Involved in complex fund routing from {address_short}"
+    },
+    # Address scope: evaluated over an address's sliding-window aggregates, first hit wins
+    {
+        "name": "rapid_transactions",
+        "scope": "address",
+        "when": [
+            ["tx_count", ">=", "$rapid_transactions"],
+            ["rapid_tx_count", ">=", "$rapid_transactions"]
+        ],
+        "reason": "Unusually high transaction velocity: {rapid_tx_count} transactions in {rapid_time_window} seconds"
+    },
+    {
+        "name": "large_sol_transfer",
+        "scope": "address",
+        "when": [["sol_volume", ">=", "$large_sol_transfer"]],
+        "reason": "Large SOL transfer detected: {sol_volume:.2f} SOL"
+    },
+    {
+        "name": "high_value_transfer",
+        "scope": "address",
+        "when": [["usd_volume", ">=", "$high_value_transfer"]],
+        "reason": "High value token transfer: ${usd_volume:.2f}"
+    },
+    {
+        "name": "contract_interaction",
+        "scope": "address",
+        "when": [["unusual_program_count", ">=", "$contract_interaction_count"]],
+        "reason": "Unusual interaction with {unusual_program_count} different programs"
+    },
+    {
+        "name": "bridge_abuse",
+        "scope": "address",
+        "when": [["bridge_count", ">=", "$min_bridge_transfers"]],
+        "reason": "Suspicious cross-chain activity: {bridge_count} bridge transfers in short period"
+    },
+]
+
+
+def extract_features(tx_data, thresholds, price_lookup):
+    """
+    Walk a decoded transaction once and collect everything the detectors use
+    `price_lookup(mint)` is called once per distinct transferred mint
+    """
+    transfers = []
+    token_transfers = []
+    counterparties = []
+    transfer_counterparties = set()
+    sol_amount = 0.0
+    for event in tx_data.get("events", []):
+        other = event.get("other_address")
+        if other and other not in counterparties:
+            counterparties.append(other)
+        event_type = event.get("type")
+        if event_type in ("sol_transfer", "token_transfer"):
+            transfers.append(event)
+            if other:
+                transfer_counterparties.add(other)
+            if event_type == "sol_transfer":
+                sol_amount += float(event.get("amount", 0))
+            else:
+                token_transfers.append(event)
+
+    prices = {}
+    token_amount_usd = 0.0
+    for event in token_transfers:
+        mint = event.get("mint", "")
+        if mint not in prices:
+            prices[mint] = price_lookup(mint)
+        token_amount_usd += float(event.get("amount", 0)) * prices[mint]
+
+    program_ids = list(tx_data.get("program_ids", []))
+    bridge_ids = thresholds["bridge_program_ids"]
+    dex_ids = thresholds["dex_program_ids"]
+    bridge_programs = [p for p in program_ids if p in bridge_ids]
+    dex_programs = [p for p in program_ids if p in dex_ids]
+
+    instruction_count = 0
+    transaction = tx_data.get("transaction")
+    if transaction and "message" in transaction:
+        instruction_count = len(transaction["message"].get("instructions", []))
+
+    # Sybil behavior key: first three sorted programs plus sorted event types
+    behavior_key = None
+    if program_ids:
+        event_types = sorted(e.get("type", "") for e in tx_data.get("events", []))
+        behavior_key = f"{'-'.join(sorted(program_ids)[:3])}-{'-'.join(event_types)}"
+
+    return {
+        "signature": tx_data.get("signature", ""),
+        "counterparties": counterparties,
+        "transfer_counterparties": transfer_counterparties,
+        "token_transfers": token_transfers,
+        "prices": prices,
+        "program_ids": program_ids,
+        "program_set": set(program_ids),
+        "bridge_programs": bridge_programs,
+        "dex_programs": dex_programs,
+        "behavior_key": behavior_key,
+        # Numeric features for rules
+        "transfer_count": len(transfers),
+        "counterparty_count": len(counterparties),
+        "transfer_counterparty_count": len(transfer_counterparties),
+        "sol_amount": sol_amount,
+        "token_amount_usd": token_amount_usd,
+        "token_transfer_count": len(token_transfers),
+        "program_count": len(program_ids),
+        "bridge_count": len(bridge_programs),
+        "dex_count": len(dex_programs),
+        "instruction_count": instruction_count,
+        "failed": tx_data.get("status", "") == "failed",
+    }
+
+
+class RuleHit:
+    """A rule that matched, with its rendered reason"""
+    __slots__ = ("name", "reason", "counterparty_template", "values")
+
+    def __init__(self, name, reason, counterparty_template, values):
+        self.name = name
+        self.reason = reason
+        self.counterparty_template = counterparty_template
+        self.values = values
+
+    def counterparty_reason(self, address):
+        """Reason for flagging the counterparties of `address`, or None if the rule does not"""
+        if not self.counterparty_template:
+            return None
+        return self.counterparty_template.format_map(
+            dict(self.values, address=address, address_short=f"{address[:8]}...{address[-8:]}")
+        )
+
+
+class CompiledRule:
+    """A rule with thresholds resolved and operators bound"""
+    __slots__ = ("name", "scope", "conditions", "reason", "counterparty_reason",
+                 "evaluations", "hits", "total_ns")
+
+    def __init__(self, name, scope, conditions, reason, counterparty_reason):
+        self.name = name
+        self.scope = scope
+        self.conditions = conditions    # [(feature, op, threshold)]
+        self.reason = reason
+        self.counterparty_reason = counterparty_reason
+        self.evaluations = 0
+        self.hits = 0
+        self.total_ns = 0
+
+
+class RuleEngine:
+    """
+    Compiles rules against a THRESHOLDS dict and evaluates them per scope
+    Threshold overrides from the rules file are applied to that dict in
+    place, so the rest of the detector sees the same values. A reload builds
+    its thresholds and plans aside and swaps them in as one `compiled` pair;
+    the shared dict then gets every new value in a single update, so readers
+    never see a mix of old and new values.
+    """
+
+    def __init__(self, thresholds, path=RULES_FILE, reload_seconds=RULES_RELOAD_SECONDS):
+        self.thresholds = thresholds
+        self.path = path
+        self.reload_seconds = reload_seconds
+        # Scalar thresholds as shipped, restored before each override is applied
+        self.base_thresholds = {
+            k: v for k, v in thresholds.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool)
+        }
+        self.compiled = ({"transaction": [], "address": []}, dict(thresholds))   # (plans, thresholds)
+        self.reload_lock = threading.Lock()
+        self.source = "defaults"
+        self.loaded_at = None
+        self.file_mtime = None
+        self.last_check = 0
+        self.error = None
+        self.reload()
+
+    @property
+    def plans(self):
+        return self.compiled[0]
+
+    def compile(self, rules, thresholds=None):
+        """Build per-scope evaluation plans; raises ValueError on a bad rule"""
+        thresholds = self.thresholds if thresholds is None else thresholds
+        plans = {"transaction": [], "address": []}
+        samples = {
+            "transaction": dict(thresholds, **extract_features({}, thresholds, lambda mint: 0.0)),
+            "address": dict(thresholds, **ADDRESS_SAMPLE),
+        }
+        if not isinstance(rules, list):
+            raise ValueError("\"rules\" must be a list")
+        for rule in rules:
+            if not isinstance(rule, dict):
+                raise ValueError(f"Rule {rule!r} is not an object")
+            if not rule.get("enabled", True):
+                continue
+            name = rule.get("name")
+            scope = rule.get("scope")
+            if scope not in plans:
+                raise ValueError(f"Rule {name!r}: unknown scope {scope!r}")
+            features = TRANSACTION_FEATURES if scope == "transaction" else ADDRESS_FEATURES
+            conditions = []
+            for feature, op, threshold in rule.get("when", []):
+                if feature not in features:
+                    raise ValueError(f"Rule {name!r}: unknown {scope} feature {feature!r}")
+                if op not in OPERATORS:
+                    raise ValueError(f"Rule {name!r}: unknown operator {op!r}")
+                value = threshold
+                if isinstance(threshold, str) and threshold.startswith("$"):
+                    key = threshold[1:]
+                    if key not in thresholds:
+                        raise ValueError(f"Rule {name!r}: unknown threshold {key!r}")
+                    value = thresholds[key]
+                # Features are numbers; anything else would fail every evaluation
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"Rule {name!r}: threshold {threshold!r} is not a number")
+                conditions.append((feature, OPERATORS[op], value))
+            if not conditions:
+                raise ValueError(f"Rule {name!r}: no conditions")
+            reason = rule.get("reason", name)
+            counterparty_reason = rule.get("flag_counterparties")
+            # Render the templates once here so a bad placeholder fails the
+            # reload instead of the transaction that first matches the rule
+            self._check_template(name, reason, samples[scope])
+            if counterparty_reason is not None:
+                self._check_template(
+                    name, counterparty_reason, dict(samples[scope], address="", address_short="")
+                )
+            plans[scope].append(CompiledRule(name, scope, conditions, reason, counterparty_reason))
+        return plans
+
+    @staticmethod
+    def _check_template(name, template, values):
+        if not isinstance(template, str):
+            raise ValueError(f"Rule {name!r}: template {template!r} is not a string")
+        try:
+            template.format_map(values)
+        except (KeyError, IndexError, AttributeError, ValueError, TypeError) as e:
+            raise ValueError(f"Rule {name!r}: bad template {template!r}: {e!r}")
+
+    def reload(self):
+        """
+        Load threshold overrides and rules from the rules file (defaults if absent)
+        On any error the current rules and thresholds stay in place
+        """
+        with self.reload_lock:
+            rules = DEFAULT_RULES
+            overrides = {}
+            source = "defaults"
+            mtime = None
+            try:
+                if self.path and os.path.exists(self.path):
+                    mtime = os.path.getmtime(self.path)
+                    try:
+                        with open(self.path, "r") as f:
+                            data = json.load(f)
+                    except (OSError, json.JSONDecodeError) as e:
+                        raise ValueError(f"Could not read {self.path}: {e}")
+                    if not isinstance(data, dict):
+                        raise ValueError(f"{self.path} must hold a JSON object")
+                    overrides = data.get("thresholds", {})
+                    rules = data.get("rules", DEFAULT_RULES)
+                    source = self.path
+
+                thresholds = dict(self.thresholds, **self.base_thresholds)
+                for key, value in dict(overrides).items():
+                    if key in self.base_thresholds and isinstance(value, (int, float)) and not isinstance(value, bool):
+                        thresholds[key] = value
+                plans = self.compile(rules, thresholds)
+            except Exception as e:
+                self.error = str(e)
+                print(f"Rule reload failed, keeping current rules: {e}")
+                self.file_mtime = mtime
+                return False
+
+            self.compiled = (plans, thresholds)
+            self.thresholds.update({k: thresholds[k] for k in self.base_thresholds})
+            self.source = source
+            self.file_mtime = mtime
+            self.loaded_at = time.time()
+            self.error = None
+            return True
+
+    def maybe_reload(self):
+        """Reload if the rules file changed; checks at most every reload_seconds"""
+        now = time.time()
+        if now - self.last_check < self.reload_seconds:
+            return False
+        self.last_check = now
+        mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        if mtime != self.file_mtime:
+            return self.reload()
+        return False
+
+    def extract(self, tx_data, price_lookup):
+        """Features of a transaction, computed once for every rule and tracker"""
+        return extract_features(tx_data, self.compiled[1], price_lookup)
+
+    def evaluate(self, scope, features):
+        """
+        Evaluate every rule of a scope against a feature dict
+        Returns the matching rules in plan order as RuleHits
+        """
+        hits = []
+        clock = time.perf_counter_ns
+        plans, thresholds = self.compiled
+        for rule in plans[scope]:
+            start = clock()
+            matched = True
+            for feature, op, threshold in rule.conditions:
+                if not op(features[feature], threshold):
+                    matched = False
+                    break
+            rule.evaluations += 1
+            if matched:
+                rule.hits += 1
+            rule.total_ns += clock() - start
+            if matched:
+                values = dict(thresholds, **features)
+                hits.append(RuleHit(rule.name, rule.reason.format_map(values), rule.counterparty_reason, values))
+        return hits
+
+    def metrics(self):
+        """Loaded rules with evaluation counts, hits and average cost"""
+        return {
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+            "rules": [
+                {
+                    "name": rule.name,
+                    "scope": rule.scope,
+                    "conditions": [
+                        [feature, next(k for k, v in OPERATORS.items() if v is op), threshold]
+                        for feature, op, threshold in rule.conditions
+                    ],
+                    "evaluations": rule.evaluations,
+                    "hits": rule.hits,
+                    "avg_ns": round(rule.total_ns / rule.evaluations) if rule.evaluations else 0,
+                    "total_ms": round(rule.total_ns / 1e6, 3)
+                }
+                for scope in ("transaction", "address")
+                for rule in self.plans[scope]
+            ]
+        }
@@ -0,0 +1,290 @@
+"""
+Process-sharded wallet monitoring
+Splits the watchlist across worker processes so decoding and detection use
+every CPU core instead of one GIL-bound thread. Each shard runs its own
+WalletMonitors and detectors; decoded transactions, queue metrics and
+reputation changes flow back to the web process over multiprocessing queues
+"""
+import glob
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from config import (
+    POLL_INTERVAL, CHECKPOINT_FILE, TRANSACTION_HISTORY_FILE, HISTORY_PER_WALLET, HISTORY_UPDATE_LOOKBACK,
+    SNAPSHOT_FILE
+)
+from json_store import JsonStore
+from models import DecodedTransaction
+
+
+def shard_for(wallet, shard_count):
+    """Stable hash partition of a wallet (Python's hash() is salted per process)"""
+    digest = hashlib.sha1(wallet.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def shard_checkpoint_path(shard_id, shard_count):
+    """Each shard owns its own checkpoint file"""
+    base, ext = os.path.splitext(CHECKPOINT_FILE)
+    return f"{base}.shard-{shard_id}-of-{shard_count}{ext}"
+
+
+def shard_snapshot_path(shard_id, shard_count):
+    """Each shard snapshots its own detectors' tracking state"""
+    base, ext = os.path.splitext(SNAPSHOT_FILE)
+    return f"{base}.shard-{shard_id}-of-{shard_count}{ext}"
+
+
+def apply_reputation_update(kind, value, honeypot_detector, suspicious_detector, phishing_detector):
+    """Apply a reputation change to a shard's replica detectors (no save, no re-publish)"""
+    if kind == "suspicious":
+        suspicious_detector.suspicious_addresses.add(value)
+    elif kind == "phishing":
+        phishing_detector.phishing_addresses.add(value)
+    elif kind == "honeypot":
+        honeypot_detector.honeypots.add(value)
+    elif kind == "whitelist":
+        honeypot_detector.honeypots.discard(value)
+        honeypot_detector.whitelist.add(value)
+
+
+def run_shard(shard_id, shard_count, wallets, inbox, outbox, seen_signatures=()):
+    """
+    Entry point of a shard process
+    `seen_signatures` are the shard's signatures already in the main
+    process's history, so work decoded before a crash is not decoded again
+    """
+    from honeypot_detector import HoneypotDetector
+    from notification_service import NotificationService
+    from phishing_detector import PhishingDetector
+    from snapshot import DetectorSnapshots
+    from checkpoint import PollCheckpoint
+    from detector_executor import DetectorExecutor
+    from solana_rpc import SolanaRPC
+    from suspicious_activity import SuspiciousActivityDetector
+    from wallet_monitor import WalletMonitor
+
+    solana_rpc = SolanaRPC()
+    honeypot_detector = HoneypotDetector(solana_rpc)
+    suspicious_detector = SuspiciousActivityDetector(solana_rpc)
+    phishing_detector = PhishingDetector(solana_rpc)
+
+    # The web process owns the JSON reputation files; shards only publish changes
+    def publish(kind, value, reason, code=None):
+        outbox.put(("reputation", shard_id, (kind, value, reason, code)))
+
+    for detector in (honeypot_detector, suspicious_detector, phishing_detector):
+        detector.persist = False
+        detector.listeners.append(publish)
+    for index in (honeypot_detector.honeypots, honeypot_detector.whitelist,
+                  suspicious_detector.suspicious_addresses, phishing_detector.phishing_addresses):
+        index.persist = False
+
+    checkpoint = PollCheckpoint(shard_checkpoint_path(shard_id, shard_count))
+    base, ext = os.path.splitext(CHECKPOINT_FILE)
+    for path in [CHECKPOINT_FILE] + glob.glob(f"{base}.shard-*{ext}"):
+        checkpoint.adopt(path, wallets)
+
+    # Tracking windows live in the shard, so the shard snapshots them
+    snapshots = DetectorSnapshots(
+        {"suspicious": suspicious_detector, "phishing": phishing_detector, "honeypot": honeypot_detector},
+        path=shard_snapshot_path(shard_id, shard_count)
+    )
+    snapshots.restore()
+    snapshots.start()
+
+    def on_decoded(tx):
+        outbox.put(("transaction", shard_id, tx.to_dict()))
+
+    notification_service = NotificationService()
+    # The shard's monitors share detectors, so they share the detector workers
+    detectors = DetectorExecutor()
+    monitors = [
+        WalletMonitor(
+            wallet, solana_rpc, honeypot_detector, notification_service,
+            suspicious_detector, phishing_detector,
+            checkpoint=checkpoint, history_file=None, on_decoded=on_decoded, detectors=detectors,
+            seen_signatures=seen_signatures
+        )
+        for wallet in wallets
+    ]
+
+    def apply_updates():
+        while True:
+            kind, value, reason = inbox.get()
+            if kind == "reload_rules":
+                suspicious_detector.rules.reload()
+            else:
+                apply_reputation_update(kind, value, honeypot_detector, suspicious_detector, phishing_detector)
+
+    def decode_loop():
+        # Round-robin so one busy wallet cannot starve the rest of the shard
+        while True:
+            busy = False
+            for monitor in monitors:
+                busy = monitor.decode_next(timeout=0) or busy
+            if not busy:
+                time.sleep(0.2)
+
+    for target in (apply_updates, decode_loop):
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+
+    for monitor in monitors:
+        monitor.log_message(f"Shard {shard_id}: tracking wallet {monitor.wallet_address}")
+
+    while True:
+        metrics = {}
+        for monitor in monitors:
+            try:
+                monitor.enqueue_new_signatures()
+            except Exception as e:
+                monitor.log_message(f"Polling error: {e}")
+            metrics.update(monitor.ingest_metrics())
+        outbox.put(("metrics", shard_id, metrics))
+        time.sleep(POLL_INTERVAL)
+
+
+class ShardedMonitor:
+    """
+    Web-process side of sharded monitoring
+    Exposes the same attributes the dashboard reads from WalletMonitor
+    (transaction_history, honeypot_detector, solana_rpc, ingest_metrics)
+    and keeps the primary detectors, which persist reputation data and
+    fan every change out to all shards
+    """
+
+    def __init__(self, wallets, shard_count, solana_rpc, honeypot_detector, suspicious_detector, phishing_detector):
+        self.wallets = list(wallets)
+        self.wallet_address = self.wallets[0]
+        self.shard_count = max(1, min(shard_count, len(self.wallets)))
+        self.solana_rpc = solana_rpc
+        self.honeypot_detector = honeypot_detector
+        self.suspicious_detector = suspicious_detector
+        self.phishing_detector = phishing_detector
+        self.history_limit = HISTORY_PER_WALLET * len(self.wallets)
+        self.transaction_history = self.load_transaction_history()
+        self.shard_metrics = {}
+        self.processes = []
+        self.inboxes = []
+        self.context = multiprocessing.get_context("spawn")
+        self.outbox = self.context.Queue()
+
+        for detector in (honeypot_detector, suspicious_detector, phishing_detector):
+            detector.listeners.append(self.broadcast)
+
+    def load_transaction_history(self):
+        """Load transaction history from file, replaying transactions journaled since it was written"""
+        self.history_store = JsonStore(
+            TRANSACTION_HISTORY_FILE, lambda: [tx.to_dict() for tx in list(self.transaction_history)], indent=2
+        )
+        data, journal = self.history_store.load()
+        history = data if isinstance(data, list) else []
+        signatures = {tx.get("signature") for tx in history}
+        for op, tx in journal:
+            if op == "append" and tx.get("signature") not in signatures:
+                history.append(tx)
+                signatures.add(tx.get("signature"))
+        return [DecodedTransaction.from_dict(tx) for tx in history[-self.history_limit:]]
+
+    def save_transaction_history(self, tx=None):
+        """Journal a transaction received from a shard and schedule the history file to be rewritten"""
+        if len(self.transaction_history) > self.history_limit:
+            self.transaction_history = self.transaction_history[-self.history_limit:]
+        if tx is None:
+            self.history_store.touch()
+        else:
+            self.history_store.record(["append", tx])
+
+    def partition(self):
+        """Watchlist split by shard"""
+        shards = [[] for _ in range(self.shard_count)]
+        for wallet in self.wallets:
+            shards[shard_for(wallet, self.shard_count)].append(wallet)
+        return shards
+
+    def start(self):
+        """Spawn the shard processes and the result receiver"""
+        for shard_id, wallets in enumerate(self.partition()):
+            inbox = self.context.Queue()
+            self.inboxes.append(inbox)
+            if not wallets:
+                continue
+            members = set(wallets)
+            seen = [tx.signature for tx in self.transaction_history if tx.account in members]
+            process = self.context.Process(
+                target=run_shard,
+                args=(shard_id, self.shard_count, wallets, inbox, self.outbox, seen),
+                name=f"wallet-shard-{shard_id}"
+            )
+            process.daemon = True
+            process.start()
+            self.processes.append(process)
+
+        receiver = threading.Thread(target=self._receive)
+        receiver.daemon = True
+        receiver.start()
+
+    def broadcast(self, kind, value, reason="", code=None):
+        """Send a reputation change to every shard"""
+        for inbox in self.inboxes:
+            inbox.put((kind, value, reason))
+
+    def reload_rules(self):
+        """Have every shard reload its suspicious activity rules from the rules file"""
+        for inbox in self.inboxes:
+            inbox.put(("reload_rules", None, ""))
+
+    def _apply_to_primary(self, kind, value, reason, code=None):
+        """Apply a shard's reputation change to the primary detectors (persists and re-broadcasts)"""
+        if kind == "suspicious" and value not in self.suspicious_detector.suspicious_addresses:
+            self.suspicious_detector.add_suspicious_address(value, reason, code or "manual")
+        elif kind == "phishing" and not self.phishing_detector.is_phishing_address(value):
+            self.phishing_detector.add_phishing_address(value, reason)
+        elif kind == "honeypot" and value not in self.honeypot_detector.honeypots:
+            self.honeypot_detector.add_honeypot(value, reason)
+        elif kind == "whitelist" and value not in self.honeypot_detector.whitelist:
+            self.honeypot_detector.add_to_whitelist(value)
+
+    def _replace_transaction(self, tx):
+        """Replace the recent history entry with tx's signature; False if there is none"""
+        history = self.transaction_history
+        for index in range(len(history) - 1, max(len(history) - HISTORY_UPDATE_LOOKBACK, 0) - 1, -1):
+            if history[index].signature == tx.signature:
+                history[index] = tx
+                return True
+        return False
+        
+    def _receive(self):
+        """Collect shard output; history is journaled per transaction and rewritten by its JsonStore"""
+        while True:
+            message_type, shard_id, payload = self.outbox.get()
+            try:
+                if message_type == "transaction":
+                    tx = DecodedTransaction.from_dict(payload)
+                    if self._replace_transaction(tx):
+                        # Late detector results for a transaction already received
+                        self.save_transaction_history()
+                        continue
+                    self.transaction_history.append(tx)
+                    self.save_transaction_history(payload)
+                    # The dashboard's graph and trace queries read the primary detector's graph
+                    self.suspicious_detector.fund_graph.add_transaction(tx)
+                    self.suspicious_detector.fund_graph.expire()
+                elif message_type == "reputation":
+                    self._apply_to_primary(*payload)
+                elif message_type == "metrics":
+                    self.shard_metrics.update(payload)
+            except Exception as e:
+                print(f"Shard message error: {e}")
+
+    def ingest_metrics(self):
+        """Ingest queue metrics keyed by wallet, as last reported by each shard"""
+        return dict(self.shard_metrics)
+
+    def shard_status(self):
+        """Liveness of each shard process"""
+        return [{"name": p.name, "pid": p.pid, "alive": p.is_alive()} for p in self.processes]
@@ -0,0 +1,280 @@
+"""
+Binary snapshots of detector tracking state for warm restarts
+A background thread periodically writes what the detectors hold in memory
+(sliding windows, token/bridge history, Sybil groups, velocity counters,
+the fund-flow graph) so a restart picks up where the windows left off.
+
+File layout: a sequence of segments, each
+    magic "WWSS" | version u16 | kind u16 (0 full, 1 delta) | created f64 | length u64 | crc32 u32
+    payload: marshal of {"tables": {"detector.table": [keys, access, offsets, blob, removed]},
+                         "objects": {"detector": pickled export_state()}}
+Table sections are columnar: keys, last-access times (float64 array),
+offsets (uint64 array) into a blob of pickled values, and keys removed
+since the previous segment. A full segment replaces the file (write-rename);
+deltas are appended and only carry table entries touched since the previous
+segment. Restored table entries stay encoded until first accessed.
+"""
+import marshal
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from itertools import islice
+from config import SNAPSHOT_FILE, SNAPSHOT_INTERVAL, SNAPSHOT_MAX_DELTAS
+from state_store import ColdEntries
+
+MAGIC = b"WWSS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdQI")
+FULL = 0
+DELTA = 1
+
+
+def encode_value(value):
+    """Pickle a live value; None if it kept changing under us"""
+    for _ in range(3):
+        try:
+            return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except RuntimeError:
+            continue  # Mutated by a detector thread mid-encode
+    return None
+
+
+def recent_entries(table, since):
+    """(key, [value, last_access]) of table entries touched at or after `since`, oldest first"""
+    # Entries are kept in access order, so they are a suffix; each islice copy is atomic
+    count = 256
+    while True:
+        tail = list(islice(reversed(table.entries.items()), count))
+        if len(tail) < count or tail[-1][1][1] < since:
+            break
+        count *= 4
+    return [item for item in reversed(tail) if item[1][1] >= since]
+
+
+def table_section(rows, removed=()):
+    """Columnar section from (key, last_access, encoded value) rows in access order"""
+    keys = []
+    access = array("d")
+    offsets = array("Q", [0])
+    chunks = []
+    size = 0
+    latest = 0.0
+    for key, last_access, encoded in rows:
+        # Entries touched while being copied may be out of order; never let access go backwards
+        latest = max(latest, last_access)
+        keys.append(key)
+        access.append(latest)
+        chunks.append(encoded)
+        size += len(encoded)
+        offsets.append(size)
+    return [keys, access.tobytes(), offsets.tobytes(), b"".join(chunks), list(removed)]
+
+
+def read_segments(path):
+    """Valid segments of a snapshot file as (kind, created, payload), plus the byte length they cover"""
+    with open(path, "rb") as f:
+        data = f.read()
+    segments = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        magic, version, kind, created, length, crc = HEADER.unpack_from(data, offset)
+        end = offset + HEADER.size + length
+        if magic != MAGIC or version != VERSION or end > len(data):
+            break
+        payload = memoryview(data)[offset + HEADER.size:end]
+        if zlib.crc32(payload) != crc:
+            break
+        segments.append((kind, created, marshal.loads(payload)))
+        offset = end
+    return segments, offset, len(data)
+
+
+class DetectorSnapshots:
+    """
+    Periodic snapshots of detector state, restored at startup
+
+    Detectors take part through export_state()/import_state() (small state,
+    written whole every time) and optionally snapshot_tables() returning
+    name -> StateTable (written incrementally, restored lazily).
+    """
+
+    def __init__(self, detectors, path=SNAPSHOT_FILE, interval=SNAPSHOT_INTERVAL, max_deltas=SNAPSHOT_MAX_DELTAS):
+        self.detectors = detectors    # name -> detector
+        self.path = path
+        self.interval = interval
+        self.max_deltas = max_deltas
+        self.lock = threading.Lock()
+        self.since = None             # Start of the last written segment; None forces a full snapshot
+        self.deltas = 0
+        self.base_bytes = 0
+        self.delta_bytes = 0
+        self.stats = {"snapshots": 0, "full_snapshots": 0, "errors": 0, "last_bytes": 0, "last_ms": 0,
+                      "last_entries": 0, "restored_entries": 0, "restore_ms": 0}
+        for _, table in self._tables():
+            table.removed_keys = set()
+
+    def _tables(self):
+        for name, detector in self.detectors.items():
+            if hasattr(detector, "snapshot_tables"):
+                for table_name, table in detector.snapshot_tables().items():
+                    yield f"{name}.{table_name}", table
+
+    @staticmethod
+    def _encode_rows(items):
+        for key, (value, last_access) in items:
+            encoded = encode_value(value)
+            if encoded is not None:
+                yield key, last_access, encoded
+
+    def snapshot(self, full=False):
+        """Write a snapshot segment (full or delta); returns its size in bytes"""
+        with self.lock:
+            started = time.time()
+            clock = time.perf_counter()
+            full = (full or self.since is None or self.deltas >= self.max_deltas or
+                    self.delta_bytes > self.base_bytes or not os.path.exists(self.path))
+            tables = {}
+            entries = 0
+            for name, table in self._tables():
+                removed, table.removed_keys = table.removed_keys, set()
+                if full:
+                    rows = list(table.cold.rows()) if table.cold is not None else []
+                    rows.extend(self._encode_rows(list(table.entries.items())))
+                    tables[name] = table_section(rows)
+                else:
+                    tables[name] = table_section(self._encode_rows(recent_entries(table, self.since)), removed)
+                entries += len(tables[name][0])
+            objects = {}
+            for name, detector in self.detectors.items():
+                if hasattr(detector, "export_state"):
+                    encoded = encode_value(detector.export_state())
+                    if encoded is not None:
+                        objects[name] = encoded
+            payload = marshal.dumps({"tables": tables, "objects": objects})
+            segment = HEADER.pack(MAGIC, VERSION, FULL if full else DELTA, started, len(payload),
+                                  zlib.crc32(payload)) + payload
+
+            if full:
+                self._replace(segment)
+                self.base_bytes = len(segment)
+                self.delta_bytes = 0
+                self.deltas = 0
+                self.stats["full_snapshots"] += 1
+            else:
+                with open(self.path, "ab") as f:
+                    f.write(segment)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.delta_bytes += len(segment)
+                self.deltas += 1
+            self.since = started
+            self.stats["snapshots"] += 1
+            self.stats["last_bytes"] = len(segment)
+            self.stats["last_entries"] = entries
+            self.stats["last_ms"] = round((time.perf_counter() - clock) * 1000, 1)
+            return len(segment)
+
+    def _replace(self, segment):
+        # Write-rename so a crash never leaves a truncated base behind
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(segment)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def restore(self, now=None):
+        """Load the snapshot file into the detectors; returns the number of table entries restored"""
+        if not os.path.exists(self.path):
+            return 0
+        clock = time.perf_counter()
+        now = time.time() if now is None else now
+        with self.lock:
+            try:
+                segments, valid, size = read_segments(self.path)
+            except (OSError, ValueError, EOFError) as e:
+                print(f"Could not read detector snapshot {self.path}: {e}")
+                return 0
+            if valid < size:
+                # A crash mid-append leaves a torn tail; later deltas must not follow it
+                print(f"Detector snapshot {self.path}: dropping {size - valid} bytes of incomplete data")
+                with open(self.path, "r+b") as f:
+                    f.truncate(valid)
+            fulls = [i for i, (kind, _, _) in enumerate(segments) if kind == FULL]
+            if not fulls:
+                return 0
+            segments = segments[fulls[-1]:]
+
+            tables = dict(self._tables())
+            colds = {}
+            for _, _, payload in segments:
+                for name, (keys, access, offsets, blob, removed) in payload["tables"].items():
+                    table = tables.get(name)
+                    if table is None:
+                        continue
+                    cold = colds.setdefault(name, ColdEntries(pickle.loads))
+                    cold.add_segment(keys, array("d", access), array("Q", offsets), blob, removed, now - table.ttl)
+            restored = 0
+            for name, cold in colds.items():
+                if len(cold):
+                    tables[name].restore(cold)
+                    restored += len(cold)
+
+            # Object states are written whole; the newest one wins
+            for name, encoded in segments[-1][2]["objects"].items():
+                detector = self.detectors.get(name)
+                if detector is None:
+                    continue
+                try:
+                    detector.import_state(pickle.loads(encoded))
+                except Exception as e:
+                    print(f"Could not restore {name} detector state: {e}")
+            for store in {id(table.store): table.store for table in tables.values()}.values():
+                store.evict(now)
+
+            # Later snapshots append to what was just restored
+            self.since = now
+            self.deltas = len(segments) - 1
+            self.base_bytes = HEADER.size + len(marshal.dumps(segments[0][2]))
+            self.delta_bytes = max(0, valid - self.base_bytes)
+            self.stats["restored_entries"] = restored
+            self.stats["restore_ms"] = round((time.perf_counter() - clock) * 1000, 1)
+            return restored
+
+    def metrics(self):
+        """Snapshot counters and sizes"""
+        return dict(
+            self.stats,
+            path=self.path,
+            interval=self.interval,
+            deltas=self.deltas,
+            base_bytes=self.base_bytes,
+            delta_bytes=self.delta_bytes
+        )
+
+    def run(self):
+        """Snapshot loop; runs forever"""
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.snapshot()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Detector snapshot error: {e}")
+
+    def start(self):
+        """Start the background snapshot thread"""
+        thread = threading.Thread(target=self.run, name="detector-snapshots")
+        thread.daemon = True
+        thread.start()
@@ -37,10 +37,10 @@ class SocialMediaMonitor:
         if not self.suspicious_detector:
             return False, "No suspicious detector available"
             
-        # Check if address is in known suspicious addresses
-        if address in self.suspicious_detector.suspicious_addresses:
-            reason = self.suspicious_detector.suspicious_addresses.get(address, "Unknown")
-            return True, reason
+        # Check if address is in known suspicious addresses (with the reason it was flagged for)
+        reputation = self.suspicious_detector.reputation_of(address)
+        if reputation:
+            return True, reputation["reason"] or "Unknown"
             
         # Check if address is associated with known honeypot tokens
         if self.honeypot_detector and address in self.honeypot_detector.honeypots:
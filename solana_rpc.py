@@ -32,15 +32,25 @@ class SolanaRPC:
                 time.sleep(wait)
         return None
     
-    def get_recent_signatures(self, wallet, limit=10):
-        """Get recent transaction signatures for an address"""
+    def get_recent_signatures(self, wallet, limit=10, before=None, until=None):
+        """
+        Get recent transaction signatures for an address, newest first
+        `before` pages backwards from a signature, `until` stops at one.
+        Returns None if the RPC call failed, so callers can tell a failure
+        from an address with no (more) signatures
+        """
+        options = {"limit": limit}
+        if before:
+            options["before"] = before
+        if until:
+            options["until"] = until
         payload = {
             "jsonrpc": "2.0",
             "id": 1,
             "method": "getSignaturesForAddress",
-            "params": [wallet, {"limit": limit}]
+            "params": [wallet, options]
         }
-        return self.safe_post(payload) or []
+        return self.safe_post(payload)
     
     def get_transaction(self, signature):
         """Get transaction details by signature"""
@@ -76,6 +86,27 @@ class SolanaRPC:
         }
         return self.safe_post(payload)
     
+    def get_multiple_accounts(self, accounts, batch_size=100):
+        """
+        Get account information for many accounts, `batch_size` per request
+        Returns {account: info or None if it does not exist}; accounts in a
+        batch whose request failed are left out
+        """
+        results = {}
+        for start in range(0, len(accounts), batch_size):
+            chunk = accounts[start:start + batch_size]
+            payload = {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "getMultipleAccounts",
+                # Only existence and owner are needed, so skip the account data
+                "params": [chunk, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}]
+            }
+            result = self.safe_post(payload)
+            if result is not None:
+                results.update(zip(chunk, result.get("value", [])))
+        return results
+    
     def get_token_metadata(self, mint):
         """Get token metadata (from on-chain metadata program)"""
         payload = {
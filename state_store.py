@@ -0,0 +1,236 @@
+"""
+Bounded tracking state for detectors
+Named tables share one entry budget. Each table drops entries that were not
+touched within its TTL, and when the shared budget is exceeded the least
+recently used entry across all tables is evicted. Entries restored from a
+snapshot (see snapshot.py) stay encoded until first accessed.
+"""
+import bisect
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+
+class ColdEntries:
+    """
+    Restored table entries, kept encoded until first access
+
+    Rows come in segments of parallel columns (keys, last access, offsets
+    into one blob of encoded values), each in last-access order; later
+    segments are newer. `index` maps every live key to its row position
+    (segment << 32 | row), so rows superseded by a later segment or taken
+    out of the table are simply skipped.
+    """
+
+    def __init__(self, decode):
+        self.decode = decode
+        self.segments = []   # (keys, access, offsets, blob); offsets has len(keys) + 1 entries
+        self.index = {}
+        self.head = (0, 0)   # Oldest row that may still be live
+
+    def add_segment(self, keys, access, offsets, blob, removed=(), cutoff=None):
+        """Add rows restored from one snapshot segment; rows accessed before `cutoff` are dropped"""
+        for key in removed:
+            self.index.pop(key, None)
+        segment = len(self.segments)
+        start = bisect.bisect_left(access, cutoff) if cutoff is not None else 0
+        self.segments.append((keys, access, offsets, blob))
+        base = segment << 32
+        self.index.update(zip(keys[start:], range(base + start, base + len(keys))))
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(list(self.index))
+
+    def _row(self, position):
+        keys, access, offsets, blob = self.segments[position >> 32]
+        row = position & 0xFFFFFFFF
+        return keys[row], access[row], blob[offsets[row]:offsets[row + 1]]
+
+    def pop(self, key):
+        """Remove a key and return (value, last_access)"""
+        _, access, encoded = self._row(self.index.pop(key))
+        return self.decode(encoded), access
+
+    def discard(self, key):
+        self.index.pop(key, None)
+
+    def _advance(self):
+        """Position of the oldest live row (None if empty)"""
+        segment, row = self.head
+        while segment < len(self.segments):
+            keys = self.segments[segment][0]
+            while row < len(keys):
+                position = segment << 32 | row
+                if self.index.get(keys[row]) == position:
+                    self.head = (segment, row)
+                    return position
+                row += 1
+            segment, row = segment + 1, 0
+        self.head = (segment, 0)
+        return None
+
+    def oldest_access(self):
+        position = self._advance()
+        return None if position is None else self._row(position)[1]
+
+    def pop_oldest(self, decode=True):
+        """Remove the least recently used row; returns (key, value or None, last_access)"""
+        key, access, encoded = self._row(self._advance())
+        del self.index[key]
+        return key, self.decode(encoded) if decode else None, access
+
+    def rows(self):
+        """(key, last_access, encoded value) of live rows, oldest first"""
+        for segment, (keys, access, offsets, blob) in enumerate(self.segments):
+            base = segment << 32
+            for row, key in enumerate(keys):
+                if self.index.get(key) == base | row:
+                    yield key, access[row], blob[offsets[row]:offsets[row + 1]]
+
+
+class StateTable(MutableMapping):
+    """
+    Dict-like table whose entries expire `ttl` seconds after their last access
+    Reading or writing a key refreshes it; iteration does not.
+    """
+
+    def __init__(self, store, name, ttl, on_evict=None):
+        self.store = store
+        self.name = name
+        self.ttl = ttl
+        self.on_evict = on_evict    # Called with (key, value) when an entry is evicted
+        self.entries = OrderedDict()  # key -> [value, last_access], least recent first
+        self.cold = None              # ColdEntries restored from a snapshot, all older than `entries`
+        self.removed_keys = None      # Keys removed since the last snapshot (only while snapshots run)
+        self.stats = {"evicted_ttl": 0, "evicted_lru": 0}
+
+    def _removed(self, key):
+        if self.removed_keys is not None:
+            self.removed_keys.add(key)
+        self.store.removed(self)
+
+    def __getitem__(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            if self.cold is None or key not in self.cold:
+                raise KeyError(key)
+            entry = self.entries[key] = [self.cold.pop(key)[0], 0]
+        entry[1] = time.time()
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        if key in self.entries:
+            self.entries[key] = [value, time.time()]
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = [value, time.time()]
+        if self.cold is not None and key in self.cold:
+            self.cold.discard(key)
+            return
+        self.store.added(self)
+
+    def __delitem__(self, key):
+        if key in self.entries:
+            del self.entries[key]
+        elif self.cold is not None and key in self.cold:
+            self.cold.discard(key)
+        else:
+            raise KeyError(key)
+        self._removed(key)
+
+    def __contains__(self, key):
+        return key in self.entries or (self.cold is not None and key in self.cold)
+
+    def __iter__(self):
+        keys = list(self.entries)
+        if self.cold is not None:
+            keys.extend(self.cold)
+        return iter(keys)
+
+    def __len__(self):
+        return len(self.entries) + (len(self.cold) if self.cold is not None else 0)
+
+    def restore(self, cold):
+        """Attach entries restored from a snapshot"""
+        self.cold = cold
+        self.store.total += len(cold)
+
+    def oldest_access(self):
+        """Last access time of the least recently used entry (None if empty)"""
+        if self.cold is not None and len(self.cold):
+            return self.cold.oldest_access()
+        if not self.entries:
+            return None
+        return next(iter(self.entries.values()))[1]
+
+    def evict_oldest(self, reason):
+        if self.cold is not None and len(self.cold):
+            key, value, _ = self.cold.pop_oldest(decode=self.on_evict is not None)
+        else:
+            key, (value, _) = self.entries.popitem(last=False)
+        self.stats[reason] += 1
+        self._removed(key)
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def expire(self, now):
+        """Drop entries idle for longer than the TTL"""
+        cutoff = now - self.ttl
+        while len(self) and self.oldest_access() < cutoff:
+            self.evict_oldest("evicted_ttl")
+
+
+class StateStore:
+    """Shared entry budget and metrics for a set of StateTables"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.tables = {}
+        self.total = 0
+
+    def table(self, name, ttl, on_evict=None):
+        """Create (or get) a named table"""
+        if name not in self.tables:
+            self.tables[name] = StateTable(self, name, ttl, on_evict)
+        return self.tables[name]
+
+    def added(self, table):
+        self.total += 1
+        if self.total > self.max_entries:
+            self.evict()
+
+    def removed(self, table):
+        self.total -= 1
+
+    def evict(self, now=None):
+        """Expire idle entries, then evict least recently used ones down to the budget"""
+        now = time.time() if now is None else now
+        for table in self.tables.values():
+            table.expire(now)
+        while self.total > self.max_entries:
+            oldest = min(
+                (t for t in self.tables.values() if len(t)),
+                key=lambda t: t.oldest_access()
+            )
+            oldest.evict_oldest("evicted_lru")
+
+    def metrics(self):
+        """Entry counts and eviction counters per table"""
+        return {
+            "total_entries": self.total,
+            "max_entries": self.max_entries,
+            "tables": {
+                name: dict(
+                    table.stats, entries=len(table), ttl=table.ttl,
+                    restored=len(table.cold) if table.cold is not None else 0
+                )
+                for name, table in self.tables.items()
+            }
+        }
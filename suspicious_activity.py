@@ -1,11 +1,20 @@
 """
 Suspicious activity detection for Solana wallet transactions
 """
-import json
-import os
+import bisect
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from config import SUSPICIOUS_ADDRESSES_FILE
+from config import (SUSPICIOUS_ADDRESSES_FILE, SUSPICIOUS_INDEX_FILE, STATE_MAX_ENTRIES, STATE_LIST_LIMIT, STATE_TTLS,
+                    AGGREGATE_BUCKET_SECONDS, REPUTATION_FILE)
+from address_index import AddressIndex
+from json_store import JsonStore, replay_set
+from reputation import ReputationStore
+from fund_graph import FundFlowGraph
+from state_store import StateStore
+from token_age import TokenCreationTimes
+from rule_engine import RuleEngine
+from velocity import WindowAggregates
 
 # Suspicious activity detection thresholds
 THRESHOLDS = {
@@ -27,6 +36,7 @@ THRESHOLDS = {
     "wallet_group_threshold": 10,         # Number of similar wallets needed to flag
     "similar_action_threshold": 3,        # Number of identical actions needed
     "wallet_creation_window": 300,        # Time window for related wallet creation (5 min)
+    "wallet_group_ttl": 3600,             # Groups with no activity for this long are dropped (1 hour)
     
     # Airdrop and token restriction detection  
     "failed_sell_count": 3,               # Number of failed sell attempts to flag
@@ -37,6 +47,11 @@ THRESHOLDS = {
     
     # Smart contract exploit detection
     "abnormal_instruction_count": 50,     # Unusually high number of instructions 
+    
+    # Fund obfuscation detection
+    "obfuscation_min_transfers": 3,       # Transfers in one transaction
+    "obfuscation_min_addresses": 3,       # Distinct counterparties of those transfers
+    "fund_trace_hops": 3,                 # Transfers back to search for funds from flagged addresses
     "rent_exempt_sol_drain": 0.1,         # SOL drain from rent-exempt accounts
     
     # Program IDs to monitor
@@ -66,41 +81,81 @@ THRESHOLDS = {
     }
 }
 
+# Sliding windows kept per address: window name -> THRESHOLDS key of its length
+ACTIVITY_WINDOWS = {
+    "rapid": "rapid_time_window",
+    "unusual": "unusual_time_window",
+    "bridge": "cross_chain_transfer_window",
+}
+
 class SuspiciousActivityDetector:
     """Detects suspicious or unusual activity on the Solana blockchain"""
     
     def __init__(self, solana_rpc):
         self.solana_rpc = solana_rpc
         self.suspicious_addresses = self.load_suspicious_addresses()
-        self.address_activity = {}  # address -> {timestamp: [tx_count, sol_volume, token_volume]}
+        self.reputation = self.load_reputation()   # Reasons, hit counts and scores of flagged addresses
         self.recent_alerts = []     # To store recent alerts for display
         
+        # All tracking state lives in bounded, TTL-evicting tables
+        self.state = StateStore(STATE_MAX_ENTRIES)
+        self.address_activity = self.state.table("address_activity", STATE_TTLS["address_activity"])  # address -> WindowAggregates
+        
         # Tracking data structures for advanced detection
-        self.token_actions = {}     # mint -> {actions: [], creation_time, liquidity_events}
-        self.wallet_groups = {}     # group_id -> {wallets: set(), actions: [], creation_times}  
-        self.token_impersonation = {} # symbol/name -> [legitimate_mints, suspicious_mints]
-        self.cross_chain_transfers = {} # address -> {bridge_txs: [], timestamps}
-        self.contract_exploits = {} # program_id -> {abnormal_calls: [], exploit_patterns}
+        self.token_actions = self.state.table("token_actions", STATE_TTLS["token_actions"])  # mint -> {actions: [], creation_time, liquidity_events}
+        self.wallet_groups = self.state.table(  # group_id -> {wallets: set(), actions: [], creation_times}
+            "wallet_groups", THRESHOLDS["wallet_group_ttl"], on_evict=self._on_wallet_group_evicted
+        )
+        self.behavior_groups = {}   # behavior_key -> group_id (entries leave with their group)
+        self.next_group_id = 1
+        self.token_impersonation = self.state.table("token_impersonation", STATE_TTLS["token_impersonation"])  # symbol/name -> [legitimate_mints, suspicious_mints]
+        self.creator_flags = self.state.table("creator_flags", STATE_TTLS["creator_flags"])  # creator address -> {token category: first flagged mint}
+        self.cross_chain_transfers = self.state.table("cross_chain_transfers", STATE_TTLS["cross_chain_transfers"])  # address -> {bridge_txs: [], timestamps}
+        self.contract_exploits = self.state.table("contract_exploits", STATE_TTLS["contract_exploits"])  # program_id -> {abnormal_calls: [], exploit_patterns}
+        
+        # Directed transfer graph of every decoded transaction, for multi-hop tracing
+        self.fund_graph = FundFlowGraph()
+        
+        # Mint creation times from signature history, cached for good
+        self.token_ages = TokenCreationTimes(solana_rpc)
+        
+        # Threshold-driven checks, compiled once and hot-reloaded from RULES_FILE
+        self.rules = RuleEngine(THRESHOLDS)
+        
+        self.persist = True         # Shard replicas leave the JSON files to the main process
+        self.listeners = []         # Called with ("suspicious", address, reason, code) on new flags
         
     def load_suspicious_addresses(self):
-        """Load list of known suspicious addresses"""
-        if os.path.exists(SUSPICIOUS_ADDRESSES_FILE):
-            try:
-                with open(SUSPICIOUS_ADDRESSES_FILE, "r") as f:
-                    return set(json.load(f))
-            except json.JSONDecodeError:
-                return set()
-        return set()
+        """Load known suspicious addresses (imported index plus the JSON file and its journal)"""
+        self.addresses_store = JsonStore(
+            SUSPICIOUS_ADDRESSES_FILE, lambda: list(self.suspicious_addresses.added), indent=2
+        )
+        data, journal = self.addresses_store.load()
+        addresses = replay_set(set(data or []), journal)
+        return AddressIndex(SUSPICIOUS_INDEX_FILE, addresses)
+        
+    def load_reputation(self):
+        """Load address reputations (JSON file and its journal)"""
+        reputation = ReputationStore()
+        self.reputation_store = JsonStore(REPUTATION_FILE, reputation.export)
+        reputation.load(*self.reputation_store.load())
+        return reputation
         
     def save_suspicious_addresses(self):
-        """Save suspicious addresses to file"""
-        with open(SUSPICIOUS_ADDRESSES_FILE, "w") as f:
-            json.dump(list(self.suspicious_addresses), f, indent=2)
+        """Write pending suspicious address changes to file now"""
+        if not self.persist:
+            return
+        self.addresses_store.flush()
             
-    def add_suspicious_address(self, address, reason):
-        """Add an address to the suspicious list"""
+    def add_suspicious_address(self, address, reason, code="manual"):
+        """Add an address to the suspicious list, recording why under a reason code"""
         self.suspicious_addresses.add(address)
-        self.save_suspicious_addresses()
+        entry = self.reputation.record(address, code, reason)
+        if self.persist:
+            self.addresses_store.record(["add", address])
+            self.reputation_store.record(["set", address, entry])
+        for listener in self.listeners:
+            listener("suspicious", address, reason, code)
         
         # Create an alert for the newly flagged address
         alert = {
@@ -122,115 +177,96 @@ class SuspiciousActivityDetector:
             return True
         return address in self.suspicious_addresses
         
-    def track_address_activity(self, address, tx_data):
-        """Track activity for an address to detect unusual patterns"""
-        current_time = datetime.now()
-        
-        if address not in self.address_activity:
-            self.address_activity[address] = []
-            
-        # Add the new transaction data
-        activity = {
-            "timestamp": current_time,
-            "tx_signature": tx_data.get("signature", ""),
-            "sol_amount": 0,
-            "token_amount_usd": 0,
-            "programs": set(),
-            "token_actions": [], # Store token interactions (buy/sell/transfer)
-            "bridge_interactions": [], # Store bridge interactions
-            "instruction_count": 0
+    def reputation_of(self, address):
+        """Reputation of a suspicious address (reason, reason codes, hits, score); None if not suspicious"""
+        reputation = self.reputation.get(address)
+        if reputation or not self.is_suspicious_address(address):
+            return reputation
+        # Listed without a recorded flag: known scam list or an imported blocklist
+        if address in THRESHOLDS["known_scam_addresses"]:
+            code, reason = "known_scam", "Known scam address"
+        else:
+            code, reason = "blocklist", "Imported blocklist"
+        return {
+            "address": address,
+            "reason": reason,
+            "reasons": [{"code": code, "reason": reason}],
+            "first_seen": None,
+            "last_seen": None,
+            "hits": 0,
+            "score": 0.0
         }
         
-        # Extract relevant data from the transaction
-        for event in tx_data.get("events", []):
-            if event["type"] == "sol_transfer":
-                activity["sol_amount"] += float(event.get("amount", 0))
-            elif event["type"] == "token_transfer":
-                # Try to get USD price if available, otherwise estimate
-                mint = event.get("mint", "")
-                price = self.solana_rpc.get_token_price_usd(mint)
-                amount = float(event.get("amount", 0))
-                activity["token_amount_usd"] += amount * price
-                
-                # Track token action
-                activity["token_actions"].append({
-                    "mint": mint,
-                    "action": event.get("direction", "unknown"),
-                    "amount": amount,
-                    "price_usd": price
-                })
-                
-                # Track token for unsellable detection
-                self._track_token_action(mint, address, event, tx_data)
-                
-            elif event["type"] == "swap":
-                # Track swap events for flash launch detection
-                program_id = event.get("program_id", "")
-                if program_id in THRESHOLDS["dex_program_ids"]:
-                    activity["token_actions"].append({
-                        "mint": event.get("mint", ""),
-                        "action": "swap",
-                        "dex": program_id
-                    })
-                
-        # Track program IDs
-        for program_id in tx_data.get("program_ids", []):
-            activity["programs"].add(program_id)
+    def track_address_activity(self, address, tx_data, features=None, tx_hits=None, now=None):
+        """
+        Track activity for an address to detect unusual patterns
+        `features` and `tx_hits` come from analyze_transaction, which extracts
+        them once per transaction for all counterparties; `now` (epoch seconds,
+        default current time) places the activity in the sliding windows
+        """
+        if features is None:
+            features = self.rules.extract(tx_data, self.solana_rpc.get_token_price_usd)
+            tx_hits = self.rules.evaluate("transaction", features)
+        now = time.time() if now is None else now
+        
+        if address not in self.address_activity:
+            self.address_activity[address] = WindowAggregates(
+                {name: THRESHOLDS[key] for name, key in ACTIVITY_WINDOWS.items()},
+                AGGREGATE_BUCKET_SECONDS
+            )
             
-            # Check if it's a bridge program
-            if program_id in THRESHOLDS["bridge_program_ids"]:
-                activity["bridge_interactions"].append(program_id)
-                self._track_bridge_activity(address, program_id, tx_data)
+        # Track tokens for unsellable and flash launch detection
+        for event in features["token_transfers"]:
+            self._track_token_action(event.get("mint", ""), address, event, tx_data, features)
                 
-        # Track instruction count for exploit detection
-        if "transaction" in tx_data and "message" in tx_data["transaction"]:
-            instructions = tx_data["transaction"]["message"].get("instructions", [])
-            activity["instruction_count"] = len(instructions)
-            
-            # Check for unusually high instruction count
-            if len(instructions) > THRESHOLDS["abnormal_instruction_count"]:
-                # Use a general program ID or extract it from the transaction
-                program_id_to_check = next(iter(activity["programs"]), "unknown")
-                self._check_for_exploit(address, program_id_to_check, tx_data, len(instructions))
+        # Track bridge programs
+        for program_id in features["bridge_programs"]:
+            self._track_bridge_activity(address, program_id, tx_data)
                 
-        self.address_activity[address].append(activity)
+        self.address_activity[address].add(
+            now, features["sol_amount"], features["token_amount_usd"], features["bridge_count"], features["program_set"]
+        )
         
         # Check for Sybil attack-like patterns
-        self._check_for_sybil_pattern(address, tx_data)
-        
-        # Check for obfuscation of funds using complex routing
-        self._check_for_fund_obfuscation(address, tx_data)
-        
-        # Clean up old activity data
-        cutoff_time = current_time - timedelta(minutes=10)
-        self.address_activity[address] = [
-            a for a in self.address_activity[address] 
-            if a["timestamp"] > cutoff_time
-        ]
+        self._check_for_sybil_pattern(address, features)
+        
+        # Transaction-level rule hits (exploits, fund obfuscation) flag this address
+        for hit in tx_hits or []:
+            self.add_suspicious_address(address, hit.reason, hit.name)
+            counterparty_reason = hit.counterparty_reason(address)
+            if counterparty_reason:
+                for addr in features["transfer_counterparties"]:
+                    if addr != address and addr not in self.suspicious_addresses:
+                        self.add_suspicious_address(addr, counterparty_reason, hit.name)
         
-    def _track_token_action(self, mint, address, event, tx_data):
+    def _track_token_action(self, mint, address, event, tx_data, features):
         """Track a token action for flash launch and unsellable token detection"""
         if mint not in self.token_actions:
             # This appears to be a new token we're tracking
-            creation_time = self._get_token_creation_time(mint)
             self.token_actions[mint] = {
-                "creation_time": creation_time,
-                "actions": [],
-                "liquidity_events": [],
+                "creation_time": None,
+                "actions": deque(maxlen=STATE_LIST_LIMIT),
+                "liquidity_events": deque(maxlen=STATE_LIST_LIMIT),
                 "buys": 0,
                 "sells": 0,
                 "failed_sells": 0,
                 "creators": set(),
-                "transactions": []
+                "transactions": deque(maxlen=STATE_LIST_LIMIT)
             }
             
-            # Check if this is a newly created token
-            if datetime.now().timestamp() - creation_time < THRESHOLDS["new_token_age_threshold"]:
-                self._check_for_token_impersonation(mint)
+        if self.token_actions[mint]["creation_time"] is None:
+            # Looked up in the background; a later action picks up the result
+            creation_time = self._get_token_creation_time(mint)
+            if creation_time is not None:
+                self.token_actions[mint]["creation_time"] = creation_time
+                
+                # Check if this is a newly created token
+                if datetime.now().timestamp() - creation_time < THRESHOLDS["new_token_age_threshold"]:
+                    self._check_for_token_impersonation(mint)
                 
         # Add the creator if this is one of the first transactions
         if len(self.token_actions[mint]["transactions"]) < 5:
-            self.token_actions[mint]["creators"].add(address)
+            self._add_token_creator(mint, address)
             
         # Add this action
         direction = event.get("direction", "unknown")
@@ -247,67 +283,85 @@ class SuspiciousActivityDetector:
             self.token_actions[mint]["buys"] += 1
         elif direction == "Sent":
             # Check if this appears to be a sell attempt
-            for program_id in tx_data.get("program_ids", []):
-                if program_id in THRESHOLDS["dex_program_ids"]:
-                    self.token_actions[mint]["sells"] += 1
+            for program_id in features["dex_programs"]:
+                self.token_actions[mint]["sells"] += 1
                     
-                    # Check if the transaction failed or was blocked
-                    if tx_data.get("status", "") == "failed":
-                        self.token_actions[mint]["failed_sells"] += 1
+                # Check if the transaction failed or was blocked
+                if features["failed"]:
+                    self.token_actions[mint]["failed_sells"] += 1
                         
-                        if self.token_actions[mint]["failed_sells"] >= THRESHOLDS["failed_sell_count"]:
-                            # This might be an unsellable token
-                            if mint not in THRESHOLDS["token_categories"]["unsellable_tokens"]:
-                                THRESHOLDS["token_categories"]["unsellable_tokens"].add(mint)
-                                self.add_suspicious_address(
-                                    address,
-                                    f"Possible unsellable token: {mint[:8]}...{mint[-8:]} (multiple failed sell attempts)"
-                                )
+                    if self.token_actions[mint]["failed_sells"] >= THRESHOLDS["failed_sell_count"]:
+                        # This might be an unsellable token
+                        if mint not in THRESHOLDS["token_categories"]["unsellable_tokens"]:
+                            self._flag_token(mint, "unsellable_tokens")
+                            self.add_suspicious_address(
+                                address,
+                                f"Possible unsellable token: {mint[:8]}...{mint[-8:]} (multiple failed sell attempts)",
+                                "unsellable_tokens"
+                            )
         
         self.token_actions[mint]["actions"].append(action)
         self.token_actions[mint]["transactions"].append(tx_data.get("signature", ""))
         
         # Check for liquidity events
-        for program_id in tx_data.get("program_ids", []):
-            if program_id in THRESHOLDS["dex_program_ids"]:
-                # This could be adding or removing liquidity
-                # Simplified logic - in a real system we'd need to analyze the exact instruction
-                liquidity_event = {
-                    "timestamp": datetime.now(),
-                    "signature": tx_data.get("signature", ""),
-                    "program_id": program_id
-                }
-                self.token_actions[mint]["liquidity_events"].append(liquidity_event)
+        for program_id in features["dex_programs"]:
+            # This could be adding or removing liquidity
+            # Simplified logic - in a real system we'd need to analyze the exact instruction
+            liquidity_event = {
+                "timestamp": datetime.now(),
+                "signature": tx_data.get("signature", ""),
+                "program_id": program_id
+            }
+            self.token_actions[mint]["liquidity_events"].append(liquidity_event)
                 
-                # Check for flash launch pattern
-                recent_liquidity = [
-                    e for e in self.token_actions[mint]["liquidity_events"]
-                    if (datetime.now() - e["timestamp"]).total_seconds() < 3600  # Last hour
-                ]
+            # Check for flash launch pattern
+            recent_liquidity = [
+                e for e in self.token_actions[mint]["liquidity_events"]
+                if (datetime.now() - e["timestamp"]).total_seconds() < 3600  # Last hour
+            ]
                 
-                if len(recent_liquidity) >= 2:
-                    # Check if this is a new token with sudden liquidity changes
-                    token_age = datetime.now().timestamp() - self.token_actions[mint]["creation_time"]
-                    if token_age < THRESHOLDS["new_token_age_threshold"]:
-                        # Check sell activity after liquidity events
-                        if (self.token_actions[mint]["buys"] > 5 and
-                            self.token_actions[mint]["buys"] > self.token_actions[mint]["sells"] * 3):
-                            # Might be a flash launch token
-                            if mint not in THRESHOLDS["token_categories"]["flash_launched_tokens"]:
-                                THRESHOLDS["token_categories"]["flash_launched_tokens"].add(mint)
+            if len(recent_liquidity) >= 2:
+                # Check if this is a new token with sudden liquidity changes
+                creation_time = self.token_actions[mint]["creation_time"]
+                if creation_time is not None and datetime.now().timestamp() - creation_time < THRESHOLDS["new_token_age_threshold"]:
+                    # Check sell activity after liquidity events
+                    if (self.token_actions[mint]["buys"] > 5 and
+                        self.token_actions[mint]["buys"] > self.token_actions[mint]["sells"] * 3):
+                        # Might be a flash launch token
+                        if mint not in THRESHOLDS["token_categories"]["flash_launched_tokens"]:
+                            self._flag_token(mint, "flash_launched_tokens")
                                 
-                                # Mark all creator addresses as suspicious
-                                for creator in self.token_actions[mint]["creators"]:
-                                    self.add_suspicious_address(
-                                        creator,
-                                        f"Possible flash token launch: {mint[:8]}...{mint[-8:]} (quick pairing and pump pattern)"
-                                    )
+                            # Mark all creator addresses as suspicious
+                            for creator in self.token_actions[mint]["creators"]:
+                                self.add_suspicious_address(
+                                    creator,
+                                    f"Possible flash token launch: {mint[:8]}...{mint[-8:]} (quick pairing and pump pattern)",
+                                    "flash_launched_tokens"
+                                )
+        
+    def _index_creator(self, creator, mint, category):
+        self.creator_flags.setdefault(creator, {}).setdefault(category, mint)
+        
+    def _flag_token(self, mint, category):
+        """Put a token in a THRESHOLDS token category and index its creators"""
+        THRESHOLDS["token_categories"][category].add(mint)
+        if mint in self.token_actions:
+            for creator in self.token_actions[mint]["creators"]:
+                self._index_creator(creator, mint, category)
+                
+    def _add_token_creator(self, mint, address):
+        """Record a creator of a token, indexing it under the token's categories"""
+        self.token_actions[mint]["creators"].add(address)
+        for category, mints in THRESHOLDS["token_categories"].items():
+            if mint in mints:
+                self._index_creator(address, mint, category)
         
     def _get_token_creation_time(self, mint):
-        """Get token creation timestamp (simplified)"""
-        # In real implementation, we would query the blockchain for the token creation block
-        # For now, we'll use the current time if we haven't seen this token before
-        return datetime.now().timestamp()
+        """
+        Get token creation timestamp (block time of the mint's first signature)
+        None until a background lookup has found it, or if it cannot be found
+        """
+        return self.token_ages.creation_time(mint, THRESHOLDS["new_token_age_threshold"], wait=False)
         
     def _check_for_token_impersonation(self, mint):
         """Check if a token is impersonating a legitimate project"""
@@ -332,7 +386,7 @@ class SuspiciousActivityDetector:
             if key in name or key in symbol:
                 if mint not in legitimate_mints:
                     # This token is impersonating a legitimate project
-                    THRESHOLDS["token_categories"]["impersonation_tokens"].add(mint)
+                    self._flag_token(mint, "impersonation_tokens")
                     
                     # Try to find the creator address by getting recent token transfers
                     tx_data = self.solana_rpc.get_recent_signatures(mint, limit=3)
@@ -345,76 +399,88 @@ class SuspiciousActivityDetector:
                             if signer:
                                 self.add_suspicious_address(
                                     signer,
-                                    f"Token impersonation: {name}/{symbol} impersonating {key} ({mint[:8]}...{mint[-8:]})"
+                                    f"Token impersonation: {name}/{symbol} impersonating {key} ({mint[:8]}...{mint[-8:]})",
+                                    "impersonation_tokens"
                                 )
         
-    def _check_for_sybil_pattern(self, address, tx_data):
+    def _check_for_sybil_pattern(self, address, features):
         """Check for Sybil attack-like patterns with many similar wallets"""
         # Track this address's behavior
-        behavior_key = self._get_behavior_key(tx_data)
+        behavior_key = features["behavior_key"]
         if not behavior_key:
             return
             
-        # Find or create a wallet group with similar behavior
-        group_id = None
-        for gid, group in self.wallet_groups.items():
-            if behavior_key in group["behaviors"]:
-                group_id = gid
-                break
-                
-        if not group_id:
-            # Create a new group
-            group_id = f"group_{len(self.wallet_groups) + 1}"
-            self.wallet_groups[group_id] = {
+        now = time.time()
+            
+        # Find or create the wallet group for this behavior
+        group_id = self.behavior_groups.get(behavior_key)
+        if group_id:
+            wallet_group = self.wallet_groups[group_id]
+        else:
+            group_id = f"group_{self.next_group_id}"
+            self.next_group_id += 1
+            self.behavior_groups[behavior_key] = group_id
+            wallet_group = {
                 "wallets": set(),
                 "behaviors": set([behavior_key]),
-                "creation_times": {},
-                "transactions": set()
+                "creation_times": {},    # wallet -> epoch seconds
+                "sorted_times": [],      # creation_times values, kept sorted
+                "close_pairs": 0,        # Adjacent sorted_times within wallet_creation_window
+                "transactions": deque(maxlen=STATE_LIST_LIMIT),
+                "flagged": False
             }
-            
+            self.wallet_groups[group_id] = wallet_group
+        
         # Add this wallet to the group
-        wallet_group = self.wallet_groups[group_id]
+        is_new_wallet = address not in wallet_group["wallets"]
         wallet_group["wallets"].add(address)
-        wallet_group["creation_times"][address] = datetime.now()
-        wallet_group["transactions"].add(tx_data.get("signature", ""))
-        
-        # Check if this group has suspicious characteristics
-        if len(wallet_group["wallets"]) >= THRESHOLDS["wallet_group_threshold"]:
-            # Check if wallets were created close to each other
-            creation_times = list(wallet_group["creation_times"].values())
-            if len(creation_times) >= 2:
-                # Sort by creation time
-                creation_times.sort()
-                # Check time differences between consecutive wallets
-                for i in range(1, len(creation_times)):
-                    time_diff = (creation_times[i] - creation_times[i-1]).total_seconds()
-                    if time_diff <= THRESHOLDS["wallet_creation_window"]:
-                        # These wallets were created close together
-                        for wallet in wallet_group["wallets"]:
-                            if wallet not in self.suspicious_addresses:
-                                self.add_suspicious_address(
-                                    wallet,
-                                    f"Potential Sybil attack: part of a group of {len(wallet_group['wallets'])} similar wallets"
-                                )
-                        break
-    
-    def _get_behavior_key(self, tx_data):
-        """Generate a key representing this transaction's behavior pattern"""
-        # This is a simplified implementation
-        # In a real system, we'd use more sophisticated behavior analysis
-        
-        program_ids = tx_data.get("program_ids", [])
-        if not program_ids:
-            return None
-            
-        # Sort to make the key stable
-        program_ids.sort()
-        
-        # Generate a simplified behavior key
-        event_types = [e.get("type", "") for e in tx_data.get("events", [])]
-        event_types.sort()
+        self._set_group_time(wallet_group, address, now)
+        wallet_group["transactions"].append(features["signature"])
         
-        return f"{'-'.join(program_ids[:3])}-{'-'.join(event_types)}"
+        # Check if this group has suspicious characteristics: enough wallets,
+        # some of them created close together
+        if wallet_group["flagged"]:
+            if is_new_wallet and address not in self.suspicious_addresses:
+                self.add_suspicious_address(
+                    address,
+                    f"Potential Sybil attack: part of a group of {len(wallet_group['wallets'])} similar wallets",
+                    "sybil_group"
+                )
+        elif len(wallet_group["wallets"]) >= THRESHOLDS["wallet_group_threshold"] and wallet_group["close_pairs"]:
+            wallet_group["flagged"] = True
+            for wallet in wallet_group["wallets"]:
+                if wallet not in self.suspicious_addresses:
+                    self.add_suspicious_address(
+                        wallet,
+                        f"Potential Sybil attack: part of a group of {len(wallet_group['wallets'])} similar wallets",
+                        "sybil_group"
+                    )
+    
+    def _set_group_time(self, wallet_group, address, timestamp):
+        """Move a wallet's time in a group's sorted timeline, keeping close_pairs current"""
+        times = wallet_group["sorted_times"]
+        window = THRESHOLDS["wallet_creation_window"]
+        
+        def close(i, j):
+            return 0 <= i and j < len(times) and times[j] - times[i] <= window
+        
+        old = wallet_group["creation_times"].get(address)
+        if old is not None:
+            i = bisect.bisect_left(times, old)
+            wallet_group["close_pairs"] -= close(i - 1, i) + close(i, i + 1)
+            times.pop(i)
+            wallet_group["close_pairs"] += close(i - 1, i)
+        
+        i = bisect.bisect_right(times, timestamp)
+        wallet_group["close_pairs"] -= close(i - 1, i)
+        times.insert(i, timestamp)
+        wallet_group["close_pairs"] += close(i - 1, i) + close(i, i + 1)
+        wallet_group["creation_times"][address] = timestamp
+    
+    def _on_wallet_group_evicted(self, group_id, wallet_group):
+        """Keep the behavior index in step with evicted wallet groups"""
+        for behavior_key in wallet_group["behaviors"]:
+            self.behavior_groups.pop(behavior_key, None)
     
     def _track_bridge_activity(self, address, bridge_program_id, tx_data):
         """Track cross-chain bridge activity"""
@@ -431,11 +497,18 @@ class SuspiciousActivityDetector:
             "signature": tx_data.get("signature", "")
         }
         
-        self.cross_chain_transfers[address]["bridge_txs"].append(bridge_tx)
-        self.cross_chain_transfers[address]["timestamps"].append(datetime.now())
+        transfers = self.cross_chain_transfers[address]
+        transfers["bridge_txs"].append(bridge_tx)
+        transfers["timestamps"].append(datetime.now())
+        
+        # Only transfers inside the window are ever looked at
+        window_start = datetime.now() - timedelta(seconds=THRESHOLDS["cross_chain_transfer_window"])
+        while transfers["timestamps"] and transfers["timestamps"][0] < window_start:
+            transfers["timestamps"].pop(0)
+            transfers["bridge_txs"].pop(0)
         
         # Check for rapid cross-chain transfers
-        timestamps = self.cross_chain_transfers[address]["timestamps"]
+        timestamps = transfers["timestamps"]
         if len(timestamps) >= THRESHOLDS["min_bridge_transfers"]:
             # Check time window for recent transfers
             recent_timestamps = [
@@ -446,126 +519,95 @@ class SuspiciousActivityDetector:
             if len(recent_timestamps) >= THRESHOLDS["min_bridge_transfers"]:
                 self.add_suspicious_address(
                     address,
-                    f"Rapid cross-chain transfers: {len(recent_timestamps)} bridge interactions within {THRESHOLDS['cross_chain_transfer_window']/60:.1f} minutes"
+                    f"Rapid cross-chain transfers: {len(recent_timestamps)} bridge interactions within {THRESHOLDS['cross_chain_transfer_window']/60:.1f} minutes",
+                    "rapid_bridge_transfers"
                 )
     
-    def _check_for_exploit(self, address, program_id, tx_data, instruction_count):
-        """Check for potential smart contract exploits"""
-        # In a real implementation, we'd have more sophisticated logic
-        # Here we'll just check for abnormally high instruction counts
-        if instruction_count > THRESHOLDS["abnormal_instruction_count"]:
-            # This transaction has an unusually high number of instructions
-            # It could be an exploit attempt
-            self.add_suspicious_address(
-                address,
-                f"Potential exploit: abnormal instruction count ({instruction_count})"
-            )
+    def window_features(self, address, now=None):
+        """Address-scope rule features from the sliding windows (None if no recent activity)"""
+        if not address in self.address_activity:
+            return None
             
-    def _check_for_fund_obfuscation(self, address, tx_data):
-        """Detect potential fund obfuscation using complex routing"""
-        # This requires tracking transaction patterns across multiple hops
-        # Simplified implementation - check for transactions with multiple transfers
-        
-        events = tx_data.get("events", [])
-        transfer_events = [e for e in events if e.get("type") in ["sol_transfer", "token_transfer"]]
-        
-        if len(transfer_events) >= 3:
-            # Extract unique addresses involved in this transaction
-            addresses = set()
-            for event in transfer_events:
-                if "other_address" in event:
-                    addresses.add(event["other_address"])
-                    
-            # If one transaction touches multiple addresses, it might be routing funds
-            if len(addresses) >= 3:
-                self.add_suspicious_address(
-                    address,
-                    f"Possible fund obfuscation: complex transaction touching {len(addresses)} addresses"
-                )
-                
-                # Also mark the destination addresses as suspicious
-                for addr in addresses:
-                    if addr != address and addr not in self.suspicious_addresses:
-                        self.add_suspicious_address(
-                            addr,
-                            f"Involved in complex fund routing from {address[:8]}...{address[-8:]}"
-                        )
+        # Running totals over the sliding windows
+        activity = self.address_activity[address]
+        now = time.time() if now is None else now
+        tx_count, sol_volume, token_volume_usd, _, all_programs = activity.window("unusual", now)
         
-    def analyze_address(self, address):
+        if not tx_count:
+            return None
+            
+        return {
+            "tx_count": tx_count,
+            "rapid_tx_count": activity.window("rapid", now)[0],
+            "sol_volume": sol_volume,
+            "usd_volume": token_volume_usd,
+            "unusual_program_count": sum(1 for p in all_programs if p in THRESHOLDS["unusual_program_ids"]),
+            "bridge_count": activity.window("bridge", now)[3]
+        }
+        
+    def analyze_address(self, address, now=None):
         """
         Analyze an address for suspicious activity
         Returns: (is_suspicious, reason)
         """
-        if not address in self.address_activity:
-            return False, ""
-            
-        # Get recent activity within the unusual time window
-        now = datetime.now()
-        recent_window = now - timedelta(seconds=THRESHOLDS["unusual_time_window"])
-        recent_activity = [
-            a for a in self.address_activity[address] 
-            if a["timestamp"] > recent_window
-        ]
-        
-        if not recent_activity:
-            return False, ""
-            
-        # Check for rapid transaction count
-        if len(recent_activity) >= THRESHOLDS["rapid_transactions"]:
-            very_recent = now - timedelta(seconds=THRESHOLDS["rapid_time_window"])
-            very_recent_activity = [
-                a for a in self.address_activity[address]
-                if a["timestamp"] > very_recent
-            ]
-            
-            if len(very_recent_activity) >= THRESHOLDS["rapid_transactions"]:
-                return True, f"Unusually high transaction velocity: {len(very_recent_activity)} transactions in {THRESHOLDS['rapid_time_window']} seconds"
+        hit = self.address_hit(address, now)
+        return (True, hit[1]) if hit else (False, "")
         
-        # Check for large SOL transfers
-        sol_volume = sum(a["sol_amount"] for a in recent_activity)
-        if sol_volume >= THRESHOLDS["large_sol_transfer"]:
-            return True, f"Large SOL transfer detected: {sol_volume:.2f} SOL"
-            
-        # Check for high value token transfers
-        token_volume_usd = sum(a["token_amount_usd"] for a in recent_activity)
-        if token_volume_usd >= THRESHOLDS["high_value_transfer"]:
-            return True, f"High value token transfer: ${token_volume_usd:.2f}"
-            
-        # Check for interaction with multiple contract programs
-        all_programs = set()
-        for activity in recent_activity:
-            all_programs.update(activity["programs"])
+    def address_hit(self, address, now=None):
+        """First address check that flags an address, as (reason code, reason); None if none does"""
+        features = self.window_features(address, now)
+        if features is None:
+            return None
             
-        suspicious_programs = [p for p in all_programs if p in THRESHOLDS["unusual_program_ids"]]
-        if len(suspicious_programs) >= THRESHOLDS["contract_interaction_count"]:
-            return True, f"Unusual interaction with {len(suspicious_programs)} different programs"
+        # Velocity, volume, program and bridge rules; the first hit wins
+        hits = self.rules.evaluate("address", features)
+        if hits:
+            return hits[0].name, hits[0].reason
+        
+        # Check if this address has created flagged tokens
+        created = self.creator_flags.get(address)
+        if created:
+            if "unsellable_tokens" in created:
+                mint = created["unsellable_tokens"]
+                return "created_unsellable_tokens", f"Created unsellable token: {mint[:8]}...{mint[-8:]}"
+            if "flash_launched_tokens" in created:
+                mint = created["flash_launched_tokens"]
+                return "created_flash_launched_tokens", f"Created flash launch token: {mint[:8]}...{mint[-8:]}"
+            if "impersonation_tokens" in created:
+                mint = created["impersonation_tokens"]
+                return "created_impersonation_tokens", f"Created token impersonation: {mint[:8]}...{mint[-8:]}"
             
-        # Check for bridge abuse
-        if address in self.cross_chain_transfers:
-            recent_bridge_txs = [
-                tx for tx in self.cross_chain_transfers[address]["bridge_txs"]
-                if (now - tx["timestamp"]).total_seconds() < THRESHOLDS["cross_chain_transfer_window"]
-            ]
-            
-            if len(recent_bridge_txs) >= THRESHOLDS["min_bridge_transfers"]:
-                return True, f"Suspicious cross-chain activity: {len(recent_bridge_txs)} bridge transfers in short period"
+        return None
+        
+    def state_metrics(self):
+        """Entry counts, TTLs and eviction counters of the tracking tables, plus token age lookups"""
+        return dict(self.state.metrics(), token_creation_times=self.token_ages.metrics())
+        
+    def snapshot_tables(self):
+        """Tracking tables, snapshotted incrementally (see snapshot.py)"""
+        return self.state.tables
+        
+    def export_state(self):
+        """Tracking state kept outside the tables, for snapshots"""
+        return {
+            "behavior_groups": dict(self.behavior_groups),
+            "next_group_id": self.next_group_id,
+            "token_categories": {category: set(mints) for category, mints in THRESHOLDS["token_categories"].items()},
+            "fund_graph": self.fund_graph.export_state(),
+            "token_creation_times": self.token_ages.export_state()
+        }
         
-        # Check if this address has created unsellable tokens
-        for mint in THRESHOLDS["token_categories"]["unsellable_tokens"]:
-            if mint in self.token_actions and address in self.token_actions[mint]["creators"]:
-                return True, f"Created unsellable token: {mint[:8]}...{mint[-8:]}"
-                
-        # Check if this address has created flash launch tokens
-        for mint in THRESHOLDS["token_categories"]["flash_launched_tokens"]:
-            if mint in self.token_actions and address in self.token_actions[mint]["creators"]:
-                return True, f"Created flash launch token: {mint[:8]}...{mint[-8:]}"
-                
-        # Check if this address has created impersonation tokens
-        for mint in THRESHOLDS["token_categories"]["impersonation_tokens"]:
-            if mint in self.token_actions and address in self.token_actions[mint]["creators"]:
-                return True, f"Created token impersonation: {mint[:8]}...{mint[-8:]}"
-            
-        return False, ""
+    def import_state(self, state):
+        """Restore export_state(); the tables must already be restored"""
+        self.next_group_id = max(self.next_group_id, state.get("next_group_id", 1))
+        for behavior_key, group_id in state.get("behavior_groups", {}).items():
+            if group_id in self.wallet_groups:
+                self.behavior_groups[behavior_key] = group_id
+        for category, mints in state.get("token_categories", {}).items():
+            THRESHOLDS["token_categories"].setdefault(category, set()).update(mints)
+        if "fund_graph" in state:
+            self.fund_graph.import_state(state["fund_graph"])
+        self.token_ages.import_state(state.get("token_creation_times", {}))
         
     def get_recent_alerts(self, limit=5):
         """Get the most recent alerts"""
@@ -573,33 +615,61 @@ class SuspiciousActivityDetector:
             return self.recent_alerts[-limit:]
         return self.recent_alerts
         
-    def analyze_transaction(self, tx_data):
+    def analyze_transaction(self, tx_data, now=None):
         """
         Analyze a transaction for suspicious activity
+        `now` defaults to the current time; replays pass the block time
         Returns: (is_suspicious, reason)
         """
         if not tx_data or not "events" in tx_data:
             return False, ""
             
-        # Extract addresses from the transaction
-        addresses = []
-        for event in tx_data.get("events", []):
-            if "other_address" in event:
-                addresses.append(event["other_address"])
+        # Extract features (addresses, amounts, programs) in one pass
+        self.rules.maybe_reload()
+        features = self.rules.extract(tx_data, self.solana_rpc.get_token_price_usd)
+        addresses = features["counterparties"]
+        self.fund_graph.add_transaction(tx_data, now)
                 
         # Check if any address is already known to be suspicious
         for address in addresses:
             if self.is_suspicious_address(address):
+                entry = self.reputation.seen(address, now)
+                if entry and self.persist:
+                    self.reputation_store.record(["set", address, entry])
                 return True, f"Interaction with known suspicious address: {address[:8]}...{address[-8:]}"
                 
+        # Check if funds reached a counterparty from a flagged address; the
+        # counterparties are still tracked below
+        traced = None
+        for address in addresses:
+            # Paths through this transaction's own wallet would implicate all of its counterparties
+            path = self.fund_graph.trace_sources(
+                address, self.suspicious_addresses, THRESHOLDS["fund_trace_hops"], exclude=(tx_data.get("account"),)
+            )
+            if path:
+                source = path[0]
+                traced = (f"Funds traced from suspicious address {source[:8]}...{source[-8:]} "
+                          f"to {address[:8]}...{address[-8:]} ({len(path) - 1} hops)")
+                break
+                
+        # Drop tracking state that went idle
+        self.state.evict()
+        self.fund_graph.expire(now)
+        
+        # Transaction-level rules are evaluated once and applied to every counterparty
+        tx_hits = self.rules.evaluate("transaction", features)
+        
         # Track activity for each address
         for address in addresses:
-            self.track_address_activity(address, tx_data)
+            self.track_address_activity(address, tx_data, features, tx_hits, now)
             
             # Analyze the address for suspicious activity
-            is_suspicious, reason = self.analyze_address(address)
-            if is_suspicious:
-                self.add_suspicious_address(address, reason)
-                return True, f"Suspicious activity detected for address {address[:8]}...{address[-8:]}: {reason}"
+            hit = self.address_hit(address, now)
+            if hit:
+                code, reason = hit
+                self.add_suspicious_address(address, reason, code)
+                return True, traced or f"Suspicious activity detected for address {address[:8]}...{address[-8:]}: {reason}"
                 
+        if traced:
+            return True, traced
         return False, ""
\ No newline at end of file
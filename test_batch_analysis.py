@@ -0,0 +1,56 @@
+"""
+Differential tests of batch_analysis against SuspiciousActivityDetector
+The same synthetic transactions are fed through the streaming detector and
+through EventBatch/analyze_batch, and their flags must agree.
+
+Usage:
+    python -m pytest -q test_batch_analysis.py
+"""
+import random
+from benchmark import (BENCH_WALLET, StubRPC, SyntheticCorpus, batch_check, bench_workdir, build_pipeline,
+                       replay_fixture, verdict_check, window_check)
+
+SEED = 1337
+CORPUS_SIZE = 2000
+
+
+def decoded_fixture(pool_size, single_counterparty=False, zipf=False):
+    """Decode the synthetic corpus with counterparties drawn from a pool of pool_size"""
+    monitor, _, _ = build_pipeline(BENCH_WALLET)
+    monitor.save_transaction_history = lambda tx=None: None
+    rng = random.Random(SEED)
+    pool = [SyntheticCorpus(SEED + i).address() for i in range(pool_size)]
+    weights = [1 / (rank + 1) for rank in range(pool_size)] if zipf else None
+    corpus = SyntheticCorpus(SEED).generate(CORPUS_SIZE)
+    return replay_fixture(corpus, monitor, rng, pool, single_counterparty, weights)
+
+
+def test_window_flags_match():
+    """Every (transaction, counterparty) row is flagged the same way by both paths"""
+    with bench_workdir():
+        report = window_check(decoded_fixture(20), StubRPC())
+    assert report["flagged_rows"], "fixture flags nothing, so the comparison proves nothing"
+    assert report["mismatch_count"] == 0, report["mismatches"]
+
+
+def test_transaction_verdicts_match():
+    """analyze_transaction verdicts equal the ones replayed from the batch results"""
+    with bench_workdir():
+        report = verdict_check(decoded_fixture(2000, single_counterparty=True, zipf=True), StubRPC())
+    assert report["rule_flags"], "no verdict came from the address rules"
+    assert report["flagged_transactions"] < report["transactions"]
+    assert report["mismatch_count"] == 0, report["mismatches"]
+
+
+def test_batch_check_reports_no_mismatches():
+    """The benchmark's --batch-check entry point agrees with the tests above"""
+    corpus = SyntheticCorpus(SEED).generate(CORPUS_SIZE)
+    with bench_workdir():
+        report = batch_check(corpus, seed=SEED, verdict_pool_size=2000)
+    assert report["mismatch_count"] == 0, report["windows"]["mismatches"] + report["verdicts"]["mismatches"]
+
+
+if __name__ == "__main__":
+    for test in (test_window_flags_match, test_transaction_verdicts_match, test_batch_check_reports_no_mismatches):
+        test()
+        print(f"{test.__name__}: ok")
@@ -0,0 +1,138 @@
+"""
+Token creation times from the mint's signature history
+A mint's creation time is the block time of the oldest signature of the
+mint address. getSignaturesForAddress returns signatures newest first and
+only pages backwards, so the lookup reads large pages and stops as soon as
+the token is known to be older than the age the caller cares about.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import (
+    SIGNATURE_PAGE_SIZE, TOKEN_AGE_MAX_PAGES, TOKEN_AGE_CACHE_SIZE, TOKEN_AGE_WORKERS, TOKEN_AGE_RETRY_SECONDS
+)
+
+
+class TokenCreationTimes:
+    """
+    Cached, deduplicated token creation time lookups
+
+    Creation times never change, so found times are cached for good (up to
+    `max_cached` mints, least recently used dropped first). For tokens older
+    than the `max_age` given to the lookup, the cached time is the oldest
+    block time read before stopping: the token was created no later, which
+    is all an age check against `max_age` needs. Only walks that reached the
+    first signature or crossed `max_age` are cached; a failed RPC call or
+    running out of pages leaves the time unknown (None), and the mint is not
+    looked up again for `retry_seconds`. Concurrent lookups of the same mint
+    share one RPC walk.
+    """
+
+    def __init__(self, solana_rpc, page_size=SIGNATURE_PAGE_SIZE, max_pages=TOKEN_AGE_MAX_PAGES,
+                 max_cached=TOKEN_AGE_CACHE_SIZE, workers=TOKEN_AGE_WORKERS, retry_seconds=TOKEN_AGE_RETRY_SECONDS):
+        self.solana_rpc = solana_rpc
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_cached = max_cached
+        self.retry_seconds = retry_seconds
+        self.times = OrderedDict()    # mint -> creation time (or the bound described above)
+        self.retry_at = OrderedDict() # mint -> epoch seconds its next lookup may start
+        self.inflight = {}            # mint -> Future of a running lookup
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="token-age")
+        self.stats = {"lookups": 0, "hits": 0, "joined": 0, "pages": 0, "early_exits": 0,
+                      "incomplete": 0, "failures": 0}
+
+    def creation_time(self, mint, max_age, now=None, wait=True):
+        """
+        Epoch seconds the mint was created (see class docstring); None if unknown
+        With wait=False a time not cached yet is looked up in the background
+        and None is returned; a later call returns it once found.
+        """
+        with self.lock:
+            if mint in self.times:
+                self.times.move_to_end(mint)
+                self.stats["hits"] += 1
+                return self.times[mint]
+            future = self.inflight.get(mint)
+            if future is None:
+                if time.time() < self.retry_at.get(mint, 0):
+                    return None
+                future = self.inflight[mint] = Future()
+                owner = True
+            else:
+                self.stats["joined"] += 1
+                owner = False
+        if not wait:
+            if owner:
+                self.pool.submit(self._resolve, mint, max_age, now, future)
+            return None
+        if not owner:
+            return future.result()
+        return self._resolve(mint, max_age, now, future)
+
+    def _resolve(self, mint, max_age, now, future):
+        created, final = None, False
+        try:
+            created, final = self._lookup(mint, max_age, now)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"Error finding creation time of {mint}: {e}")
+        with self.lock:
+            del self.inflight[mint]
+            if final:
+                self.retry_at.pop(mint, None)
+                self.times[mint] = created
+                if len(self.times) > self.max_cached:
+                    self.times.popitem(last=False)
+            else:
+                created = None
+                self.retry_at[mint] = time.time() + self.retry_seconds
+                self.retry_at.move_to_end(mint)
+                if len(self.retry_at) > self.max_cached:
+                    self.retry_at.popitem(last=False)
+        future.set_result(created)
+        return created
+
+    def _lookup(self, mint, max_age, now):
+        """(oldest block time read, whether it can be cached)"""
+        now = time.time() if now is None else now
+        cutoff = now - max_age
+        self.stats["lookups"] += 1
+        oldest = None
+        before = None
+        for _ in range(self.max_pages):
+            page = self.solana_rpc.get_recent_signatures(mint, limit=self.page_size, before=before)
+            self.stats["pages"] += 1
+            if page is None:
+                self.stats["failures"] += 1
+                return None, False
+            times = [sig["blockTime"] for sig in page if sig.get("blockTime")]
+            if times:
+                oldest = min(times) if oldest is None else min(oldest, min(times))
+            if len(page) < self.page_size:
+                # Reached the first signature
+                return oldest, oldest is not None
+            if oldest is not None and oldest < cutoff:
+                self.stats["early_exits"] += 1
+                return oldest, True     # Already older than max_age; the exact time does not matter
+            before = page[-1]["signature"]
+        self.stats["incomplete"] += 1
+        return None, False
+
+    def export_state(self):
+        """Cached creation times, for snapshots"""
+        return dict(list(self.times.items()))
+
+    def import_state(self, times):
+        """Restore export_state()"""
+        with self.lock:
+            for mint, created in times.items():
+                self.times.setdefault(mint, created)
+            while len(self.times) > self.max_cached:
+                self.times.popitem(last=False)
+
+    def metrics(self):
+        """Lookup, cache and paging counters"""
+        return dict(self.stats, cached=len(self.times), inflight=len(self.inflight), retrying=len(self.retry_at))
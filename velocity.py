@@ -0,0 +1,267 @@
+"""
+Sliding-window event counters
+Fixed ring buffers of time buckets give constant-time updates and window
+queries per key, and keys that go quiet are evicted in last-seen order so
+memory stays flat no matter how many mints are tracked
+"""
+import time
+from array import array
+
+# Fixed-point units for window volumes: integer totals stay exact however
+# many buckets are added and subtracted (and match batch_analysis.py)
+SOL_UNITS = 1e9     # Lamports
+USD_UNITS = 1e6     # Micro-dollars
+
+
+def window_buckets(seconds, bucket_seconds):
+    """Number of buckets a window of `seconds` spans"""
+    return max(1, -(-int(seconds) // int(bucket_seconds)))
+
+
+class VelocityCounter:
+    """Ring buffer of per-bucket event counts covering one sliding window"""
+    __slots__ = ("counts", "head", "total", "last_seen")
+
+    def __init__(self, bucket_count):
+        self.counts = array("I", bytes(4 * bucket_count))
+        self.head = None      # Absolute index (epoch // bucket width) of the newest bucket
+        self.total = 0        # Events in the window
+        self.last_seen = 0
+
+    def _advance(self, bucket):
+        """Rotate the ring forward to `bucket`, expiring buckets that left the window"""
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        size = len(self.counts)
+        for step in range(1, min(bucket - self.head, size) + 1):
+            index = (self.head + step) % size
+            self.total -= self.counts[index]
+            self.counts[index] = 0
+        self.head = bucket
+
+    def add(self, bucket, now, count=1):
+        self._advance(bucket)
+        if bucket <= self.head - len(self.counts):
+            return  # Older than the window
+        self.counts[bucket % len(self.counts)] += count
+        self.total += count
+        self.last_seen = max(self.last_seen, now)
+
+    def count(self, bucket):
+        self._advance(bucket)
+        return self.total
+
+    @classmethod
+    def restore(cls, counts, head, total, last_seen):
+        counter = cls.__new__(cls)
+        counter.counts = counts
+        counter.head = head
+        counter.total = total
+        counter.last_seen = last_seen
+        return counter
+
+
+class VelocityTracker:
+    """
+    Per-key sliding-window counters with idle eviction
+
+    Counts cover the last `window_seconds`, at `bucket_seconds` resolution.
+    Keys not seen for `idle_seconds` are dropped, and at most `max_keys` are
+    kept (least recently seen go first).
+    """
+
+    def __init__(self, window_seconds, bucket_seconds, idle_seconds, max_keys):
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = max(1, -(-int(window_seconds) // int(bucket_seconds)))
+        self.idle_seconds = idle_seconds
+        self.max_keys = max_keys
+        self.counters = {}   # key -> VelocityCounter, least recently seen first
+
+    def _bucket(self, now):
+        return int(now // self.bucket_seconds)
+
+    def record(self, key, now=None, count=1):
+        """Count an event for `key`"""
+        now = time.time() if now is None else now
+        counter = self.counters.pop(key, None)
+        if counter is None:
+            counter = VelocityCounter(self.bucket_count)
+        counter.add(self._bucket(now), now, count)
+        # Re-inserting keeps the dict ordered by last activity
+        self.counters[key] = counter
+        self.evict(now)
+
+    def count(self, key, now=None):
+        """Events for `key` in the current window"""
+        counter = self.counters.get(key)
+        if counter is None:
+            return 0
+        now = time.time() if now is None else now
+        return counter.count(self._bucket(now))
+
+    def evict(self, now=None):
+        """Drop idle keys and enforce the key limit; amortized O(1) per record"""
+        now = time.time() if now is None else now
+        cutoff = now - self.idle_seconds
+        while self.counters:
+            key = next(iter(self.counters))
+            counter = self.counters[key]
+            if counter.last_seen >= cutoff and len(self.counters) <= self.max_keys:
+                break
+            del self.counters[key]
+
+    def export_state(self):
+        """Columnar copy of the counters for snapshots (keys, heads, totals, last seen, counts)"""
+        items = list(self.counters.items())
+        counts = array("I")
+        for _, counter in items:
+            counts.extend(counter.counts)
+        return {
+            "bucket_count": self.bucket_count,
+            "keys": [key for key, _ in items],
+            "heads": array("q", [counter.head for _, counter in items]).tobytes(),
+            "totals": array("q", [counter.total for _, counter in items]).tobytes(),
+            "last_seen": array("d", [counter.last_seen for _, counter in items]).tobytes(),
+            "counts": counts.tobytes()
+        }
+
+    def import_state(self, state, now=None):
+        """Restore counters from export_state(), skipping keys that have gone idle since"""
+        if state.get("bucket_count") != self.bucket_count:
+            return 0
+        now = time.time() if now is None else now
+        heads = array("q", state["heads"])
+        totals = array("q", state["totals"])
+        last_seen = array("d", state["last_seen"])
+        counts = array("I", state["counts"])
+        size = self.bucket_count
+        cutoff = now - self.idle_seconds
+        restored = 0
+        for i, key in enumerate(state["keys"]):
+            if last_seen[i] < cutoff or key in self.counters:
+                continue
+            self.counters[key] = VelocityCounter.restore(
+                counts[i * size:(i + 1) * size], heads[i], totals[i], last_seen[i]
+            )
+            restored += 1
+        self.evict(now)
+        return restored
+
+    def __contains__(self, key):
+        return key in self.counters
+
+    def __len__(self):
+        return len(self.counters)
+
+
+class WindowAggregates:
+    """
+    Per-address activity totals over several sliding windows at once
+
+    Each event updates its time bucket and every window's running totals
+    (transaction count, SOL volume, USD volume, bridge interactions and
+    distinct programs); buckets leaving a window are subtracted as the ring
+    advances, so updates and window queries cost O(1) in the history length.
+    Volumes are accumulated in SOL_UNITS/USD_UNITS integers.
+    """
+    __slots__ = ("bucket_seconds", "windows", "ring", "head", "totals", "programs")
+
+    def __init__(self, windows, bucket_seconds):
+        self.bucket_seconds = bucket_seconds
+        # window name -> length in buckets
+        self.windows = {name: window_buckets(seconds, bucket_seconds) for name, seconds in windows.items()}
+        # Slot: [absolute bucket, count, sol units, usd units, bridges, {program: occurrences}] or None
+        self.ring = [None] * max(self.windows.values())
+        self.head = None
+        self.totals = {name: [0, 0, 0, 0] for name in self.windows}
+        self.programs = {name: {} for name in self.windows}
+
+    def _subtract(self, name, slot):
+        totals = self.totals[name]
+        for i in range(4):
+            totals[i] -= slot[i + 1]
+        programs = self.programs[name]
+        for program, occurrences in slot[5].items():
+            remaining = programs[program] - occurrences
+            if remaining:
+                programs[program] = remaining
+            else:
+                del programs[program]
+
+    def _advance(self, bucket):
+        if self.head is None or bucket - self.head >= len(self.ring):
+            if self.head is not None:
+                # Everything has left every window
+                self.ring = [None] * len(self.ring)
+                self.totals = {name: [0, 0, 0, 0] for name in self.windows}
+                self.programs = {name: {} for name in self.windows}
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        size = len(self.ring)
+        for step in range(self.head + 1, bucket + 1):
+            for name, length in self.windows.items():
+                leaving = step - length
+                slot = self.ring[leaving % size]
+                if slot is not None and slot[0] == leaving:
+                    self._subtract(name, slot)
+            self.ring[step % size] = None
+        self.head = bucket
+
+    def add(self, now, sol=0.0, usd=0.0, bridges=0, programs=()):
+        """Record one transaction"""
+        bucket = int(now // self.bucket_seconds)
+        sol = int(round(sol * SOL_UNITS))
+        usd = int(round(usd * USD_UNITS))
+        self._advance(bucket)
+        bucket = max(bucket, self.head)  # Late events count in the current bucket
+        index = bucket % len(self.ring)
+        slot = self.ring[index]
+        if slot is None or slot[0] != bucket:
+            slot = self.ring[index] = [bucket, 0, 0, 0, 0, {}]
+        slot[1] += 1
+        slot[2] += sol
+        slot[3] += usd
+        slot[4] += bridges
+        for program in programs:
+            slot[5][program] = slot[5].get(program, 0) + 1
+        for name in self.windows:
+            totals = self.totals[name]
+            totals[0] += 1
+            totals[1] += sol
+            totals[2] += usd
+            totals[3] += bridges
+            window_programs = self.programs[name]
+            for program in programs:
+                window_programs[program] = window_programs.get(program, 0) + 1
+
+    def __getstate__(self):
+        # Only occupied slots are kept; totals are rebuilt from them
+        return self.bucket_seconds, self.windows, self.head, [slot for slot in self.ring if slot is not None]
+
+    def __setstate__(self, state):
+        self.bucket_seconds, self.windows, self.head, slots = state
+        self.ring = [None] * max(self.windows.values())
+        self.totals = {name: [0, 0, 0, 0] for name in self.windows}
+        self.programs = {name: {} for name in self.windows}
+        for slot in slots:
+            self.ring[slot[0] % len(self.ring)] = slot
+            for name, length in self.windows.items():
+                if slot[0] > self.head - length:
+                    totals = self.totals[name]
+                    for i in range(4):
+                        totals[i] += slot[i + 1]
+                    programs = self.programs[name]
+                    for program, occurrences in slot[5].items():
+                        programs[program] = programs.get(program, 0) + occurrences
+
+    def window(self, name, now=None):
+        """(count, sol_volume, usd_volume, bridge_count, programs) for a window"""
+        now = time.time() if now is None else now
+        self._advance(int(now // self.bucket_seconds))
+        count, sol, usd, bridges = self.totals[name]
+        return count, sol / SOL_UNITS, usd / USD_UNITS, bridges, self.programs[name].keys()
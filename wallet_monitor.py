@@ -1,12 +1,22 @@
 """
 Solana wallet monitor that tracks transactions and detects honeypot tokens
 """
-import json
 import time
-import os
 import re
+import threading
+from collections import deque
 from datetime import datetime
-from config import POLL_INTERVAL, TOKEN_MAP, SWAP_PROGRAM_IDS, LOG_FILE, TRANSACTION_HISTORY_FILE
+from balance_delta import BalanceDeltaEngine
+from checkpoint import PollCheckpoint
+from detector_executor import DetectorExecutor
+from json_store import JsonStore
+from ingest_queue import IngestQueue, REJECTED
+from models import DecodedTransaction, TransferEvent, SwapEvent, SwapDetails, HoneypotFlag, SuspiciousFlag, PhishingFlag
+from config import POLL_INTERVAL, TOKEN_MAP, SWAP_PROGRAM_IDS, LOG_FILE, TRANSACTION_HISTORY_FILE, SIGNATURE_PAGE_SIZE
+
+# Pre-decode scan of signature memos
+ADDRESS_PATTERN = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+DOMAIN_PATTERN = re.compile(r"https?://([^/\s]+)", re.IGNORECASE)
 
 class WalletMonitor:
     """
@@ -14,34 +24,59 @@ class WalletMonitor:
     honeypot tokens
     """
     
-    def __init__(self, wallet_address, solana_rpc, honeypot_detector, notification_service, suspicious_detector=None, phishing_detector=None):
+    def __init__(self, wallet_address, solana_rpc, honeypot_detector, notification_service, suspicious_detector=None, phishing_detector=None, checkpoint=None,
+                 history_file=TRANSACTION_HISTORY_FILE, on_decoded=None, detectors=None, seen_signatures=()):
         self.wallet_address = wallet_address
         self.solana_rpc = solana_rpc
         self.honeypot_detector = honeypot_detector
         self.notification_service = notification_service
         self.suspicious_detector = suspicious_detector
         self.phishing_detector = phishing_detector
-        self.seen_signatures = set()
+        self.balance_engine = BalanceDeltaEngine()
+        self.checkpoint = checkpoint or PollCheckpoint()
+        self.history_file = history_file  # None when history is kept by the main process
+        self.on_decoded = on_decoded      # Called with each DecodedTransaction (again if late results change it)
+        # Monitors sharing detectors must share their executor (one worker per detector)
+        self.detectors = detectors or DetectorExecutor()
         self.transaction_history = self.load_transaction_history()
+        # Signatures already recorded in history are never decoded twice
+        # (shards keep no history file and are handed the main process's)
+        self.seen_signatures = {tx.get("signature") for tx in self.transaction_history}
+        self.seen_signatures.update(seen_signatures)
+        self.ingest_queue = IngestQueue(wallet_address, on_shed=self._on_shed, scorer=self.pre_score)
+        # Signatures that must be queued before new discovery: work pending
+        # from before a restart and transactions whose fetch failed
+        self.deferred = deque(self.checkpoint.pending(wallet_address))
         
     def load_transaction_history(self):
-        """Load transaction history from file"""
-        if os.path.exists(TRANSACTION_HISTORY_FILE):
-            with open(TRANSACTION_HISTORY_FILE, "r") as f:
-                try:
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    return []
-        return []
-        
-    def save_transaction_history(self):
-        """Save transaction history to file"""
+        """Load transaction history from file, replaying transactions journaled since it was written"""
+        if not self.history_file:
+            self.history_store = None
+            return []
+        self.history_store = JsonStore(
+            self.history_file, lambda: [tx.to_dict() for tx in self.transaction_history], indent=2
+        )
+        data, journal = self.history_store.load()
+        history = data if isinstance(data, list) else []
+        signatures = {tx.get("signature") for tx in history}
+        for op, tx in journal:
+            if op == "append" and tx.get("signature") not in signatures:
+                history.append(tx)
+                signatures.add(tx.get("signature"))
+        return [DecodedTransaction.from_dict(tx) for tx in history[-100:]]
+        
+    def save_transaction_history(self, tx=None):
+        """Journal a newly added transaction and schedule the history file to be rewritten"""
         # Keep only the last 100 transactions to prevent the file from growing too large
         if len(self.transaction_history) > 100:
             self.transaction_history = self.transaction_history[-100:]
             
-        with open(TRANSACTION_HISTORY_FILE, "w") as f:
-            json.dump(self.transaction_history, f, indent=2)
+        if not self.history_store:
+            return
+        if tx is None:
+            self.history_store.touch()
+        else:
+            self.history_store.record(["append", tx.to_dict()])
     
     def log_message(self, msg):
         """Log a message to the log file"""
@@ -274,6 +309,382 @@ class WalletMonitor:
             self.log_message(f"Error parsing Raydium swap: {e}")
             return None
         
+    def _events_from_instructions(self, instructions):
+        """Build transfer events from parsed top-level instructions"""
+        events = []
+        for ix in instructions:
+            program = ix.get("program")
+            parsed = ix.get("parsed", {})
+            ix_type = parsed.get("type", "") if isinstance(parsed, dict) else ""
+            info = parsed.get("info", {}) if isinstance(parsed, dict) else {}
+            
+            # Handle system transfers (SOL)
+            if program == "system" and ix_type == "transfer":
+                destination = info.get("destination")
+                direction = "Received" if destination == self.wallet_address else "Sent"
+                events.append(TransferEvent(
+                    type="sol_transfer",
+                    direction=direction,
+                    amount=self.lamports_to_sol(int(info.get("lamports", 0))),
+                    other_address=info.get("source") if direction == "Received" else destination,
+                    token_name="SOL"
+                ))
+                
+            # Handle SPL token transfers
+            elif program == "spl-token" and ix_type == "transfer":
+                mint = info.get("mint", "")
+                destination = info.get("destination")
+                token_name, decimals = TOKEN_MAP.get(mint, (f"Unknown Token ({mint[:4]}...{mint[-4:]})", 6))
+                direction = "Received" if destination == self.wallet_address else "Sent"
+                events.append(TransferEvent(
+                    type="token_transfer",
+                    direction=direction,
+                    amount=int(info.get("amount", 0)) / (10 ** decimals),
+                    other_address=info.get("source") if direction == "Received" else destination,
+                    token_name=token_name,
+                    mint=mint,
+                    decimals=decimals
+                ))
+        return events
+        
+    def _handle_sol_transfer(self, event, timestamp):
+        """Log and notify for a SOL transfer event"""
+        direction = event.direction
+        amount = event.amount
+        other = event.other_address
+        
+        msg = f"{direction} {amount:.4f} SOL {'from' if direction == 'Received' else 'to'} {other} on {timestamp}"
+        self.log_message(msg)
+        
+        # Notify for large transfers (>1 SOL)
+        if amount > 1:
+            self.notification_service.notify_large_transfer("SOL", f"{amount:.4f}", direction, other)
+            
+    def _handle_token_transfer(self, event, transaction_data, timestamp, screens):
+        """Apply the honeypot screening results, log and notify for a token transfer event"""
+        mint = event.mint
+        direction = event.direction
+        formatted_amount = event.amount
+        other = event.other_address
+        token_name = event.token_name
+        
+        # Unscreened tokens (the honeypot run missed its budget) are not alerted on
+        is_honeypot, verdict, token_price = screens.get(mint, (False, None, None))
+        
+        # A token this transaction's honeypot run just flagged (alerted once per mint)
+        if verdict:
+            screens[mint] = (is_honeypot, None, token_price)
+            confidence, reasons = verdict
+            token_name = f"⚠️ Honeypot Token ({mint[:4]}...{mint[-4:]})"
+            transaction_data.honeypot_flags.append(HoneypotFlag(mint, confidence, reasons))
+            self.notification_service.notify_honeypot_detected(mint, reasons, confidence)
+        
+        # Log the transfer
+        msg = f"{direction} {formatted_amount:.4f} {token_name} {'from' if direction == 'Received' else 'to'} {other} on {timestamp}"
+        self.log_message(msg)
+        
+        # If this is a honeypot token, send extra alerts
+        if is_honeypot:
+            if direction == "Sent":
+                self.log_message(f"⚠️ Alert: Honeypot token SENT!")
+                self.notification_service.notify_honeypot_transfer(
+                    mint, direction, formatted_amount, other
+                )
+            
+            # Check if token is worthless
+            if token_price == 0:
+                self.log_message(f"⚠️ Alert: Token {mint[:4]}...{mint[-4:]} is now WORTHLESS!")
+                self.notification_service.notify_token_worthless(mint)
+        
+        # Notify for large known token transfers
+        if mint in TOKEN_MAP and formatted_amount > 100:
+            self.notification_service.notify_large_transfer(
+                token_name, f"{formatted_amount:.4f}", direction, other
+            )
+        
+    def _decode_swap(self, tx, transaction_data):
+        """Swap event of a transaction that called a DEX program, with the legs used by its alerts"""
+        for program_id in transaction_data.program_ids:
+            if program_id in SWAP_PROGRAM_IDS:
+                # Default swap event
+                swap_event = SwapEvent(program_id=program_id, dex_name=self._get_dex_name(program_id))
+                
+                # Input and output legs come from the wallet's net balance changes
+                token_transfers = [e for e in transaction_data.events if e.type == "token_transfer"]
+                sent_tokens, received_tokens = self.balance_engine.swap_legs(transaction_data.events)
+                
+                # If we have both sent and received tokens, this looks like a swap
+                if sent_tokens and received_tokens:
+                    # Organize the swap details
+                    swap_event.input_token = sent_tokens[0].get("token_name", "Unknown")
+                    swap_event.input_amount = sent_tokens[0].get("amount", 0)
+                    swap_event.input_mint = sent_tokens[0].get("mint", "")
+                    swap_event.output_token = received_tokens[0].get("token_name", "Unknown")
+                    swap_event.output_amount = received_tokens[0].get("amount", 0)
+                    swap_event.output_mint = received_tokens[0].get("mint", "")
+                    
+                    # Detailed Raydium swap parsing for better alerts
+                    if program_id == "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8":  # Raydium
+                        raydium_details = self._parse_raydium_swap(tx, sent_tokens, received_tokens)
+                        if raydium_details:
+                            swap_event.details = SwapDetails.from_dict(raydium_details)
+                            
+                    # Detailed Jupiter swap parsing for better alerts
+                    elif program_id in ["JUP4Fb2cqiRUcaTHdrPC8h2gNsA2ETXiPDD33WcGuJB", "JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4"]:  # Jupiter
+                        jupiter_details = self._parse_jupiter_swap(tx, sent_tokens, received_tokens)
+                        if jupiter_details:
+                            swap_event.details = SwapDetails(
+                                price_impact=jupiter_details.get("price_impact"),
+                                slippage=jupiter_details.get("slippage"),
+                                exchange_rate=jupiter_details.get("exchange_rate"),
+                                risk_level=jupiter_details.get("risk_level", "low"),
+                                risk_factors=jupiter_details.get("risk_factors", []),
+                                account_tags=jupiter_details.get("account_tags", {}),
+                                swap_path=jupiter_details.get("swap_path", []),
+                                route_info=jupiter_details.get("route_info"),
+                                jupiter_version=jupiter_details.get("jupiter_version", "")
+                            )
+                            
+                            # Extract any associated accounts for tagging
+                            associated_accounts = []
+                            for account, tag in jupiter_details.get("account_tags", {}).items():
+                                if tag.lower() in ["fee", "referral", "admin", "authority"]:
+                                    associated_accounts.append({"address": account, "tag": tag})
+                            
+                            if associated_accounts:
+                                swap_event.details.associated_accounts = associated_accounts
+                
+                return {
+                    "program_id": program_id,
+                    "event": swap_event,
+                    "token_transfers": token_transfers,
+                    "received_tokens": received_tokens
+                }
+        return None
+        
+    def _alert_swap(self, transaction_data, swap, screens):
+        """Log, notify and build webhook data for a decoded swap"""
+        program_id = swap["program_id"]
+        swap_event = swap["event"]
+        token_transfers = swap["token_transfers"]
+        received_tokens = swap["received_tokens"]
+        
+        # Log the swap details
+        if swap_event.input_token and swap_event.output_token:
+            self.log_message(
+                f"Swap on {swap_event.dex_name}: {swap_event.input_amount:.4f} "
+                f"{swap_event.input_token} → {swap_event.output_amount:.4f} "
+                f"{swap_event.output_token}"
+            )
+            
+            # Additional logging for risk factors if present
+            if swap_event.get("risk_factors"):
+                self.log_message(f"⚠️ Swap risk level: {swap_event.get('risk_level', 'low')} - {', '.join(swap_event.get('risk_factors'))}")
+        
+        # Check if any honeypot tokens were involved
+        honeypot_tokens = []
+        for event in token_transfers:
+            mint = event.mint
+            if mint and screens.get(mint, (False,))[0]:
+                honeypot_tokens.append(mint)
+                self.log_message(f"⚠️ Alert: Honeypot token {event.token_name} involved in SWAP!")
+                self.notification_service.notify_honeypot_swap(mint, program_id)
+        
+        # If this was a Raydium swap with honeypot tokens, prepare webhook data
+        if program_id == "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8" and honeypot_tokens:
+            # Store the webhook data in the transaction for API consumption
+            transaction_data.webhook_data = {
+                "type": "raydium_honeypot_swap",
+                "signature": transaction_data.signature,
+                "timestamp": transaction_data.timestamp,
+                "wallet": self.wallet_address,
+                "swap_details": swap_event,
+                "honeypot_tokens": honeypot_tokens
+            }
+        
+        # If this was a Jupiter swap with risk factors or honeypot tokens, prepare webhook data
+        elif program_id in ["JUP4Fb2cqiRUcaTHdrPC8h2gNsA2ETXiPDD33WcGuJB", "JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4"] and \
+            (honeypot_tokens or swap_event.get("risk_level") in ["medium", "high"]):
+            
+            # Create risk analysis information
+            risk_analysis = {
+                "overall_risk": "critical" if honeypot_tokens else swap_event.get("risk_level", "low"),
+                "confidence": 0.95 if honeypot_tokens else 0.7,
+                "reasons": []
+            }
+            
+            # Add reasons based on risk factors and honeypot status
+            if swap_event.get("risk_factors"):
+                risk_analysis["reasons"].extend(swap_event.get("risk_factors"))
+                
+            if honeypot_tokens:
+                for mint in honeypot_tokens:
+                    # Find the honeypot flag for this mint to get reasons
+                    for flag in transaction_data.honeypot_flags:
+                        if flag.mint == mint:
+                            risk_analysis["reasons"].extend(flag.reasons)
+            
+            # Get associated accounts for tagging in social media alerts
+            associated_accounts = []
+            if swap_event.get("associated_accounts"):
+                associated_accounts = swap_event.get("associated_accounts")
+                
+            # Find other associated accounts via the social media monitor if available
+            social_monitor = None
+            if hasattr(self.notification_service, 'twitter_service') and hasattr(self.notification_service.twitter_service, 'social_monitor'):
+                social_monitor = self.notification_service.twitter_service.social_monitor
+            
+            # Use social media monitor to find associated accounts for output token
+            if social_monitor and received_tokens:
+                output_mint = received_tokens[0].get("mint", "")
+                if output_mint:
+                    found_accounts = social_monitor.find_associated_accounts(output_mint)
+                    if found_accounts:
+                        for account in found_accounts:
+                            if account not in [a.get("address") for a in associated_accounts]:
+                                associated_accounts.append({
+                                    "address": account,
+                                    "tag": "token_promoter"
+                                })
+            
+            # Store the webhook data in the transaction for API consumption
+            transaction_data.webhook_data = {
+                "type": "jupiter_swap_alert",
+                "signature": transaction_data.signature,
+                "timestamp": transaction_data.timestamp,
+                "wallet": self.wallet_address,
+                "swap_details": swap_event,
+                "honeypot_tokens": honeypot_tokens,
+                "risk_analysis": risk_analysis,
+                "associated_accounts": associated_accounts
+            }
+        
+    def _screen_tokens(self, transaction_data):
+        """
+        Honeypot detector run: track every transferred token and analyze new
+        ones. Returns {mint: (is_honeypot, verdict, price)} for every token;
+        verdict is (confidence, reasons) for tokens this run flagged, price is
+        only looked up for honeypots.
+        """
+        detector = self.honeypot_detector
+        honeypots = {}
+        new_mints = []
+        for event in transaction_data.events:
+            if event.type != "token_transfer":
+                continue
+            mint = event.mint
+            if mint not in honeypots:
+                honeypots[mint] = detector.is_honeypot(mint)
+                if not honeypots[mint] and mint not in TOKEN_MAP:
+                    new_mints.append(mint)
+            
+            # Track this transaction for the token
+            detector.track_transaction(mint)
+            
+        # New tokens are screened concurrently, so several fit in one time budget
+        verdicts = {}
+        for mint, is_suspicious, confidence, reasons in detector.analyze_tokens(new_mints):
+            if is_suspicious:
+                honeypots[mint] = True
+                verdicts[mint] = (confidence, reasons)
+        prices = {
+            mint: detector.screen_pool.submit(detector.token_verdict, mint)
+            for mint, is_honeypot in honeypots.items() if is_honeypot
+        }
+        return {
+            mint: (is_honeypot, verdicts.get(mint), prices[mint].result()["price"] if is_honeypot else None)
+            for mint, is_honeypot in honeypots.items()
+        }
+        
+    def _check_phishing(self, transaction_data):
+        """
+        Phishing detector run: analyze the transaction and record the senders
+        of a phishing attempt; returns (is_phishing, confidence, reason)
+        """
+        result = self.phishing_detector.analyze_transaction(transaction_data)
+        is_phishing, _, reason = result
+        if is_phishing:
+            for event in transaction_data.events:
+                # The sender of a transfer is the potential phishing source
+                if event.type in ("sol_transfer", "token_transfer") and event.other_address \
+                        and event.direction == "Received":
+                    self.phishing_detector.add_phishing_address(event.other_address, reason)
+        return result
+        
+    def _detector_tasks(self, transaction_data):
+        """Detector runs for one transaction, keyed by detector name"""
+        view = transaction_data.frozen()
+        tasks = {}
+        if any(event.type == "token_transfer" for event in view.events):
+            tasks["honeypot"] = lambda: self._screen_tokens(view)
+        if self.suspicious_detector:
+            tasks["suspicious"] = lambda: self.suspicious_detector.analyze_transaction(view)
+        if self.phishing_detector:
+            tasks["phishing"] = lambda: self._check_phishing(view)
+        return tasks
+        
+    def _on_late_detection(self, transaction_data, name, result):
+        """
+        Apply the findings of a detector that finished after its time budget
+        The transaction may already be saved and handed to on_decoded, so it
+        is saved and handed on again when its flags change
+        """
+        signature = transaction_data.signature
+        if name == "honeypot":
+            flagged = {mint: verdict for mint, (_, verdict, _) in result.items() if verdict}
+            if not flagged:
+                return
+            self.log_message(f"⚠️ Late honeypot verdict for {signature[:8]}...: {', '.join(flagged)}")
+            for mint, (confidence, reasons) in flagged.items():
+                transaction_data.honeypot_flags.append(HoneypotFlag(mint, confidence, reasons))
+                self.notification_service.notify_honeypot_detected(mint, reasons, confidence)
+        elif name == "suspicious" and result[0]:
+            self.log_message(f"🔍 Late suspicious activity result for {signature[:8]}...")
+            self._apply_suspicious(transaction_data, result)
+        elif name == "phishing" and result[0]:
+            self.log_message(f"🚨 Late phishing result for {signature[:8]}...")
+            self._apply_phishing(transaction_data, result)
+        else:
+            return
+        
+        # Rewritten whole; the history list itself is only changed by the decode thread
+        if self.history_store:
+            self.history_store.touch()
+        if self.on_decoded:
+            self.on_decoded(transaction_data)
+        
+    def _apply_suspicious(self, transaction_data, result):
+        """Flag, log and notify a suspicious activity result"""
+        is_suspicious, reason = result
+        if not is_suspicious:
+            return
+        transaction_data.suspicious_flags.append(SuspiciousFlag(reason, "high"))
+        self.log_message(f"🔍 SUSPICIOUS ACTIVITY DETECTED: {reason}")
+        
+        # Send notification via Twitter
+        if hasattr(self.notification_service, 'twitter_service'):
+            self.notification_service.twitter_service.notify_suspicious_activity(
+                self.wallet_address, reason
+            )
+        
+    def _apply_phishing(self, transaction_data, result):
+        """Flag, log and notify a phishing result"""
+        is_phishing, confidence, reason = result
+        if not is_phishing:
+            return
+        transaction_data.phishing_flags = PhishingFlag(
+            reason=reason,
+            confidence=confidence,
+            severity="critical" if confidence > 0.8 else "high"
+        )
+        self.log_message(f"🚨 PHISHING ATTEMPT DETECTED: {reason} (Confidence: {confidence:.2f})")
+        
+        # Send notification via Twitter for critical threats
+        if confidence > 0.8 and hasattr(self.notification_service, 'twitter_service'):
+            self.notification_service.twitter_service.notify_suspicious_activity(
+                self.wallet_address, f"Phishing attempt: {reason}"
+            )
+        
     def decode_transaction(self, tx):
         """
         Decode a Solana transaction and extract relevant information
@@ -286,328 +697,66 @@ class WalletMonitor:
             timestamp = datetime.fromtimestamp(block_time).strftime("%b %d, %Y %H:%M:%S")
             signature = tx.get("transaction", {}).get("signatures", [""])[0]
             
-            transaction_data = {
-                "signature": signature,
-                "timestamp": timestamp,
-                "block_time": block_time,
-                "events": [],
-                "honeypot_flags": [],
-                "suspicious_flags": [],
-                "phishing_flags": None,
-                "program_ids": [],
-                "account": self.wallet_address
-            }
-            
-            # Get account keys from the transaction
-            account_keys = []
-            for key_obj in tx.get("transaction", {}).get("message", {}).get("accountKeys", []):
-                account_keys.append(key_obj.get("pubkey"))
-            
             # Extract instructions
             message = tx.get("transaction", {}).get("message", {})
             instructions = message.get("instructions", [])
             
-            # Process each instruction
-            for ix in instructions:
-                program_id = ix.get("programId")
-                transaction_data["program_ids"].append(program_id)
-                program = ix.get("program")
-                parsed = ix.get("parsed", {})
-                ix_type = parsed.get("type", "")
-                info = parsed.get("info", {})
-                
-                # Handle system transfers (SOL)
-                if program == "system" and ix_type == "transfer":
-                    amount = self.lamports_to_sol(int(info.get("lamports", 0)))
-                    destination = info.get("destination")
-                    source = info.get("source")
-                    
-                    direction = "Received" if destination == self.wallet_address else "Sent"
-                    other = source if direction == "Received" else destination
-                    
-                    event = {
-                        "type": "sol_transfer",
-                        "direction": direction,
-                        "amount": amount,
-                        "other_address": other,
-                        "token_name": "SOL"
-                    }
-                    
-                    transaction_data["events"].append(event)
-                    
-                    msg = f"{direction} {amount:.4f} SOL {'from' if direction == 'Received' else 'to'} {other} on {timestamp}"
-                    self.log_message(msg)
-                    
-                    # Notify for large transfers (>1 SOL)
-                    if amount > 1:
-                        self.notification_service.notify_large_transfer("SOL", f"{amount:.4f}", direction, other)
-                    
-                # Handle SPL token transfers
-                elif program == "spl-token" and ix_type == "transfer":
-                    mint = info.get("mint", "")
-                    amount = int(info.get("amount", 0))
-                    destination = info.get("destination")
-                    source = info.get("source")
-                    
-                    # Get token details
-                    token_name, decimals = TOKEN_MAP.get(mint, (f"Unknown Token ({mint[:4]}...{mint[-4:]})", 6))
-                    formatted_amount = amount / (10 ** decimals)
-                    
-                    direction = "Received" if destination == self.wallet_address else "Sent"
-                    other = source if direction == "Received" else destination
-                    
-                    event = {
-                        "type": "token_transfer",
-                        "direction": direction,
-                        "amount": formatted_amount,
-                        "other_address": other,
-                        "token_name": token_name,
-                        "mint": mint,
-                        "decimals": decimals
-                    }
-                    
-                    transaction_data["events"].append(event)
-                    
-                    is_honeypot = self.honeypot_detector.is_honeypot(mint)
-                    
-                    # Track this transaction for the token
-                    self.honeypot_detector.track_transaction(mint)
-                    
-                    # If this is a new token, analyze it
-                    if not is_honeypot and mint not in TOKEN_MAP:
-                        is_suspicious, confidence, reasons = self.honeypot_detector.analyze_token(mint)
-                        if is_suspicious:
-                            token_name = f"⚠️ Honeypot Token ({mint[:4]}...{mint[-4:]})"
-                            is_honeypot = True
-                            transaction_data["honeypot_flags"].append({
-                                "mint": mint,
-                                "confidence": confidence,
-                                "reasons": reasons
-                            })
-                            self.notification_service.notify_honeypot_detected(mint, reasons, confidence)
-                    
-                    # Log the transfer
-                    msg = f"{direction} {formatted_amount:.4f} {token_name} {'from' if direction == 'Received' else 'to'} {other} on {timestamp}"
-                    self.log_message(msg)
-                    
-                    # If this is a honeypot token, send extra alerts
-                    if is_honeypot:
-                        if direction == "Sent":
-                            self.log_message(f"⚠️ Alert: Honeypot token SENT!")
-                            self.notification_service.notify_honeypot_transfer(
-                                mint, direction, formatted_amount, other
-                            )
-                        
-                        # Check if token is worthless
-                        token_price = self.solana_rpc.get_token_price_usd(mint)
-                        if token_price == 0:
-                            self.log_message(f"⚠️ Alert: Token {mint[:4]}...{mint[-4:]} is now WORTHLESS!")
-                            self.notification_service.notify_token_worthless(mint)
-                    
-                    # Notify for large known token transfers
-                    if mint in TOKEN_MAP and formatted_amount > 100:
-                        self.notification_service.notify_large_transfer(
-                            token_name, f"{formatted_amount:.4f}", direction, other
-                        )
-                
+            transaction_data = DecodedTransaction(
+                signature=signature,
+                timestamp=timestamp,
+                block_time=block_time,
+                account=self.wallet_address,
+                program_ids=[ix.get("programId") for ix in instructions],
+                slot=tx.get("slot")
+            )
+            
+            # Net balance deltas cover transfers made by inner instructions
+            # (DEX routes, CPIs); older payloads without meta fall back to
+            # parsing the top-level instructions
+            if self.balance_engine.has_balance_meta(tx):
+                deltas = self.balance_engine.compute_deltas(tx)
+                events = self.balance_engine.wallet_events(tx, self.wallet_address, deltas)
+                # Transfers between other owners feed the fund-flow graph
+                transaction_data.flows = self.balance_engine.owner_flows(deltas, exclude=self.wallet_address) or None
+            else:
+                events = self._events_from_instructions(instructions)
+            
+            transaction_data.events.extend(events)
+            
             # Check for swap transactions
-            for program_id in transaction_data["program_ids"]:
-                if program_id in SWAP_PROGRAM_IDS:
-                    # Default swap event
-                    swap_event = {
-                        "type": "swap",
-                        "program_id": program_id,
-                        "dex_name": self._get_dex_name(program_id)
-                    }
-                    
-                    # Get input and output tokens based on transfer events
-                    token_transfers = [e for e in transaction_data["events"] if e.get("type") == "token_transfer"]
-                    
-                    # Group by direction
-                    sent_tokens = [t for t in token_transfers if t.get("direction") == "Sent"]
-                    received_tokens = [t for t in token_transfers if t.get("direction") == "Received"]
-                    
-                    # If we have both sent and received tokens, this looks like a swap
-                    if sent_tokens and received_tokens:
-                        # Organize the swap details
-                        swap_event.update({
-                            "input_token": sent_tokens[0].get("token_name", "Unknown"),
-                            "input_amount": sent_tokens[0].get("amount", 0),
-                            "input_mint": sent_tokens[0].get("mint", ""),
-                            "output_token": received_tokens[0].get("token_name", "Unknown"),
-                            "output_amount": received_tokens[0].get("amount", 0),
-                            "output_mint": received_tokens[0].get("mint", "")
-                        })
-                        
-                        # Detailed Raydium swap parsing for better alerts
-                        if program_id == "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8":  # Raydium
-                            raydium_details = self._parse_raydium_swap(tx, sent_tokens, received_tokens)
-                            if raydium_details:
-                                swap_event.update(raydium_details)
-                                
-                        # Detailed Jupiter swap parsing for better alerts
-                        elif program_id in ["JUP4Fb2cqiRUcaTHdrPC8h2gNsA2ETXiPDD33WcGuJB", "JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4"]:  # Jupiter
-                            jupiter_details = self._parse_jupiter_swap(tx, sent_tokens, received_tokens)
-                            if jupiter_details:
-                                swap_event.update({
-                                    "price_impact": jupiter_details.get("price_impact"),
-                                    "slippage": jupiter_details.get("slippage"),
-                                    "exchange_rate": jupiter_details.get("exchange_rate"),
-                                    "risk_level": jupiter_details.get("risk_level", "low"),
-                                    "risk_factors": jupiter_details.get("risk_factors", []),
-                                    "account_tags": jupiter_details.get("account_tags", {}),
-                                    "swap_path": jupiter_details.get("swap_path", []),
-                                    "route_info": jupiter_details.get("route_info"),
-                                    "jupiter_version": jupiter_details.get("jupiter_version", "")
-                                })
-                                
-                                # Extract any associated accounts for tagging
-                                associated_accounts = []
-                                for account, tag in jupiter_details.get("account_tags", {}).items():
-                                    if tag.lower() in ["fee", "referral", "admin", "authority"]:
-                                        associated_accounts.append({"address": account, "tag": tag})
-                                
-                                if associated_accounts:
-                                    swap_event["associated_accounts"] = associated_accounts
-                    
-                    transaction_data["events"].append(swap_event)
-                    
-                    # Log the swap details
-                    if "input_token" in swap_event and "output_token" in swap_event:
-                        self.log_message(
-                            f"Swap on {swap_event['dex_name']}: {swap_event['input_amount']:.4f} "
-                            f"{swap_event['input_token']} → {swap_event['output_amount']:.4f} "
-                            f"{swap_event['output_token']}"
-                        )
-                        
-                        # Additional logging for risk factors if present
-                        if "risk_factors" in swap_event and swap_event["risk_factors"]:
-                            self.log_message(f"⚠️ Swap risk level: {swap_event.get('risk_level', 'low')} - {', '.join(swap_event['risk_factors'])}")
-                    
-                    # Check if any honeypot tokens were involved
-                    honeypot_tokens = []
-                    for event in token_transfers:
-                        mint = event.get("mint", "")
-                        if mint and self.honeypot_detector.is_honeypot(mint):
-                            honeypot_tokens.append(mint)
-                            self.log_message(f"⚠️ Alert: Honeypot token {event['token_name']} involved in SWAP!")
-                            self.notification_service.notify_honeypot_swap(mint, program_id)
-                    
-                    # If this was a Raydium swap with honeypot tokens, prepare webhook data
-                    if program_id == "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8" and honeypot_tokens:
-                        # Store the webhook data in the transaction for API consumption
-                        transaction_data["webhook_data"] = {
-                            "type": "raydium_honeypot_swap",
-                            "signature": transaction_data["signature"],
-                            "timestamp": transaction_data["timestamp"],
-                            "wallet": self.wallet_address,
-                            "swap_details": swap_event,
-                            "honeypot_tokens": honeypot_tokens
-                        }
-                    
-                    # If this was a Jupiter swap with risk factors or honeypot tokens, prepare webhook data
-                    elif program_id in ["JUP4Fb2cqiRUcaTHdrPC8h2gNsA2ETXiPDD33WcGuJB", "JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4"] and \
-                        (honeypot_tokens or swap_event.get("risk_level") in ["medium", "high"]):
-                        
-                        # Create risk analysis information
-                        risk_analysis = {
-                            "overall_risk": "critical" if honeypot_tokens else swap_event.get("risk_level", "low"),
-                            "confidence": 0.95 if honeypot_tokens else 0.7,
-                            "reasons": []
-                        }
-                        
-                        # Add reasons based on risk factors and honeypot status
-                        if swap_event.get("risk_factors"):
-                            risk_analysis["reasons"].extend(swap_event.get("risk_factors"))
-                            
-                        if honeypot_tokens:
-                            for mint in honeypot_tokens:
-                                # Find the honeypot flag for this mint to get reasons
-                                for flag in transaction_data.get("honeypot_flags", []):
-                                    if flag.get("mint") == mint:
-                                        risk_analysis["reasons"].extend(flag.get("reasons", []))
-                        
-                        # Get associated accounts for tagging in social media alerts
-                        associated_accounts = []
-                        if "associated_accounts" in swap_event:
-                            associated_accounts = swap_event["associated_accounts"]
-                            
-                        # Find other associated accounts via the social media monitor if available
-                        social_monitor = None
-                        if hasattr(self.notification_service, 'twitter_service') and hasattr(self.notification_service.twitter_service, 'social_monitor'):
-                            social_monitor = self.notification_service.twitter_service.social_monitor
-                        
-                        # Use social media monitor to find associated accounts for output token
-                        if social_monitor and received_tokens:
-                            output_mint = received_tokens[0].get("mint", "")
-                            if output_mint:
-                                found_accounts = social_monitor.find_associated_accounts(output_mint)
-                                if found_accounts:
-                                    for account in found_accounts:
-                                        if account not in [a.get("address") for a in associated_accounts]:
-                                            associated_accounts.append({
-                                                "address": account,
-                                                "tag": "token_promoter"
-                                            })
-                        
-                        # Store the webhook data in the transaction for API consumption
-                        transaction_data["webhook_data"] = {
-                            "type": "jupiter_swap_alert",
-                            "signature": transaction_data["signature"],
-                            "timestamp": transaction_data["timestamp"],
-                            "wallet": self.wallet_address,
-                            "swap_details": swap_event,
-                            "honeypot_tokens": honeypot_tokens,
-                            "risk_analysis": risk_analysis,
-                            "associated_accounts": associated_accounts
-                        }
-                    
-                    break
-            
-            # Check for suspicious activity if the detector is available
-            if self.suspicious_detector:
-                is_suspicious, reason = self.suspicious_detector.analyze_transaction(transaction_data)
-                if is_suspicious:
-                    transaction_data["suspicious_flags"].append({
-                        "reason": reason,
-                        "severity": "high"
-                    })
-                    self.log_message(f"🔍 SUSPICIOUS ACTIVITY DETECTED: {reason}")
-                    
-                    # Send notification via Twitter
-                    if hasattr(self.notification_service, 'twitter_service'):
-                        self.notification_service.twitter_service.notify_suspicious_activity(
-                            self.wallet_address, reason
-                        )
-            
-            # Check for phishing indicators if the detector is available
-            if self.phishing_detector:
-                is_phishing, confidence, reason = self.phishing_detector.analyze_transaction(transaction_data)
-                if is_phishing:
-                    transaction_data["phishing_flags"] = {
-                        "reason": reason,
-                        "confidence": confidence,
-                        "severity": "critical" if confidence > 0.8 else "high"
-                    }
-                    self.log_message(f"🚨 PHISHING ATTEMPT DETECTED: {reason} (Confidence: {confidence:.2f})")
-                    
-                    # Add phishing address to the database
-                    for event in transaction_data["events"]:
-                        if event.get("type") in ["sol_transfer", "token_transfer"]:
-                            # Check if the other address is the potential phishing source
-                            other_address = event.get("other_address")
-                            if other_address and event.get("direction") == "Received":
-                                self.phishing_detector.add_phishing_address(other_address, reason)
-                    
-                    # Send notification via Twitter for critical threats
-                    if confidence > 0.8 and hasattr(self.notification_service, 'twitter_service'):
-                        self.notification_service.twitter_service.notify_suspicious_activity(
-                            self.wallet_address, f"Phishing attempt: {reason}"
-                        )
+            swap = self._decode_swap(tx, transaction_data)
+            if swap:
+                transaction_data.events.append(swap["event"])
+            
+            # The detectors run side by side on a frozen copy of the
+            # transaction; their findings are applied below in a fixed order
+            results = self.detectors.run(
+                self._detector_tasks(transaction_data),
+                on_late=lambda name, result: self._on_late_detection(transaction_data, name, result)
+            )
+            
+            screens = dict(results.get("honeypot", {}))
+            for event in events:
+                if event.type == "sol_transfer":
+                    self._handle_sol_transfer(event, timestamp)
+                else:
+                    self._handle_token_transfer(event, transaction_data, timestamp, screens)
+            
+            if swap:
+                self._alert_swap(transaction_data, swap, screens)
+            
+            # Suspicious activity and phishing indicators, if the detectors
+            # reported in time (late results are applied by _on_late_detection)
+            if "suspicious" in results:
+                self._apply_suspicious(transaction_data, results["suspicious"])
+            if "phishing" in results:
+                self._apply_phishing(transaction_data, results["phishing"])
                     
             # Add to history and save
             self.transaction_history.append(transaction_data)
-            self.save_transaction_history()
+            self.save_transaction_history(transaction_data)
+            if self.on_decoded:
+                self.on_decoded(transaction_data)
             
             return transaction_data
                     
@@ -615,23 +764,150 @@ class WalletMonitor:
             self.log_message(f"Error decoding transaction: {e}")
             return None
     
+    def discover_signatures(self):
+        """
+        Fetch signatures newer than the wallet's checkpoint, oldest first
+        Pages back through getSignaturesForAddress so bursts are not truncated.
+        Returns None if a page could not be fetched: a partial walk would
+        move the cursor past the signatures it missed
+        """
+        cursor = self.checkpoint.cursor(self.wallet_address)
+        if cursor is None:
+            # First run for this wallet: start from the most recent activity
+            signatures = self.solana_rpc.get_recent_signatures(self.wallet_address)
+            return None if signatures is None else list(reversed(signatures))
+            
+        signatures = []
+        before = None
+        while True:
+            page = self.solana_rpc.get_recent_signatures(
+                self.wallet_address, limit=SIGNATURE_PAGE_SIZE, before=before, until=cursor
+            )
+            if page is None:
+                return None
+            signatures.extend(page)
+            if len(page) < SIGNATURE_PAGE_SIZE:
+                break
+            before = page[-1].get("signature")
+        return list(reversed(signatures))
+        
+    def process_signature(self, sig_info):
+        """
+        Fetch, decode and checkpoint a single signature
+        Returns False if the transaction could not be fetched (it stays pending)
+        """
+        signature = sig_info.get("signature")
+        slot = sig_info.get("slot", 0)
+        if not signature:
+            return True
+        if signature not in self.seen_signatures:
+            tx = self.solana_rpc.get_transaction(signature)
+            if not tx:
+                return False
+            self.seen_signatures.add(signature)
+            self.decode_transaction(tx)
+            slot = tx.get("slot", slot)
+        self.checkpoint.mark_processed(self.wallet_address, signature, slot)
+        return True
+        
+    def pre_score(self, sig_info):
+        """
+        Cheap risk score for a discovered signature, before it is fetched
+        getSignaturesForAddress carries no account keys, so this looks for
+        known-bad mints, counterparties and phishing links in the memo
+        """
+        memo = sig_info.get("memo")
+        if not memo:
+            return 0
+            
+        score = 0
+        for address in ADDRESS_PATTERN.findall(memo):
+            if self.honeypot_detector.is_honeypot(address):
+                score = max(score, 3)
+            elif self.phishing_detector and self.phishing_detector.is_phishing_address(address):
+                score = max(score, 3)
+            elif self.suspicious_detector and address in self.suspicious_detector.suspicious_addresses:
+                score = max(score, 2)
+                
+        if self.phishing_detector:
+            for domain in DOMAIN_PATTERN.findall(memo):
+                if self.phishing_detector.is_phishing_domain(domain):
+                    score = max(score, 3)
+        return score
+        
+    def _on_shed(self, sig_info):
+        """Checkpoint past a failed transaction the ingest queue dropped under load"""
+        self.checkpoint.mark_processed(self.wallet_address, sig_info.get("signature"), sig_info.get("slot", 0))
+        
+    def enqueue_new_signatures(self):
+        """
+        Feed the ingest queue: deferred work first, then newly discovered
+        signatures. Stops at the first rejection (backpressure); discovered
+        signatures that did not fit are found again on a later cycle.
+        """
+        while self.deferred:
+            if self.ingest_queue.put(self.deferred[0]) == REJECTED:
+                return
+            self.deferred.popleft()
+            
+        discovered = self.discover_signatures()
+        if discovered is None:
+            # Leave the cursor where it is; the next cycle retries the whole walk
+            self.log_message("Signature discovery failed, retrying next cycle")
+            return
+        discovered = [s for s in discovered if s.get("signature")]
+        self.checkpoint.mark_pending(self.wallet_address, discovered)
+        for index, sig in enumerate(discovered):
+            if self.ingest_queue.put(sig) == REJECTED:
+                self.log_message(f"Ingest queue full, deferring {len(discovered) - index} signatures")
+                self.checkpoint.discard_pending(self.wallet_address, discovered[index:])
+                break
+                
+    def decode_next(self, timeout=None):
+        """Decode one signature from the ingest queue; False if none arrived"""
+        sig = self.ingest_queue.get(timeout=timeout)
+        if sig is None:
+            self.checkpoint.flush()
+            return False
+        try:
+            if not self.process_signature(sig):
+                self.deferred.append(sig)
+        except Exception as e:
+            self.log_message(f"Error processing {sig.get('signature')}: {e}")
+        finally:
+            self.ingest_queue.task_done(sig)
+        return True
+        
+    def ingest_metrics(self):
+        """Ingest queue metrics keyed by wallet"""
+        return {self.wallet_address: self.ingest_queue.metrics()}
+        
+    def _decode_worker(self):
+        """Drain the ingest queue for as long as the monitor runs"""
+        while True:
+            self.decode_next(timeout=1)
+            
+    def poll_once(self):
+        """Run one discovery cycle and decode everything it queued"""
+        self.enqueue_new_signatures()
+        while self.decode_next(timeout=0):
+            pass
+        self.checkpoint.flush()
+        
     def poll_wallet(self):
         """
         Poll the wallet for new transactions and process them
+        Discovery runs here; decoding runs on a worker draining the ingest queue
         """
         self.log_message(f"Tracking Wallet: {self.wallet_address}")
         
+        worker = threading.Thread(target=self._decode_worker)
+        worker.daemon = True
+        worker.start()
+        
         while True:
             try:
-                signatures = self.solana_rpc.get_recent_signatures(self.wallet_address)
-                
-                for sig in signatures:
-                    signature = sig.get("signature")
-                    if signature and signature not in self.seen_signatures:
-                        self.seen_signatures.add(signature)
-                        tx = self.solana_rpc.get_transaction(signature)
-                        self.decode_transaction(tx)
-                
+                self.enqueue_new_signatures()
                 time.sleep(POLL_INTERVAL)
             except Exception as e:
                 self.log_message(f"Polling error: {e}")